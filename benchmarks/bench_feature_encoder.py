@@ -0,0 +1,102 @@
+"""
+Compare the FeatureEncoder with the pandas mapping the API used before.
+
+The reference builds a DataFrame from the dumped listing, checks and selects
+FEATURE_NAMES and maps the categorical columns with DataPreparation, as
+/predict did for every request. Both paths start from validated ListingInput
+objects; the single case is the mean time per listing, the batch case the time
+of one call for --batch listings, both the best of --repeats runs.
+
+Usage:
+    python -m benchmarks.bench_feature_encoder --calls 10000 --batch 10000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from config.classifier_config import FEATURE_NAMES, MAP_NEIGHB, MAP_ROOM_TYPE
+from main_api import ListingInput
+from src.data_preparation import DataPreparation
+from src.feature_encoder import FeatureEncoder
+
+def make_listings(n_rows: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    neighbourhoods = list(MAP_NEIGHB)
+    room_types = list(MAP_ROOM_TYPE)
+    return [
+        ListingInput(
+            id=i, accommodates=int(rng.integers(1, 9)),
+            room_type=room_types[rng.integers(len(room_types))], beds=1,
+            bedrooms=int(rng.integers(0, 5)), bathrooms=int(rng.integers(1, 4)),
+            neighbourhood=neighbourhoods[rng.integers(len(neighbourhoods))],
+            tv=1, elevator=0, internet=1, latitude=40.7, longitude=-73.9
+        )
+        for i in range(n_rows)
+    ]
+
+def reference_single(listing) -> np.ndarray:
+    data = pd.DataFrame([listing.model_dump()])
+    missing_columns = set(FEATURE_NAMES) - set(data.columns)
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {missing_columns}")
+    data_prep = DataPreparation(data[FEATURE_NAMES])
+    data_prep.mapping_columns()
+    return data_prep.to_feature_array()
+
+def reference_batch(listings: list) -> np.ndarray:
+    data = pd.DataFrame({
+        name: [getattr(listing, name) for listing in listings] for name in FEATURE_NAMES
+    })
+    data_prep = DataPreparation(data)
+    data_prep.mapping_columns()
+    return data_prep.to_feature_array()
+
+def best_time(func, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=10000,
+                        help="Listings encoded one by one")
+    parser.add_argument('--batch', type=int, default=10000,
+                        help="Listings encoded in one batch call")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    encoder = FeatureEncoder()
+    listings = make_listings(max(args.calls, args.batch))
+    singles = listings[:args.calls]
+    batch = listings[:args.batch]
+
+    # Check that both paths give the same features before timing them
+    np.testing.assert_array_equal(encoder.encode_many(batch), reference_batch(batch))
+    np.testing.assert_array_equal(encoder.encode(singles[0]), reference_single(singles[0]))
+
+    def encode_singles():
+        for listing in singles:
+            encoder.encode(listing)
+
+    def reference_singles():
+        for listing in singles:
+            reference_single(listing)
+
+    cases = {
+        'single': (best_time(reference_singles, args.repeats) / len(singles),
+                   best_time(encode_singles, args.repeats) / len(singles)),
+        'batch': (best_time(lambda: reference_batch(batch), args.repeats),
+                  best_time(lambda: encoder.encode_many(batch), args.repeats))
+    }
+    print(f"{'case':<10}{'pandas us':>14}{'encoder us':>14}{'speedup':>10}")
+    for case, (reference, encoded) in cases.items():
+        print(f"{case:<10}{reference * 1e6:>14.1f}{encoded * 1e6:>14.1f}"
+              f"{reference / encoded:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Compare the memory used per API worker by pickled and memory-mapped models.
+
+Every worker is a separate (spawned) process, like a uvicorn worker. It loads
+the model, scores a batch and then waits until all workers are up before its
+memory is measured, so pages shared between workers are accounted for. PSS
+splits shared pages between the processes mapping them, so it is the fair
+per-worker figure; RSS counts them in full in every worker.
+
+Usage:
+    python -m benchmarks.bench_model_memory --workers 4
+    python -m benchmarks.bench_model_memory --model models/model_20241020_211858.pkl
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+def memory_usage_mb() -> dict:
+    # Linux exposes PSS in smaps_rollup, elsewhere only the peak RSS is available
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return {
+            'rss_mb': int(fields['Rss'].split()[0]) / 1024,
+            'pss_mb': int(fields['Pss'].split()[0]) / 1024
+        }
+    except OSError:
+        return {'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 'pss_mb': None}
+
+def worker(model_path, features, barrier, results):
+    from src.model_handler import ModelHandler
+
+    baseline = memory_usage_mb()
+    start = time.perf_counter()
+    model = ModelHandler().load_model(model_path)
+    load_time = time.perf_counter() - start
+    model.predict(features)
+
+    barrier.wait()
+    usage = memory_usage_mb()
+    results.put({
+        'load_time_s': load_time,
+        'rss_mb': usage['rss_mb'] - baseline['rss_mb'],
+        'pss_mb': None if usage['pss_mb'] is None else usage['pss_mb'] - baseline['pss_mb']
+    })
+    barrier.wait()
+
+def measure(model_path, features, n_workers: int) -> dict:
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(n_workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(str(model_path), features, barrier, results))
+        for _ in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    per_worker = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    summary = {'file_mb': Path(model_path).stat().st_size / 1e6}
+    for key in per_worker[0]:
+        values = [r[key] for r in per_worker if r[key] is not None]
+        summary[key] = sum(values) / len(values) if values else None
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--model', help="Pickled forest to compare (default: train a synthetic one)")
+    parser.add_argument('--trees', type=int, default=500)
+    parser.add_argument('--rows', type=int, default=30000)
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    from sklearn.ensemble import RandomForestClassifier
+    from benchmarks.synthetic_data import make_features
+    from src.model_handler import ModelHandler
+
+    X, y = make_features(args.rows)
+    model_handler = ModelHandler()
+    if args.model:
+        model_handler.load_model(args.model)
+    else:
+        model_handler.model = RandomForestClassifier(
+            n_estimators=args.trees, random_state=0, class_weight='balanced', n_jobs=-1
+        ).fit(X, y)
+    features = X.head(1000)
+
+    with tempfile.TemporaryDirectory() as folder:
+        pickle_path = Path(folder) / 'model.pkl'
+        forest_path = Path(folder) / 'model.forest'
+        model_handler.save_model(pickle_path)
+        compiled_handler = ModelHandler()
+        compiled_handler.model = model_handler.compile_model()
+        compiled_handler.save_model(forest_path)
+
+        results = {
+            'workers': args.workers,
+            'pickle': measure(pickle_path, features, args.workers),
+            'mmap': measure(forest_path, features, args.workers)
+        }
+
+    print(f"{'format':<8}{'file MB':>10}{'load s':>10}{'RSS MB':>10}{'PSS MB':>10}")
+    for name in ('pickle', 'mmap'):
+        r = results[name]
+        pss = f"{r['pss_mb']:>10.1f}" if r['pss_mb'] is not None else f"{'n/a':>10}"
+        print(f"{name:<8}{r['file_mb']:>10.1f}{r['load_time_s']:>10.4f}{r['rss_mb']:>10.1f}{pss}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
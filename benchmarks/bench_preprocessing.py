@@ -0,0 +1,104 @@
+"""
+Compare the vectorized bathrooms and amenities parsers with the per-row ones.
+
+The raw dump is synthetic but follows the shape of the listings export: a few
+dozen distinct bathrooms texts and JSON-like amenities lists of 5 to 38 items.
+The reference implementations are the previous versions of
+DataProcessor.clean_bathrooms_column and preprocess_amenities_column.
+
+Usage:
+    python -m benchmarks.bench_preprocessing --rows 2000000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from config.preprocessing_config import FEATURE_AMENITIES
+from src.data_preprocessor import DataProcessor
+from benchmarks.synthetic_data import AMENITIES, BATHROOMS_TEXTS
+
+def make_raw(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    texts = np.array(BATHROOMS_TEXTS + [None], dtype=object)
+    bathrooms_text = texts[rng.integers(0, len(texts), n_rows)]
+
+    # Build a pool of distinct lists and sample rows from it, generating millions
+    # of lists one by one would dominate the run time
+    pool_size = min(n_rows, 20000)
+    lengths = rng.integers(5, len(AMENITIES) + 1, pool_size)
+    pool = np.array([
+        json.dumps(list(rng.choice(AMENITIES, size=length, replace=False)))
+        for length in lengths
+    ], dtype=object)
+    amenities = pool[rng.integers(0, pool_size, n_rows)]
+
+    return pd.DataFrame({
+        'bathrooms': np.full(n_rows, np.nan, dtype=np.float32),
+        'bathrooms_text': pd.Categorical(bathrooms_text),
+        'amenities': pd.Series(amenities, dtype=object)
+    })
+
+def reference_bathrooms(df: pd.DataFrame) -> None:
+    df.drop(columns=['bathrooms'], inplace=True)
+
+    def num_bathroom_from_text(text):
+        try:
+            if isinstance(text, str):
+                bath_num = text.split(" ")[0]
+                return float(bath_num)
+            else:
+                return np.nan
+        except ValueError:
+            return np.nan
+
+    df['bathrooms'] = df['bathrooms_text'].apply(num_bathroom_from_text).astype(np.float32)
+
+def reference_amenities(df: pd.DataFrame) -> None:
+    for amenity in FEATURE_AMENITIES:
+        df[amenity.replace(' ', '_')] = df['amenities'].str.contains(amenity).astype(int)
+    df.drop('amenities', axis=1, inplace=True)
+
+def timed(func, df: pd.DataFrame) -> float:
+    start = time.perf_counter()
+    func(df)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    raw = make_raw(args.rows)
+    reference = raw.copy()
+    processor = DataProcessor()
+    processor.df = raw.copy()
+
+    results = {'rows': args.rows}
+    results['bathrooms'] = {
+        'reference_s': timed(reference_bathrooms, reference),
+        'vectorized_s': timed(lambda df: processor.clean_bathrooms_column(), processor.df)
+    }
+    results['amenities'] = {
+        'reference_s': timed(reference_amenities, reference),
+        'vectorized_s': timed(lambda df: processor.preprocess_amenities_column(), processor.df)
+    }
+
+    # Both versions must produce the same columns
+    pd.testing.assert_frame_equal(processor.df, reference)
+
+    print(f"{'step':<12}{'reference s':>14}{'vectorized s':>14}{'speedup':>10}")
+    for step in ('bathrooms', 'amenities'):
+        r = results[step]
+        r['speedup'] = r['reference_s'] / r['vectorized_s']
+        print(f"{step:<12}{r['reference_s']:>14.3f}{r['vectorized_s']:>14.3f}{r['speedup']:>9.1f}x")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Profile the import time of the API and time a cold start to the first prediction.
+
+The import profile runs `python -X importtime -c "import main_api"` in a fresh
+interpreter and prints the total, the slowest top-level imports of the API and
+whether the training stack (pandas, sklearn, scipy, pyarrow) was imported.
+
+The cold start launches `uvicorn main_api:app` as a new process and polls
+/predict with one listing until it answers, so it covers the interpreter
+start, the imports, the app startup (PRELOAD_MODELS included) and the first
+model load and prediction. It is repeated --runs times.
+
+Usage:
+    python -m benchmarks.bench_startup --model model_20241020_211858.pkl --runs 5
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+HEAVY_MODULES = ['pandas', 'sklearn', 'scipy', 'pyarrow']
+
+LISTING = {
+    'id': 1, 'accommodates': 4, 'room_type': 'Entire home/apt', 'beds': 1, 'bedrooms': 2,
+    'bathrooms': 1, 'neighbourhood': 'Manhattan', 'tv': 1, 'elevator': 0, 'internet': 1,
+    'latitude': 40.7, 'longitude': -73.9
+}
+
+def import_profile(top: int) -> None:
+    check = f"import main_api, sys; print([m for m in {HEAVY_MODULES} if m in sys.modules])"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', check],
+        capture_output=True, text=True, check=True
+    )
+    # Lines are "import time: self_us | cumulative_us | <indent>module"
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative), name[1:].rstrip()))
+
+    total = next(cumulative for cumulative, name in imports if name.strip() == 'main_api')
+    print(f"import main_api: {total / 1e6:.3f} s")
+    print(f"heavy modules imported: {result.stdout.strip()}")
+    # Direct imports of main_api are indented by two spaces
+    direct = sorted((item for item in imports
+                     if item[1].startswith('  ') and not item[1].startswith('   ')),
+                    reverse=True)
+    for cumulative, name in direct[:top]:
+        print(f"{cumulative / 1e6:>10.3f} s  {name.strip()}")
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def cold_start(model: str, timeout: float) -> float:
+    port = free_port()
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/predict",
+        data=json.dumps({'input_data': LISTING, 'model_file': {'model_path': model}}).encode(),
+        headers={'Content-Type': 'application/json'}
+    )
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main_api:app', '--port', str(port),
+         '--log-level', 'warning'],
+        env={**os.environ, 'PYTHONPATH': os.getcwd()}
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise TimeoutError(f"No prediction within {timeout} s")
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--model', help="Model file served by the cold start, relative to "
+                        "MODEL_FOLDER (the cold start is skipped without it)")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="Slowest imports to print")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    import_profile(args.top)
+    if args.model:
+        times = [cold_start(args.model, args.timeout) for _ in range(args.runs)]
+        print(f"startup to first prediction: best {min(times):.3f} s, "
+              f"median {statistics.median(times):.3f} s over {args.runs} runs")
+
+if __name__ == '__main__':
+    main()
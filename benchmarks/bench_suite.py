@@ -0,0 +1,199 @@
+"""
+Time the training and serving hot paths on synthetic listings at several scales.
+
+For every scale, a raw dump of that many listings is generated and written to a
+temporary CSV, then each case below is timed (best of --repeats runs after a
+warm-up run):
+    process_data       DataProcessor.process_data on the raw CSV (no stage cache)
+    mapping_columns    DataPreparation.mapping_columns on the processed data
+    split_data         DataPreparation.split_data
+    train_model        ModelHandler.train_model with --trees trees
+    load_model         ModelHandler.load_model of the pickled forest
+    predict_single     one-listing predict, mean over --single-calls calls
+    predict_batch      predict of the whole test split
+    api_predict        POST /predict through an in-process client, mean per request
+    api_predict_batch  POST /predict/batch of up to MAX_BATCH_SIZE test listings
+
+The results are saved as JSON. With --baseline, every case is compared with
+the same case of a previous run and the script exits with status 1 when one is
+more than --threshold (and --min-delta seconds) slower. Timings only compare on
+the same machine.
+
+Usage:
+    python -m benchmarks.bench_suite --scales 1000 10000 --output results/bench.json
+    python -m benchmarks.bench_suite --baseline results/bench.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from config.classifier_config import MAX_BATCH_SIZE
+from src.data_preparation import DataPreparation
+from src.data_preprocessor import DataProcessor
+from src.model_handler import ModelHandler
+from benchmarks.synthetic_data import make_raw_listings
+
+# Extra fields of the API input that are not model features
+API_FIELDS = {'id': 0, 'beds': 1, 'tv': 1, 'elevator': 0, 'internet': 1,
+              'latitude': 40.7, 'longitude': -73.9}
+
+def best_time(func, repeats: int) -> float:
+    # An untimed warm-up run, so imports and first-call caches are not measured
+    func()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def to_listings(df) -> list[dict]:
+    # API payloads from processed rows, with the raw category names
+    rows = df[['neighbourhood', 'room_type', 'accommodates', 'bathrooms', 'bedrooms']]
+    return [
+        {**API_FIELDS, 'id': int(listing_id), 'neighbourhood': str(row.neighbourhood),
+         'room_type': str(row.room_type), 'accommodates': int(row.accommodates),
+         'bathrooms': int(row.bathrooms), 'bedrooms': int(row.bedrooms)}
+        for listing_id, row in zip(df['id'], rows.itertuples())
+    ]
+
+def bench_scale(n_rows: int, args, folder: Path, client) -> dict:
+    results = {}
+    raw_path = folder / f"raw_{n_rows}.csv"
+    make_raw_listings(n_rows).to_csv(raw_path, index=False)
+
+    processor = DataProcessor()
+    results['process_data'] = best_time(
+        lambda: processor.process_data(raw_path, folder / f"processed_{n_rows}.parquet"),
+        args.repeats
+    )
+    processed = processor.df
+
+    def mapping():
+        DataPreparation(processed.copy()).mapping_columns()
+    results['mapping_columns'] = best_time(mapping, args.repeats)
+
+    data_prep = DataPreparation(processed.copy())
+    data_prep.mapping_columns()
+    results['split_data'] = best_time(data_prep.split_data, args.repeats)
+    X_train, X_test, y_train, _ = data_prep.split_data()
+
+    handler = ModelHandler()
+    results['train_model'] = best_time(
+        lambda: handler.train_model(X_train, y_train, n_estimators=args.trees), args.repeats
+    )
+    model_path = folder / f"model_{n_rows}.pkl"
+    handler.save_model(model_path)
+    results['load_model'] = best_time(lambda: ModelHandler().load_model(model_path), args.repeats)
+
+    model = handler.model
+    features = X_test.to_numpy(dtype=np.float64)
+    single = features[:1]
+    results['predict_single'] = best_time(
+        lambda: [model.predict(single) for _ in range(args.single_calls)], args.repeats
+    ) / args.single_calls
+    results['predict_batch'] = best_time(lambda: model.predict(features), args.repeats)
+
+    if client is not None:
+        # The API joins model_path to MODEL_FOLDER, an absolute path is kept as is
+        model_file = {'model_path': str(model_path.resolve())}
+        listings = to_listings(processed.loc[X_test.index])
+        payload = {'input_data': listings[0], 'model_file': model_file}
+
+        def api_single():
+            for _ in range(args.single_calls):
+                response = client.post('/predict', json=payload)
+                assert response.status_code == 200, response.text
+        results['api_predict'] = best_time(api_single, args.repeats) / args.single_calls
+
+        batch = {'listings': listings[:MAX_BATCH_SIZE], 'model_file': model_file}
+
+        def api_batch():
+            response = client.post('/predict/batch', json=batch)
+            assert response.status_code == 200, response.text
+        results['api_predict_batch'] = best_time(api_batch, args.repeats)
+
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta: float) -> list[str]:
+    regressions = []
+    print(f"{'case':<28}{'baseline s':>12}{'current s':>12}{'ratio':>8}")
+    for case, seconds in results.items():
+        if case not in baseline:
+            continue
+        ratio = seconds / baseline[case] if baseline[case] > 0 else float('inf')
+        flag = ''
+        # Millisecond cases are noisy, a regression must also be min_delta seconds slower
+        if ratio > 1 + threshold and seconds - baseline[case] > min_delta:
+            regressions.append(case)
+            flag = '  REGRESSION'
+        print(f"{case:<28}{baseline[case]:>12.5f}{seconds:>12.5f}{ratio:>7.2f}x{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 50000],
+                        help="Numbers of raw listings to benchmark")
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--single-calls', type=int, default=50)
+    parser.add_argument('--no-api', action='store_true', help="Skip the /predict cases")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Compare with the results JSON of a previous run")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Slowdown over the baseline reported as a regression (0.2 = 20%%)")
+    parser.add_argument('--min-delta', type=float, default=0.005,
+                        help="Smallest slowdown in seconds reported as a regression")
+    args = parser.parse_args()
+
+    client = None
+    if not args.no_api:
+        from fastapi.testclient import TestClient
+        import main_api
+        client = TestClient(main_api.app)
+    # The benchmark feeds plain arrays to forests fitted on DataFrames
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench_") as folder:
+        for n_rows in args.scales:
+            scale_results = bench_scale(n_rows, args, Path(folder), client)
+            for case, seconds in scale_results.items():
+                results[f"{n_rows}/{case}"] = seconds
+                print(f"{n_rows:>8} {case:<20}{seconds:>12.5f} s")
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'trees': args.trees,
+            'repeats': args.repeats
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold, args.min_delta)
+        if regressions:
+            print(f"{len(regressions)} cases more than {args.threshold:.0%} slower "
+                  f"than {args.baseline}: {regressions}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from config.classifier_config import MAP_NEIGHB, MAP_ROOM_TYPE, FEATURE_NAMES
+
+BATHROOMS_TEXTS = [
+    '1 bath', '1 shared bath', '1 private bath', '1.5 baths', '1.5 shared baths',
+    '2 baths', '2 shared baths', '2.5 baths', '3 baths', '3.5 baths', '4 baths',
+    '0 baths', '0 shared baths', 'Half-bath', 'Shared half-bath', 'Private half-bath'
+]
+
+AMENITIES = [
+    'Wifi', 'Kitchen', 'Heating', 'Smoke alarm', 'Essentials', 'Hangers', 'Hot water',
+    'Long term stays allowed', 'Carbon monoxide alarm', 'Air conditioning', 'Iron',
+    'Hair dryer', 'Dedicated workspace', 'Shampoo', 'TV', 'Cable TV', 'Elevator',
+    'Breakfast', 'Refrigerator', 'Microwave', 'Dishes and silverware', 'Coffee maker',
+    'Cooking basics', 'Stove', 'Oven', 'First aid kit', 'Fire extinguisher', 'Washer',
+    'Dryer', 'Free street parking', 'Lock on bedroom door', 'Bed linens', 'Ethernet connection',
+    'Pocket wifi', 'Paid parking off premises', 'Indoor fireplace', 'Self check-in', 'Lockbox'
+]
+
+PROPERTY_TYPES = [
+    'Entire rental unit', 'Private room in rental unit', 'Entire home', 'Entire condo',
+    'Private room in home', 'Entire guest suite', 'Room in hotel', 'Shared room in rental unit'
+]
+
+def make_features(n_rows: int, seed: int = 0) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Generate mapped model features and a price category target.
+
+    The values follow the ranges of the NY listings, so trees grown on them have
+    a realistic size.
+
+    Args:
+        n_rows (int): The number of listings.
+        seed (int): The random seed.
+
+    Returns:
+        tuple: The feature matrix (FEATURE_NAMES columns) and the target.
+    """
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'neighbourhood': rng.integers(1, len(MAP_NEIGHB) + 1, n_rows),
+        'room_type': rng.integers(1, len(MAP_ROOM_TYPE) + 1, n_rows),
+        'accommodates': rng.integers(1, 17, n_rows),
+        'bathrooms': rng.integers(0, 13, n_rows) / 2,
+        'bedrooms': rng.integers(1, 11, n_rows).astype(float)
+    })[FEATURE_NAMES]
+    score = (X['room_type'] + X['accommodates'] / 2 + X['bathrooms']
+             + X['neighbourhood'] / 2 + rng.normal(0, 1.5, n_rows))
+    y = pd.Series(np.digitize(score, [4, 6, 8]), name='category')
+    return X, y
+
+def make_raw_listings(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a raw listings dump with every column DataProcessor reads.
+
+    The prices are text like '$1,250.00' and a few percent of the listings
+    have missing values or prices below MIN_PRICE, so every cleaning stage has
+    rows to work on.
+
+    Args:
+        n_rows (int): The number of listings.
+        seed (int): The random seed.
+
+    Returns:
+        pd.DataFrame: The raw columns (write it with to_csv to get a raw file).
+    """
+    rng = np.random.default_rng(seed)
+    neighbourhoods = np.array(list(MAP_NEIGHB))
+    room_types = np.array(list(MAP_ROOM_TYPE))
+    bathrooms_texts = np.array(BATHROOMS_TEXTS + [None], dtype=object)
+
+    # Sample amenities lists from a pool, generating millions one by one is slow
+    pool_size = min(n_rows, 20000)
+    pool = np.array([
+        json.dumps(list(rng.choice(AMENITIES, size=length, replace=False)))
+        for length in rng.integers(0, len(AMENITIES) + 1, pool_size)
+    ], dtype=object)
+
+    prices = np.round(np.exp(rng.normal(5, 0.8, n_rows)))
+    bedrooms = rng.integers(1, 8, n_rows).astype(float)
+    bedrooms[rng.random(n_rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        'id': np.arange(1, n_rows + 1) * 7 + 1000,
+        'neighbourhood_group_cleansed': neighbourhoods[rng.integers(0, len(neighbourhoods), n_rows)],
+        'property_type': np.array(PROPERTY_TYPES)[rng.integers(0, len(PROPERTY_TYPES), n_rows)],
+        'room_type': room_types[rng.integers(0, len(room_types), n_rows)],
+        'latitude': rng.uniform(40.5, 40.9, n_rows),
+        'longitude': rng.uniform(-74.25, -73.7, n_rows),
+        'accommodates': rng.integers(1, 17, n_rows),
+        'bathrooms': np.nan,
+        'bathrooms_text': bathrooms_texts[rng.integers(0, len(bathrooms_texts), n_rows)],
+        'bedrooms': bedrooms,
+        'beds': rng.integers(1, 10, n_rows).astype(float),
+        'amenities': pool[rng.integers(0, pool_size, n_rows)],
+        'price': [f"${price:,.2f}" for price in prices]
+    })
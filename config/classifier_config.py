@@ -15,6 +15,39 @@ MAP_CATEGORY = {
 MODEL_FOLDER = "models/"
 RESULTS_FOLDER = "results/"
 
+# Model registry
+MODEL_CACHE_SIZE = 4
+PRELOAD_MODELS = []
+
+# Model routing (ROUTING_MODELS and SHADOW_MODELS env variables in main_api.py): requests
+# without a model_path go to one of ROUTING_MODELS ({model file: weight}, the champion and
+# its challengers) picked by a hash of the listing id, and every SHADOW_MODELS model also
+# scores them in the background. Shadow batches beyond SHADOW_MAX_PENDING are dropped
+ROUTING_MODELS = {}
+SHADOW_MODELS = []
+SHADOW_WORKERS = 1
+SHADOW_MAX_PENDING = 1000
+
+# API
+MAX_BATCH_SIZE = 10000
+
+# Decimals of the probabilities returned with return_proba or top_k
+PROBA_DECIMALS = 4
+
+# Buckets (seconds) of the request and phase latency histograms served at /metrics
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# Async /predict (ASYNC_PREDICT env variable in main_api.py): concurrent requests are
+# grouped into one predict call of up to MICRO_BATCH_MAX_SIZE rows, waiting at most
+# MICRO_BATCH_MAX_WAIT_MS for other requests
+ASYNC_PREDICT = False
+MICRO_BATCH_MAX_SIZE = 64
+MICRO_BATCH_MAX_WAIT_MS = 2
+MICRO_BATCH_WORKERS = 1
+
+# Bulk scoring
+SCORING_CHUNK_SIZE = 50000
+
 # Features for the model
 FEATURE_NAMES = [
     'neighbourhood', 'room_type', 'accommodates', 'bathrooms', 'bedrooms'
@@ -28,4 +61,70 @@ RANDOM_STATE_SPLIT = 1
 N_ESTIMATORS = 500
 RANDOM_STATE_CLASSIFIER = 0
 CLASS_WEIGHT = 'balanced'
-N_JOBS = 4
\ No newline at end of file
+N_JOBS = 4
+
+# Out-of-core training (TRAIN_MODE=stream in main_train.py): rows read per batch,
+# training rows per sub-forest and trees fitted on each of them (the forest has about
+# STREAM_TREES_PER_SHARD * training rows / STREAM_SHARD_SIZE trees, N_ESTIMATORS is not used)
+STREAM_BATCH_SIZE = 100000
+STREAM_SHARD_SIZE = 500000
+STREAM_TREES_PER_SHARD = 50
+
+# Probability bins of the streaming ROC AUC
+METRIC_BINS = 1000
+
+# Measure the peak memory of every main_train.py step (opt-in: tracemalloc slows every
+# allocation down, so stage_timings are only comparable between runs without it)
+PROFILE_MEMORY = False
+
+# Permutation feature importance in the results: repeats per feature, worker processes
+# (0 uses every core), time budget in seconds (bounds its cost) and rows per stacked prediction
+COMPUTE_PERMUTATION_IMPORTANCE = True
+PERMUTATION_REPEATS = 5
+PERMUTATION_WORKERS = 0
+PERMUTATION_TIME_BUDGET = 60
+PERMUTATION_BATCH_ROWS = 200000
+
+# Retraining from a previous model (BASE_MODEL in main_train.py): trees grown on the new
+# data, and which trees they replace (None keeps every tree, 'oldest' or 'worst')
+GROW_N_TREES = 100
+GROW_REPLACE = None
+LINEAGE_PATH = MODEL_FOLDER + "lineage.jsonl"
+
+# Compressed serving model (model_<ts>_compressed.forest): the fewest trees, then the
+# shallowest depth, whose validation accuracy and ROC AUC stay within COMPRESS_TOLERANCE of
+# the full forest, stored with smaller dtypes. The validation rows are held out of training
+COMPRESS_MODEL = False
+COMPRESS_VALIDATION_SPLIT = 0.15
+COMPRESS_TOLERANCE = 0.005
+COMPRESS_MAX_DEPTHS = [24, 20, 16, 14, 12, 10, 8]
+COMPRESS_THRESHOLD_DTYPE = 'float32'
+COMPRESS_VALUE_DTYPE = 'float16'
+
+# Export a CompiledForest next to the pickled model
+# ('.forest' files are memory-mapped and shared across API workers, '.npz' files are read)
+EXPORT_COMPILED_MODEL = True
+COMPILED_MODEL_SUFFIX = '.forest'
+
+# Precomputed predictions over the observed feature grid (<model file>.table.npz)
+BUILD_PREDICTION_TABLE = True
+USE_PREDICTION_TABLE = True
+MAX_PREDICTION_TABLE_SIZE = 1000000
+
+# Hyperparameter search (main_search.py)
+# SEARCH_SPACE values are lists (grid) or scipy.stats distributions (random search with SEARCH_N_ITER)
+SEARCH_SPACE = {
+    'n_estimators': [100, 300, 500],
+    'max_depth': [None, 10, 20],
+    'min_samples_leaf': [1, 5, 20],
+    'max_features': ['sqrt', None]
+}
+SEARCH_N_ITER = None
+SEARCH_METRIC = 'roc_auc'
+SEARCH_VALIDATION_SPLIT = 0.2
+SEARCH_WORKERS = 0
+
+# Trials are grown in stages (fractions of n_estimators) and pruned when their validation
+# score is more than EARLY_STOP_TOLERANCE below the best finished trial
+EARLY_STOP_FRACTIONS = [0.2, 0.5]
+EARLY_STOP_TOLERANCE = 0.01
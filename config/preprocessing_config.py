@@ -8,6 +8,43 @@ COLUMNS = [
     'beds', 'amenities', 'price'
 ]
 
+# Columns read from the raw file (COLUMNS plus the text the bathrooms are parsed from)
+RAW_COLUMNS = COLUMNS + ['bathrooms_text']
+
+# Compact dtypes of the raw columns, low-cardinality text is read as categorical
+RAW_DTYPES = {
+    'id': 'int64',
+    'neighbourhood_group_cleansed': 'category',
+    'property_type': 'category',
+    'room_type': 'category',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'accommodates': 'Int16',
+    'bathrooms': 'float32',
+    'bathrooms_text': 'category',
+    'bedrooms': 'float32',
+    'beds': 'float32',
+    'amenities': 'object',
+    'price': 'object'
+}
+
+# Format of the processed dataset: 'parquet' (typed, compressed, columnar) or 'csv'
+PROCESSED_FORMAT = 'parquet'
+PARQUET_COMPRESSION = 'zstd'
+
+# Cache of the preprocessing stage outputs, keyed by input file, stage code and config
+USE_STAGE_CACHE = True
+CACHE_FOLDER = "data/cache/"
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+CACHE_MAX_AGE_DAYS = 30
+
+# Flag column of the daily delta files marking deleted listings
+DELETED_COLUMN = 'is_deleted'
+SNAPSHOT_PATTERN = 'processed_listings_*'
+
+# Rows per chunk when processing the raw file in chunks (None reads it at once)
+CHUNK_SIZE = None
+
 RENAMED_COLUMNS = {
     'neighbourhood_group_cleansed': 'neighbourhood',
 }
@@ -17,4 +54,9 @@ FEATURE_AMENITIES = [
     'heating', 'wifi', 'elevator', 'breakfast'
 ]
 
-TARGET_COLUMN = 'category'
\ No newline at end of file
+TARGET_COLUMN = 'category'
+
+# Price outliers below MIN_PRICE are dropped, the rest binned into the target categories
+MIN_PRICE = 10
+PRICE_BINS = [10, 90, 180, 400, float('inf')]
+PRICE_LABELS = [0, 1, 2, 3]
\ No newline at end of file
@@ -1,16 +1,142 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, ValidationError
+from contextlib import asynccontextmanager
 from pathlib import Path
-import pandas as pd
+from typing import Optional
+import numpy as np
 from datetime import datetime
+import os
+import time
 import traceback
+import warnings
 
-from config.classifier_config import MODEL_FOLDER, FEATURE_NAMES, MAP_CATEGORY
-from src.model_handler import ModelHandler
-from src.data_preparation import DataPreparation
+from config.classifier_config import (
+    MODEL_FOLDER, MAP_CATEGORY, PRELOAD_MODELS, MAX_BATCH_SIZE, ASYNC_PREDICT, ROUTING_MODELS,
+    SHADOW_MODELS,
+    LATENCY_BUCKETS, PROBA_DECIMALS
+)
+from src.micro_batcher import MicroBatcher
+from src.model_registry import ModelRegistry
+from src.model_router import ModelRouter
+from src.feature_encoder import FeatureEncoder, UnknownCategory
 from src.setup_logger import setup_logger, get_logger
 
-app = FastAPI()
+logger = get_logger(__name__)
+
+# Shared across requests so each model file is unpickled only once
+model_registry = ModelRegistry()
+
+def parse_routing(value: str) -> dict:
+    """
+    Parse the ROUTING_MODELS env variable.
+
+    Args:
+        value (str): Comma-separated model=weight pairs (e.g. 'model_a.pkl=0.9,model_b.pkl=0.1').
+
+    Returns:
+        dict: {model file: weight}.
+    """
+    routing = {}
+    for route in value.split(','):
+        name, separator, weight = route.strip().partition('=')
+        try:
+            weight = float(weight)
+        except ValueError:
+            weight = None
+        if not name or not separator or weight is None:
+            logger.error(f"Invalid ROUTING_MODELS entry {route!r}, expected model=weight")
+            raise ValueError(f"Invalid ROUTING_MODELS entry {route!r}, expected model=weight")
+        routing[name] = weight
+    return routing
+
+# ROUTING_MODELS ('model_a.pkl=0.9,model_b.forest=0.1') and SHADOW_MODELS (comma-separated)
+# can be overridden with env variables
+routing = os.environ.get('ROUTING_MODELS')
+routing = parse_routing(routing) if routing else ROUTING_MODELS
+shadows = os.environ.get('SHADOW_MODELS')
+shadows = shadows.split(',') if shadows else SHADOW_MODELS
+
+# Serves requests without a model_path and scores the shadow models in the background
+model_router = ModelRouter(model_registry, routing, shadows)
+
+# Maps validated listings straight to feature rows, without pandas
+feature_encoder = FeatureEncoder()
+
+# ASYNC_PREDICT can be overridden with an env variable ('true' or 'false')
+ASYNC_PREDICT = os.environ.get('ASYNC_PREDICT', str(ASYNC_PREDICT)).lower() in ('1', 'true', 'yes')
+
+# Groups concurrent /predict requests into batched predict calls (ASYNC_PREDICT only)
+micro_batcher = MicroBatcher()
+
+# Prometheus metrics of this process, served at /metrics
+REQUEST_SECONDS = Histogram(
+    'predict_request_seconds', 'Latency of the prediction requests',
+    ['endpoint', 'status'], buckets=LATENCY_BUCKETS
+)
+PHASE_SECONDS = Histogram(
+    'predict_phase_seconds', 'Time spent in each phase of the prediction requests',
+    ['endpoint', 'phase'], buckets=LATENCY_BUCKETS
+)
+IN_FLIGHT = Gauge(
+    'predict_requests_in_flight', 'Prediction requests being served', ['endpoint']
+)
+MODEL_CACHE_HIT_RATIO = Gauge(
+    'model_cache_hit_ratio', 'Fraction of model lookups served from the model registry'
+)
+MODEL_CACHE_HIT_RATIO.set_function(
+    lambda: model_registry.hits / max(model_registry.hits + model_registry.misses, 1)
+)
+
+# The endpoints feed the model plain arrays in FEATURE_NAMES order
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Logging is configured once per process, not per request
+    setup_logger(datetime.now().strftime("%Y%m%d_%H%M%S"))
+
+    # PRELOAD_MODELS can be overridden with a comma-separated env variable
+    preload = os.environ.get('PRELOAD_MODELS')
+    preload = preload.split(',') if preload else PRELOAD_MODELS
+    model_registry.warm([Path(MODEL_FOLDER) / name for name in preload])
+    model_router.warm()
+    if ASYNC_PREDICT:
+        micro_batcher.start()
+    yield
+    if ASYNC_PREDICT:
+        await micro_batcher.stop()
+    model_router.shutdown()
+    model_registry.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
+async def track_predict_requests(request: Request, call_next):
+    endpoint = request.url.path
+    # Only the prediction routes, so unknown paths do not add label values
+    if endpoint not in ('/predict', '/predict/batch'):
+        return await call_next(request)
+
+    start = time.perf_counter()
+    status = 500
+    with IN_FLIGHT.labels(endpoint).track_inprogress():
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            REQUEST_SECONDS.labels(endpoint, str(status)).observe(time.perf_counter() - start)
+    return response
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/models/stats")
+def model_stats():
+    return model_router.stats()
 
 class ListingInput(BaseModel):
     id: int
@@ -27,61 +153,256 @@ class ListingInput(BaseModel):
     longitude: float
 
 class ModelToLoad(BaseModel):
-    model_path: str
+    model_path: Optional[str] = None
 
-@app.post("/predict")
-def predict_price_category(input_data: ListingInput, model_file: ModelToLoad):
-    # Get the current time for unique file naming
-    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+def resolve_model(model_file: Optional[ModelToLoad], key, endpoint: str):
+    """
+    Load the requested model, or the routed one when the request names no model.
 
-    # Setup logger
-    setup_logger(current_time)
-    logger = get_logger(__name__)
+    Args:
+        model_file (ModelToLoad): The model file, relative to MODEL_FOLDER, or None.
+        key: The routing key of the request (the listing id).
+        endpoint (str): The endpoint, for the phase metrics.
 
-    try:
+    Returns:
+        tuple: The model and the routed model file (None when the request named the model).
+    """
+    route = None
+    if model_file is not None and model_file.model_path:
         model_path = Path(MODEL_FOLDER) / model_file.model_path
-        # Check if the model file exists
-        if not model_path.exists():
-            logger.error(f"Model file not found: {model_path}")
+    elif model_router.enabled:
+        route = model_router.choose(key)
+        model_path = Path(MODEL_FOLDER) / route
+    else:
+        logger.error("No model_path given and no ROUTING_MODELS configured")
+        raise HTTPException(
+            status_code=400,
+            detail="No model_path given and no ROUTING_MODELS configured"
+        )
+
+    # Check if the model file exists
+    if not model_path.exists():
+        logger.error(f"Model file not found: {model_path}")
+        raise HTTPException(
+            status_code=404,
+            detail=f"Model file not found: {model_path}"
+        )
+
+    with PHASE_SECONDS.labels(endpoint, 'model_load').time():
+        model = model_registry.get_model(model_path)
+    return model, route
+
+def prepare_listing(input_data: ListingInput, model_file: Optional[ModelToLoad],
+                    copy_features: bool = False):
+    """
+    Load the requested (or routed) model and map the listing to the model features.
+
+    Args:
+        input_data (ListingInput): The listing to predict.
+        model_file (ModelToLoad): The model file, relative to MODEL_FOLDER, or None.
+        copy_features (bool): Whether to return a copy of the feature row, for callers
+            that use it after leaving the current thread.
+
+    Returns:
+        tuple: The model, the routed model file (or None) and the (1, n_features)
+            feature row of the listing. Unless copied, the row is reused by the next
+            listing mapped on the same thread.
+    """
+    model, route = resolve_model(model_file, input_data.id, '/predict')
+
+    with PHASE_SECONDS.labels('/predict', 'mapping').time():
+        # The fields were validated by pydantic, unknown categories are rejected here
+        try:
+            features = feature_encoder.encode(input_data)
+        except UnknownCategory as e:
             raise HTTPException(
-                status_code=404,
-                detail=f"Model file not found: {model_path}"
+                status_code=400, detail=f"{e} for listing: {input_data.id}"
             )
+        if copy_features:
+            features = features.copy()
+        logger.debug("Features: %s", features)
+    return model, route, features
 
-        logger.info(f"Loading model from {model_path}")
+def probability_fields(proba: np.ndarray, classes, return_proba: bool, top_k: int,
+                       single: bool = False) -> dict:
+    """
+    Build the optional probability fields of a response from one predict_proba pass.
 
-        model_handler = ModelHandler()
-        model = model_handler.load_model(model_path)
+    The fields are column-oriented: the category names are listed once and every
+    other field holds one list per listing (or the list of the only listing).
 
-        # Convert input data to a pandas DataFrame
-        data = pd.DataFrame([input_data.model_dump()])
-        logger.info(f"Data: \n{data}")
+    Args:
+        proba (np.ndarray): The (n_listings, n_classes) predicted probabilities.
+        classes: The classes of the probability columns (the model's classes_).
+        return_proba (bool): Whether to include the probability of every category.
+        top_k (int): The number of most probable categories to include (0 for none).
+        single (bool): Whether the response is for a single listing.
 
-        # Check if all required columns are present
-        missing_columns = set(FEATURE_NAMES) - set(data.columns)
-        if missing_columns:
-            logger.error(f"Missing required columns: {missing_columns}")
-            raise HTTPException(status_code=400, detail=f"Missing required columns: {missing_columns}")
+    Returns:
+        dict: The 'categories', 'probabilities', 'top_k_categories' and
+            'top_k_probabilities' fields that were requested.
+    """
+    def to_list(array):
+        return array[0].tolist() if single else array.tolist()
 
-        # Select only the required columns
-        data = data[FEATURE_NAMES]
+    fields = {}
+    if return_proba:
+        fields['categories'] = FeatureEncoder.to_category_names(classes).tolist()
+        fields['probabilities'] = to_list(np.round(proba, PROBA_DECIMALS))
+    if top_k:
+        names, top_proba = FeatureEncoder.top_k_categories(proba, classes, top_k)
+        fields['top_k_categories'] = to_list(names)
+        fields['top_k_probabilities'] = to_list(np.round(top_proba, PROBA_DECIMALS))
+    return fields
 
-        # Map the columns to the correct values
-        data_prep = DataPreparation(data)
-        data_prep.mapping_columns()
-        logger.info(f"Data: \n{data_prep.df}")
+def predict_price_category(input_data: ListingInput, model_file: Optional[ModelToLoad] = None,
+                           return_proba: bool = False,
+                           top_k: int = Query(0, ge=0, le=len(MAP_CATEGORY))):
+    try:
+        model, route, features = prepare_listing(input_data, model_file)
 
         # Make prediction and map to category
-        prediction = model.predict(data_prep.df)
+        with PHASE_SECONDS.labels('/predict', 'predict').time():
+            if return_proba or top_k:
+                # The category is the argmax of the same pass, predict is not run again
+                proba = model.predict_proba(features)
+                prediction = model.classes_.take(np.argmax(proba, axis=1))
+            else:
+                prediction = model.predict(features)
         predicted_category = MAP_CATEGORY[str(prediction[0])].capitalize()
         logger.info(f"Prediction: {prediction[0]}")
         logger.info(f"Predicted category: {predicted_category}")
 
-        return {"id": input_data.id, "price_category": predicted_category}
+        with PHASE_SECONDS.labels('/predict', 'serialization').time():
+            response = {"id": input_data.id, "price_category": predicted_category}
+            if route is not None:
+                response["model"] = route
+            if return_proba or top_k:
+                response.update(probability_fields(
+                    proba, model.classes_, return_proba, top_k, single=True
+                ))
+            response = JSONResponse(response)
+
+        # Shadow models score the listing in the background
+        if route is not None:
+            model_router.observe(route, features, prediction)
+        return response
 
+    except HTTPException:
+        raise
     except ValidationError as e:
         raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
+
+async def predict_price_category_async(input_data: ListingInput,
+                                       model_file: Optional[ModelToLoad] = None,
+                                       return_proba: bool = False,
+                                       top_k: int = Query(0, ge=0, le=len(MAP_CATEGORY))):
+    try:
+        # Model loading and mapping block, so they stay off the event loop
+        # The row is copied in the worker thread, before another request can reuse it
+        model, route, features = await run_in_threadpool(
+            prepare_listing, input_data, model_file, True
+        )
+        features = features[0]
+
+        # Queued and predicted together with the concurrent requests (queue wait included)
+        with PHASE_SECONDS.labels('/predict', 'predict').time():
+            if return_proba or top_k:
+                proba = await micro_batcher.predict(model, features, method='predict_proba')
+                proba = proba[np.newaxis]
+                prediction = model.classes_[np.argmax(proba[0])]
+            else:
+                prediction = await micro_batcher.predict(model, features)
+        predicted_category = MAP_CATEGORY[str(int(prediction))].capitalize()
+        logger.info(f"Prediction: {prediction}")
+        logger.info(f"Predicted category: {predicted_category}")
+
+        with PHASE_SECONDS.labels('/predict', 'serialization').time():
+            response = {"id": input_data.id, "price_category": predicted_category}
+            if route is not None:
+                response["model"] = route
+            if return_proba or top_k:
+                response.update(probability_fields(
+                    proba, model.classes_, return_proba, top_k, single=True
+                ))
+            response = JSONResponse(response)
+
+        # Shadow models score the listing in the background
+        if route is not None:
+            model_router.observe(route, features, [prediction])
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"An error occurred: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
+app.post("/predict")(predict_price_category_async if ASYNC_PREDICT else predict_price_category)
+
+
+@app.post("/predict/batch")
+def predict_price_category_batch(listings: list[ListingInput],
+                                 model_file: Optional[ModelToLoad] = None,
+                                 return_proba: bool = False,
+                                 top_k: int = Query(0, ge=0, le=len(MAP_CATEGORY))):
+    try:
+        if len(listings) > MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch size {len(listings)} exceeds the limit of {MAX_BATCH_SIZE}"
+            )
+
+        # A routed batch is served by a single model, picked from its first listing
+        model, route = resolve_model(
+            model_file, listings[0].id if listings else None, '/predict/batch'
+        )
+
+        # Build the feature columns of the whole batch, rejecting unknown categories
+        with PHASE_SECONDS.labels('/predict/batch', 'mapping').time():
+            try:
+                features = feature_encoder.encode_many(listings)
+            except UnknownCategory as e:
+                unknown_ids = [listings[row].id for row in e.rows]
+                raise HTTPException(
+                    status_code=400, detail=f"{e} for listings: {unknown_ids}"
+                )
+
+        # One predict call for the whole batch
+        with PHASE_SECONDS.labels('/predict/batch', 'predict').time():
+            if return_proba or top_k:
+                # One predict_proba pass gives the categories and their probabilities
+                proba = model.predict_proba(features) if len(listings) \
+                    else np.empty((0, len(model.classes_)))
+                predictions = model.classes_.take(np.argmax(proba, axis=1))
+            else:
+                predictions = model.predict(features) if len(listings) else np.empty(0, dtype=int)
+        logger.info(f"Predicted {len(listings)} listings")
+
+        with PHASE_SECONDS.labels('/predict/batch', 'serialization').time():
+            response = {
+                "ids": [listing.id for listing in listings],
+                "price_categories": FeatureEncoder.to_category_names(predictions).tolist()
+            }
+            if route is not None:
+                response["model"] = route
+            if return_proba or top_k:
+                response.update(probability_fields(proba, model.classes_, return_proba, top_k))
+            response = JSONResponse(response)
+
+        # Shadow models score the batch in the background
+        if route is not None:
+            model_router.observe(route, features, predictions)
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"An error occurred: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
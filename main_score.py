@@ -0,0 +1,41 @@
+from config.classifier_config import MODEL_FOLDER, SCORING_CHUNK_SIZE
+
+from src.batch_scorer import BatchScorer
+from src.setup_logger import setup_logger, get_logger
+
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Score a JSONL or CSV file of listings with a trained model."
+    )
+    parser.add_argument("input_path", help="Listings to score (.jsonl or .csv)")
+    parser.add_argument("output_path", help="Where to write the results (.jsonl or .csv)")
+    parser.add_argument("--model", required=True,
+                        help=f"Model file name inside {MODEL_FOLDER}")
+    parser.add_argument("--chunk-size", type=int, default=SCORING_CHUNK_SIZE,
+                        help="Number of listings read per chunk")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes (0 uses every core)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    # Get the current time for unique file naming
+    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    # Setup logger
+    setup_logger(current_time)
+    logger = get_logger(__name__)
+
+    model_path = Path(MODEL_FOLDER) / args.model
+    logger.info(f"Scoring {args.input_path} with {model_path}")
+
+    scorer = BatchScorer(model_path, chunk_size=args.chunk_size, n_workers=args.workers)
+    scorer.score_file(args.input_path, args.output_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+from config.preprocessing_config import (
+    PROCESSED_FOLDER, PROCESSED_FORMAT, TARGET_COLUMN, USE_STAGE_CACHE
+)
+from config.classifier_config import (
+    FEATURE_NAMES, MODEL_FOLDER, RESULTS_FOLDER, SEARCH_N_ITER, SEARCH_WORKERS
+)
+
+from src.data_preprocessor import DataProcessor
+from src.data_preparation import DataPreparation
+from src.hyperparameter_search import HyperparameterSearch
+from src.model_handler import ModelHandler
+from src.model_evaluator import Evaluator
+from src.stage_cache import StageCache
+from src.setup_logger import setup_logger, get_logger
+
+import argparse
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Search the classifier hyperparameters (SEARCH_SPACE in config/classifier_config.py)."
+    )
+    parser.add_argument("--n-iter", type=int, default=SEARCH_N_ITER,
+                        help="Number of sampled candidates (default: the full grid)")
+    parser.add_argument("--workers", type=int, default=SEARCH_WORKERS,
+                        help="Number of worker processes (0 uses every core)")
+    parser.add_argument("--refit", action="store_true",
+                        help="Retrain the best candidate on the whole training set and save it")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    # Get the current time for unique file naming
+    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    # Setup logger
+    setup_logger(current_time)
+    logger = get_logger(__name__)
+
+    # Load the processed data, or process the raw data (cached across runs)
+    data_processor = DataProcessor()
+    PROCESSED_PATH = os.environ.get('PROCESSED_PATH')
+    if PROCESSED_PATH:
+        logger.info(f"PROCESSED_PATH is set to: {PROCESSED_PATH}")
+        data_processor.load_processed(PROCESSED_PATH, columns=FEATURE_NAMES + [TARGET_COLUMN])
+    else:
+        SRC_PATH = os.environ.get('SRC_PATH', "data/raw/listings.csv")
+        logger.info(f"Using source data: {SRC_PATH}")
+        processed_path = Path(PROCESSED_FOLDER) / \
+            f'processed_listings_{current_time}.{PROCESSED_FORMAT}'
+        cache = StageCache() if USE_STAGE_CACHE else None
+        data_processor.process_data(SRC_PATH, processed_path, cache=cache)
+
+    # The test split is the same as in main_train and is only used by --refit
+    data_prep = DataPreparation(data_processor.df)
+    data_prep.mapping_columns()
+    X_train, X_test, y_train, y_test = data_prep.split_data()
+
+    # Run the search and save the leaderboard
+    search = HyperparameterSearch(n_iter=args.n_iter, n_workers=args.workers)
+    search.run(X_train, y_train)
+    search.save_leaderboard(Path(RESULTS_FOLDER) / f'search_{current_time}.json')
+
+    # Retrain the best candidate and evaluate it on the test set
+    if args.refit:
+        model_handler = ModelHandler()
+        model_handler.train_model(X_train, y_train, **search.leaderboard[0]['params'])
+        results = Evaluator.evaluate(model_handler.model, X_test, y_test)
+        results['params'] = search.leaderboard[0]['params']
+        model_handler.save_model(Path(MODEL_FOLDER) / f'model_{current_time}.pkl')
+        with open(Path(RESULTS_FOLDER) / f'results_{current_time}.json', 'w') as f:
+            json.dump(results, f)
+
+if __name__ == "__main__":
+    main()
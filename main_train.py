@@ -1,12 +1,25 @@
-from config.preprocessing_config import PROCESSED_FOLDER
-from config.classifier_config import MODEL_FOLDER, RESULTS_FOLDER
+from config.preprocessing_config import (
+    PROCESSED_FOLDER, PROCESSED_FORMAT, TARGET_COLUMN, USE_STAGE_CACHE
+)
+from config.classifier_config import (
+    FEATURE_NAMES, MODEL_FOLDER, RESULTS_FOLDER, EXPORT_COMPILED_MODEL, COMPILED_MODEL_SUFFIX,
+    BUILD_PREDICTION_TABLE, MAX_PREDICTION_TABLE_SIZE, GROW_N_TREES, GROW_REPLACE, LINEAGE_PATH,
+    COMPUTE_PERMUTATION_IMPORTANCE, PROFILE_MEMORY, COMPRESS_MODEL, COMPRESS_VALIDATION_SPLIT,
+    RANDOM_STATE_SPLIT
+)
 
 from src.data_preprocessor import DataProcessor
 from src.data_preparation import DataPreparation
 from src.model_handler import ModelHandler
 from src.model_evaluator import Evaluator
+from src.prediction_table import PredictionTable
+from src.stage_cache import StageCache
+from src.stage_timer import StageTimer
+from src.streaming_trainer import StreamingTrainer
 from src.setup_logger import setup_logger, get_logger
 
+from sklearn.model_selection import train_test_split
+
 import os
 import json
 from datetime import datetime
@@ -20,40 +33,158 @@ def main():
     setup_logger(current_time)
     logger = get_logger(__name__)
 
-    # Get SRC_PATH from environment variable
-    SRC_PATH = os.environ.get('SRC_PATH')
-    if SRC_PATH:
-        logger.info(f"SRC_PATH is set to: {SRC_PATH}")
-    else:
-        SRC_PATH = "data/raw/listings.csv"
-        logger.info(f"SRC_PATH is not set. Using default path: {SRC_PATH}")
+    # Get PROCESSED_PATH from environment variable
+    PROCESSED_PATH = os.environ.get('PROCESSED_PATH')
+
+    # Get DELTA_PATH from environment variable
+    DELTA_PATH = os.environ.get('DELTA_PATH')
+
+    # Get TRAIN_MODE from environment variable ('stream' trains out of core)
+    TRAIN_MODE = os.environ.get('TRAIN_MODE', 'memory')
 
-    # Initialize the data processor and process the raw data
-    data_processor = DataProcessor()
+    # Time of every step (and its peak memory with PROFILE_MEMORY), saved with the results
+    timer = StageTimer(trace_memory=PROFILE_MEMORY)
+
+    data_processor = DataProcessor(timer=timer)
     processed_path = Path(PROCESSED_FOLDER) / \
-        f'processed_listings_{current_time}.csv'
-    data_processor.process_data(SRC_PATH, processed_path)
+        f'processed_listings_{current_time}.{PROCESSED_FORMAT}'
+    if DELTA_PATH:
+        # Merge the daily delta into the latest processed snapshot
+        snapshot_path = DataProcessor.latest_snapshot()
+        logger.info(f"DELTA_PATH is set to: {DELTA_PATH}. Updating snapshot: {snapshot_path}")
+        with timer.stage('process_delta'):
+            data_processor.process_delta(DELTA_PATH, snapshot_path, processed_path)
+    elif PROCESSED_PATH and TRAIN_MODE == 'stream':
+        # The processed file is streamed by the trainer, nothing is loaded here
+        logger.info(f"PROCESSED_PATH is set to: {PROCESSED_PATH}. Training out of core")
+    elif PROCESSED_PATH:
+        # Train on an existing processed dataset, reading only the training columns
+        logger.info(f"PROCESSED_PATH is set to: {PROCESSED_PATH}")
+        with timer.stage('load_processed'):
+            data_processor.load_processed(PROCESSED_PATH, columns=FEATURE_NAMES + [TARGET_COLUMN])
+    else:
+        # Get SRC_PATH from environment variable
+        SRC_PATH = os.environ.get('SRC_PATH')
+        if SRC_PATH:
+            logger.info(f"SRC_PATH is set to: {SRC_PATH}")
+        else:
+            SRC_PATH = "data/raw/listings.csv"
+            logger.info(f"SRC_PATH is not set. Using default path: {SRC_PATH}")
 
-    # Prepare the processed data for model training
-    data_prep = DataPreparation(data_processor.df)
-    data_prep.mapping_columns()  # Map categorical columns to numerical values
-    X_train, X_test, y_train, y_test = data_prep.split_data()
+        # Process the raw data, reusing the cached stages of previous runs
+        cache = StageCache() if USE_STAGE_CACHE else None
+        with timer.stage('process_data'):
+            data_processor.process_data(SRC_PATH, processed_path, cache=cache)
+
+    # Get BASE_MODEL from environment variable
+    BASE_MODEL = os.environ.get('BASE_MODEL')
 
-    # Initialize the model handler and train the model
     model_handler = ModelHandler()
-    model_handler.train_model(X_train, y_train)
+    X_train = None
+    if TRAIN_MODE == 'stream':
+        # Train and evaluate batch by batch on the processed file
+        if BASE_MODEL:
+            logger.warning("BASE_MODEL is ignored when training out of core")
+            BASE_MODEL = None
+        stream_path = PROCESSED_PATH or processed_path
+        trainer = StreamingTrainer()
+        with timer.stage('train_model_stream'):
+            model_handler.train_model_stream(stream_path, trainer)
+        with timer.stage('evaluate'):
+            results = trainer.evaluate(model_handler.model, stream_path)
+    else:
+        # Prepare the processed data for model training
+        with timer.stage('prepare_data'):
+            data_prep = DataPreparation(data_processor.df)
+            data_prep.mapping_columns()  # Map categorical columns to numerical values
+            X_train, X_test, y_train, y_test = data_prep.split_data()
+            if COMPRESS_MODEL:
+                # The compression picks trees on rows the forest was not trained on
+                X_train, X_valid, y_train, y_valid = train_test_split(
+                    X_train, y_train, test_size=COMPRESS_VALIDATION_SPLIT,
+                    random_state=RANDOM_STATE_SPLIT, stratify=y_train
+                )
 
-    # Evaluate the trained model
-    results = Evaluator.evaluate(model_handler.model, X_test, y_test)
+        # Initialize the model handler and train the model
+        if BASE_MODEL:
+            # Grow the previous model on the new data instead of training from scratch
+            logger.info(f"BASE_MODEL is set to: {BASE_MODEL}")
+            with timer.stage('load_model'):
+                model_handler.load_model(Path(MODEL_FOLDER) / BASE_MODEL)
+            with timer.stage('grow_model'):
+                model_handler.grow_model(X_train, y_train, GROW_N_TREES, replace=GROW_REPLACE)
+        else:
+            with timer.stage('train_model'):
+                model_handler.train_model(X_train, y_train)
 
-    # Save the trained model
+        # Evaluate the trained model
+        with timer.stage('evaluate'):
+            results = Evaluator.evaluate(model_handler.model, X_test, y_test)
+        if COMPUTE_PERMUTATION_IMPORTANCE:
+            with timer.stage('permutation_importance'):
+                results['permutation_importances'] = Evaluator.get_permutation_importances(
+                    model_handler.model, X_test, y_test
+                )
+    results['lineage'] = {'parent': BASE_MODEL, **model_handler.lineage}
+
+    # Save the prediction table before the model, so it is there when the model is loaded.
+    # The compiled copy holds the same trees, so it gets the same table
     model_path = Path(MODEL_FOLDER) / f'model_{current_time}.pkl'
-    model_handler.save_model(model_path)
+    compiled_path = Path(MODEL_FOLDER) / f'model_{current_time}{COMPILED_MODEL_SUFFIX}'
+    if BUILD_PREDICTION_TABLE and X_train is not None:
+        grid_size = PredictionTable.grid_size(X_train)
+        if grid_size <= MAX_PREDICTION_TABLE_SIZE:
+            with timer.stage('build_prediction_table'):
+                table = model_handler.build_prediction_table(X_train)
+                table.save(PredictionTable.path_for(model_path))
+                if EXPORT_COMPILED_MODEL:
+                    table.save(PredictionTable.path_for(compiled_path))
+        else:
+            logger.warning(f"Prediction table skipped, grid of {grid_size} cells "
+                           f"exceeds {MAX_PREDICTION_TABLE_SIZE}")
+
+    # Save the trained model
+    with timer.stage('save_model'):
+        model_handler.save_model(model_path)
 
-    # Save the evaluation results
+    # Save a compiled copy of the model for low-latency serving
+    if EXPORT_COMPILED_MODEL:
+        with timer.stage('compile_model'):
+            compiled_handler = ModelHandler()
+            compiled_handler.model = model_handler.compile_model()
+            compiled_handler.save_model(compiled_path)
+
+    # Save a compressed copy of the model, and its scores, size and latency before and after.
+    # The trees are selected on X_valid, so the comparison is made on the held-out X_test
+    if COMPRESS_MODEL and X_train is not None:
+        with timer.stage('compress_model'):
+            compressed_handler = ModelHandler()
+            compressed_handler.model = model_handler.compress_model(X_valid, y_valid)
+            compressed_handler.save_model(
+                Path(MODEL_FOLDER) / f'model_{current_time}_compressed{COMPILED_MODEL_SUFFIX}'
+            )
+        with open(Path(RESULTS_FOLDER) / f'compression_{current_time}.json', 'w') as f:
+            json.dump({
+                **model_handler.compression,
+                'test': {
+                    'before': Evaluator.serving_report(model_handler.model, X_test, y_test),
+                    'after': Evaluator.serving_report(compressed_handler.model, X_test, y_test)
+                }
+            }, f)
+
+    # Save the evaluation results, with the time and peak memory of every step
+    results['stage_timings'] = timer.as_dict()
+    logger.info(f"Stage timings: {results['stage_timings']}")
     results_path = Path(RESULTS_FOLDER) / f'results_{current_time}.json'
     with open(results_path, 'w') as f:
         json.dump(results, f)
 
+    # Record the model version lineage
+    with open(LINEAGE_PATH, 'a') as f:
+        f.write(json.dumps({
+            'model': model_path.name, 'created': current_time, **results['lineage'],
+            'accuracy': results['accuracy'], 'roc_auc': results.get('roc_auc')
+        }) + '\n')
+
 if __name__ == "__main__":
     main()
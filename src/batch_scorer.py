@@ -0,0 +1,201 @@
+import os
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from config.classifier_config import FEATURE_NAMES, SCORING_CHUNK_SIZE
+from src.data_preparation import DataPreparation
+from src.feature_encoder import FeatureEncoder
+from src.model_loader import load_model
+
+from src.setup_logger import get_logger
+
+# Chunks are scored as plain arrays in FEATURE_NAMES order
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+class BatchScorer:
+    """
+    A class for scoring large listing files in bounded memory.
+
+    The input file (JSONL with one listing per line, or CSV) is streamed in
+    fixed-size chunks. Every chunk goes through the same feature mapping as the
+    API and the results are appended to the output file as soon as they are
+    ready. Chunks can be spread across a pool of worker processes.
+
+    Attributes:
+        model_path (str): The file path of the model used for scoring.
+        chunk_size (int): The number of listings read per chunk.
+        n_workers (int): The number of worker processes (1 scores in-process).
+
+    Methods:
+        iter_chunks(input_path: str) -> Iterator[pd.DataFrame]:
+            Stream the input file in chunks of chunk_size rows.
+        score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+            Predict the price category of every listing in the chunk.
+        score_file(input_path: str, output_path: str) -> int:
+            Score the input file and write the results to the output file.
+    """
+
+    def __init__(self, model_path: str, chunk_size: int = SCORING_CHUNK_SIZE,
+                 n_workers: int = 1):
+        self.logger = get_logger(__name__)
+        self.model_path = model_path
+        self.chunk_size = chunk_size
+        self.n_workers = n_workers or os.cpu_count()
+        self.model = None
+
+    def iter_chunks(self, input_path: str) -> Iterator[pd.DataFrame]:
+        """
+        Stream the input file in chunks of chunk_size rows.
+
+        Args:
+            input_path (str): The file path of a .jsonl or .csv file.
+
+        Yields:
+            pd.DataFrame: The next chunk of listings.
+        """
+        # Check if the file exists
+        if not os.path.exists(input_path):
+            self.logger.error(f"The file at {input_path} does not exist")
+            raise FileNotFoundError(f"The file at {input_path} does not exist")
+
+        if str(input_path).endswith(('.jsonl', '.json')):
+            reader = pd.read_json(input_path, lines=True, chunksize=self.chunk_size)
+        elif str(input_path).endswith('.csv'):
+            reader = pd.read_csv(input_path, chunksize=self.chunk_size)
+        else:
+            self.logger.error(f"Unsupported input format: {input_path}")
+            raise ValueError(f"Unsupported input format: {input_path}")
+
+        with reader:
+            yield from reader
+
+    def score_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Predict the price category of every listing in the chunk.
+
+        Listings with a missing value, or an unknown neighbourhood or room type,
+        get an empty category.
+
+        Args:
+            chunk (pd.DataFrame): The listings to score.
+
+        Returns:
+            pd.DataFrame: A DataFrame with the 'id' and 'price_category' columns.
+        """
+        if self.model is None:
+            self.model = load_model(self.model_path)
+
+        # Check if all required columns are present
+        missing_columns = set(FEATURE_NAMES) - set(chunk.columns)
+        if missing_columns:
+            self.logger.error(f"Missing required columns: {missing_columns}")
+            raise ValueError(f"Missing required columns: {missing_columns}")
+
+        data_prep = DataPreparation(chunk[FEATURE_NAMES].copy())
+        data_prep.mapping_columns()
+        features = data_prep.to_feature_array()
+
+        categories = np.full(len(chunk), None, dtype=object)
+        known = ~np.isnan(features).any(axis=1)
+        if known.any():
+            predictions = self.model.predict(features[known])
+            categories[known] = FeatureEncoder.to_category_names(predictions)
+        if not known.all():
+            # A missing field is NaN before the mapping, an unknown category only after it
+            missing = chunk[FEATURE_NAMES].isna().to_numpy().any(axis=1)
+            n_missing = int(missing.sum())
+            n_unknown = int((~known & ~missing).sum())
+            if n_missing:
+                self.logger.warning(f"{n_missing} listings with missing values")
+            if n_unknown:
+                self.logger.warning(f"{n_unknown} listings with unknown categories")
+
+        return pd.DataFrame({
+            'id': chunk['id'].to_numpy(),
+            'price_category': categories
+        })
+
+    def score_file(self, input_path: str, output_path: str) -> int:
+        """
+        Score the input file and write the results to the output file.
+
+        Results are written in input order. At most two chunks per worker are in
+        flight at any time, so memory stays bounded by the chunk size.
+
+        Args:
+            input_path (str): The file path of a .jsonl or .csv file.
+            output_path (str): The file path of the .jsonl or .csv results.
+
+        Returns:
+            int: The number of listings scored.
+        """
+        writer = _ResultWriter(output_path)
+        n_rows = 0
+
+        try:
+            if self.n_workers == 1:
+                for chunk in self.iter_chunks(input_path):
+                    n_rows += writer.write(self.score_chunk(chunk))
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=self.n_workers,
+                    initializer=_init_worker,
+                    initargs=(self.model_path, self.chunk_size)
+                ) as executor:
+                    pending = deque()
+                    for chunk in self.iter_chunks(input_path):
+                        pending.append(executor.submit(_score_chunk_in_worker, chunk))
+                        if len(pending) >= 2 * self.n_workers:
+                            n_rows += writer.write(pending.popleft().result())
+                    while pending:
+                        n_rows += writer.write(pending.popleft().result())
+        finally:
+            writer.close()
+
+        self.logger.info(f"Scored {n_rows} listings from {input_path} into {output_path}")
+        return n_rows
+
+class _ResultWriter:
+    """
+    Append scored chunks to a .jsonl or .csv file.
+    """
+
+    def __init__(self, path: str):
+        if not str(path).endswith(('.jsonl', '.csv')):
+            raise ValueError(f"Unsupported output format: {path}")
+        self.is_jsonl = str(path).endswith('.jsonl')
+        self.file = open(path, 'w', newline='')
+        self.header = True
+
+    def write(self, results: pd.DataFrame) -> int:
+        if self.is_jsonl:
+            if len(results):
+                results.to_json(self.file, orient='records', lines=True)
+        else:
+            results.to_csv(self.file, index=False, header=self.header)
+            self.header = False
+        return len(results)
+
+    def close(self) -> None:
+        self.file.close()
+
+# Scorer owned by each worker process, so the model is loaded once per worker
+_worker_scorer = None
+
+def _init_worker(model_path: str, chunk_size: int) -> None:
+    global _worker_scorer
+    _worker_scorer = BatchScorer(model_path, chunk_size)
+    _worker_scorer.model = load_model(model_path)
+    # Parallelism comes from the pool, avoid oversubscribing the cores
+    # (a prediction table serves the rows outside its grid with its fallback forest)
+    model = getattr(_worker_scorer.model, 'fallback', _worker_scorer.model)
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = 1
+
+def _score_chunk_in_worker(chunk: pd.DataFrame) -> pd.DataFrame:
+    return _worker_scorer.score_chunk(chunk)
@@ -0,0 +1,398 @@
+import json
+import os
+import struct
+import numpy as np
+
+from src.setup_logger import get_logger
+
+class CompiledForest:
+    """
+    A tree ensemble exported into flat NumPy arrays.
+
+    The nodes of every tree are concatenated into a handful of arrays, with the
+    root of each tree given by roots. Leaves point to themselves, so all trees
+    are walked for a whole batch at once, one vectorized step per tree level,
+    without any per-tree Python or joblib dispatch. Predictions match the
+    original RandomForestClassifier.
+
+    Attributes:
+        feature (np.ndarray): The feature tested at each node.
+        threshold (np.ndarray): The split threshold at each node.
+        left (np.ndarray): The left child of each node (itself for leaves).
+        right (np.ndarray): The right child of each node (itself for leaves).
+        missing_left (np.ndarray): Whether missing values go to the left child.
+        value (np.ndarray): The class probabilities at each node.
+        roots (np.ndarray): The root node of each tree.
+        classes_ (np.ndarray): The class labels.
+        feature_importances_ (np.ndarray): The impurity-based feature importances.
+        max_depth (int): The depth of the deepest tree.
+
+    Methods:
+        from_sklearn(model) -> CompiledForest:
+            Export a fitted RandomForestClassifier.
+        predict_proba(X) -> np.ndarray:
+            Predict class probabilities for X.
+        predict(X) -> np.ndarray:
+            Predict classes for X.
+        node_depths() -> np.ndarray:
+            Return the depth of every node.
+        truncate(max_depth: int) -> CompiledForest:
+            Return the forest with every tree cut at max_depth.
+        astype(threshold_dtype, value_dtype) -> CompiledForest:
+            Return the forest with thresholds and values stored in smaller dtypes.
+        save(path: str) -> None:
+            Save the arrays to a .npz or memory-mappable .forest file.
+        load(path: str) -> CompiledForest:
+            Load a compiled forest from a .npz or .forest file.
+    """
+
+    # Rows walked together, keeps the (rows, trees) work arrays cache-sized
+    BLOCK_SIZE = 1024
+
+    # Layout of a .forest file: magic, header length, JSON header, aligned arrays
+    MAGIC = b'CFOREST1'
+    ALIGNMENT = 64
+
+    ARRAYS = (
+        'feature', 'threshold', 'left', 'right', 'missing_left', 'value',
+        'roots', 'classes_', 'feature_importances_'
+    )
+
+    def __init__(self, feature, threshold, left, right, missing_left, value,
+                 roots, classes_, feature_importances_, max_depth,
+                 feature_names_in_=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes_
+        self.feature_importances_ = feature_importances_
+        self.max_depth = int(max_depth)
+        if feature_names_in_ is not None:
+            self.feature_names_in_ = feature_names_in_
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompiledForest":
+        """
+        Export a fitted RandomForestClassifier.
+
+        Args:
+            model: The fitted forest (any ensemble exposing estimators_ of decision trees).
+
+        Returns:
+            CompiledForest: The flat-array version of the forest.
+        """
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            missing.append(getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count)))
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :]
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int16),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            missing_left=np.concatenate(missing).astype(bool),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.array(roots, dtype=np.int32),
+            classes_=np.asarray(model.classes_),
+            feature_importances_=np.asarray(model.feature_importances_),
+            max_depth=max_depth,
+            feature_names_in_=getattr(model, 'feature_names_in_', None)
+        )
+
+    def apply(self, X) -> np.ndarray:
+        """
+        Return the leaf reached by every row in every tree.
+
+        Args:
+            X: The feature matrix.
+
+        Returns:
+            np.ndarray: A (n_rows, n_trees) array of node indices.
+        """
+        # The trees were fitted on float32 inputs
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        flat_X = X.ravel()
+        has_nan = np.isnan(flat_X).any()
+
+        # One (row, tree) pair per entry, only pairs not yet at a leaf are walked
+        nodes = np.tile(self.roots, n_rows)
+        row_offsets = np.repeat(np.arange(n_rows) * n_features, n_trees)
+        active = np.flatnonzero(self.left[nodes] != nodes)
+
+        while active.size:
+            current = nodes[active]
+            values = flat_X[row_offsets[active] + self.feature[current]]
+            go_left = values <= self.threshold[current]
+            if has_nan:
+                go_left = np.where(np.isnan(values), self.missing_left[current], go_left)
+            current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            active = active[self.left[current] != current]
+
+        return nodes.reshape(n_rows, n_trees)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Predict class probabilities for X.
+
+        Listings share a small discrete feature space, so identical rows are
+        walked only once and their probabilities are broadcast back.
+
+        Args:
+            X: The feature matrix.
+
+        Returns:
+            np.ndarray: A (n_rows, n_classes) array of probabilities.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        inverse = None
+        if X.shape[0] > 1:
+            rows = X.view(np.dtype((np.void, X.dtype.itemsize * X.shape[1]))).ravel()
+            _, unique_index, inverse = np.unique(rows, return_index=True, return_inverse=True)
+            X = X[unique_index]
+
+        proba = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, X.shape[0], self.BLOCK_SIZE):
+            block = slice(start, start + self.BLOCK_SIZE)
+            # Summed tree by tree, in the same order as the original forest
+            proba[block] = self.value[self.apply(X[block])].sum(axis=1, dtype=np.float64)
+        if self.value.dtype == np.float64:
+            proba /= self.n_estimators
+        else:
+            # Rounded leaf probabilities do not sum to exactly one
+            proba /= proba.sum(axis=1, keepdims=True)
+
+        return proba if inverse is None else proba[inverse]
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict classes for X.
+
+        Args:
+            X: The feature matrix.
+
+        Returns:
+            np.ndarray: The predicted class of each row.
+        """
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def node_depths(self) -> np.ndarray:
+        """
+        Return the depth of every node.
+
+        Returns:
+            np.ndarray: The depth of each node, 0 for the roots.
+        """
+        depths = np.zeros(len(self.feature), dtype=np.int32)
+        level, depth = np.asarray(self.roots), 0
+        while level.size:
+            depths[level] = depth
+            internal = level[self.left[level] != level]
+            level = np.concatenate([self.left[internal], self.right[internal]])
+            depth += 1
+        return depths
+
+    def truncate(self, max_depth: int) -> "CompiledForest":
+        """
+        Return the forest with every tree cut at max_depth.
+
+        The nodes at max_depth become leaves predicting the class distribution
+        of the training samples that reached them, the nodes below are dropped.
+        The feature importances are kept from the full-depth forest.
+
+        Args:
+            max_depth (int): The depth of the deepest nodes kept.
+
+        Returns:
+            CompiledForest: The truncated forest.
+        """
+        depths = self.node_depths()
+        keep = depths <= max_depth
+        new_index = np.cumsum(keep, dtype=np.int64) - 1
+        nodes = np.flatnonzero(keep)
+        is_leaf = (self.left[nodes] == nodes) | (depths[nodes] == max_depth)
+
+        return CompiledForest(
+            feature=np.where(is_leaf, 0, self.feature[nodes]).astype(self.feature.dtype),
+            threshold=self.threshold[nodes],
+            left=np.where(is_leaf, new_index[nodes], new_index[self.left[nodes]]).astype(np.int32),
+            right=np.where(is_leaf, new_index[nodes], new_index[self.right[nodes]]).astype(np.int32),
+            missing_left=self.missing_left[nodes],
+            value=self.value[nodes],
+            roots=new_index[self.roots].astype(np.int32),
+            classes_=self.classes_,
+            feature_importances_=self.feature_importances_,
+            max_depth=min(self.max_depth, max_depth),
+            feature_names_in_=getattr(self, 'feature_names_in_', None)
+        )
+
+    def astype(self, threshold_dtype=np.float32, value_dtype=np.float16) -> "CompiledForest":
+        """
+        Return the forest with thresholds and values stored in smaller dtypes.
+
+        Inputs are compared as float32, so each threshold is replaced by the
+        largest float32 not above it and every split sends the same rows the
+        same way. Only the leaf probabilities lose precision (about 1e-3
+        relative in float16); they are summed in float64.
+
+        Args:
+            threshold_dtype: The dtype of the split thresholds (float32 or float64).
+            value_dtype: The dtype of the class probabilities (float16, float32 or float64).
+
+        Returns:
+            CompiledForest: The forest with the converted arrays.
+        """
+        threshold = self.threshold.astype(threshold_dtype)
+        if np.dtype(threshold_dtype).itemsize < self.threshold.dtype.itemsize:
+            rounded_up = threshold.astype(self.threshold.dtype) > self.threshold
+            threshold[rounded_up] = np.nextafter(
+                threshold[rounded_up], np.array(-np.inf, dtype=threshold_dtype)
+            )
+
+        return CompiledForest(
+            feature=self.feature,
+            threshold=threshold,
+            left=self.left,
+            right=self.right,
+            missing_left=self.missing_left,
+            value=self.value.astype(value_dtype),
+            roots=self.roots,
+            classes_=self.classes_,
+            feature_importances_=self.feature_importances_,
+            max_depth=self.max_depth,
+            feature_names_in_=getattr(self, 'feature_names_in_', None)
+        )
+
+    def save(self, path: str) -> None:
+        """
+        Save the arrays to a .npz file, or to a memory-mappable .forest file.
+
+        The file is written to a temporary file and then moved into place, so
+        processes that have the previous version mapped keep a valid copy and
+        a registry reloading the model never reads a partly written file.
+
+        Args:
+            path (str): The file path to save the compiled forest to.
+        """
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        arrays['max_depth'] = np.array(self.max_depth)
+        if hasattr(self, 'feature_names_in_'):
+            arrays['feature_names_in_'] = np.asarray(self.feature_names_in_, dtype=str)
+
+        if str(path).endswith('.forest'):
+            self._save_mmap(path, arrays)
+        else:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledForest":
+        """
+        Load a compiled forest from a .npz or .forest file.
+
+        The arrays of a .forest file are memory-mapped read-only instead of read,
+        so loading takes the same time whatever the model size and processes
+        loading the same file share its pages through the page cache.
+
+        Args:
+            path (str): The file path to load the compiled forest from.
+
+        Returns:
+            CompiledForest: The loaded forest.
+        """
+        # Check if the file exists
+        if not os.path.exists(path):
+            get_logger(__name__).error(f"The file at {path} does not exist")
+            raise FileNotFoundError(f"The file at {path} does not exist")
+
+        if str(path).endswith('.forest'):
+            kwargs = cls._load_mmap(path)
+        else:
+            with np.load(path, allow_pickle=False) as arrays:
+                kwargs = {name: arrays[name] for name in arrays.files}
+        kwargs['max_depth'] = int(kwargs['max_depth'])
+        return cls(**kwargs)
+
+    @classmethod
+    def _aligned(cls, size: int) -> int:
+        return -(-size // cls.ALIGNMENT) * cls.ALIGNMENT
+
+    @classmethod
+    def _save_mmap(cls, path: str, arrays: dict) -> None:
+        header = {}
+        offset = 0
+        for name, array in arrays.items():
+            arrays[name] = np.ascontiguousarray(array)
+            header[name] = {
+                'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset
+            }
+            offset += cls._aligned(array.nbytes)
+        header_bytes = json.dumps(header).encode()
+        data_start = cls._aligned(len(cls.MAGIC) + 8 + len(header_bytes))
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(cls.MAGIC)
+            f.write(struct.pack('<Q', len(header_bytes)))
+            f.write(header_bytes)
+            for name, array in arrays.items():
+                f.seek(data_start + header[name]['offset'])
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def _load_mmap(cls, path: str) -> dict:
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(buffer[:len(cls.MAGIC)]) != cls.MAGIC:
+            get_logger(__name__).error(f"Not a compiled forest file: {path}")
+            raise ValueError(f"Not a compiled forest file: {path}")
+
+        start = len(cls.MAGIC) + 8
+        (header_length,) = struct.unpack('<Q', bytes(buffer[len(cls.MAGIC):start]))
+        header = json.loads(bytes(buffer[start:start + header_length]))
+        data_start = cls._aligned(start + header_length)
+
+        return {
+            name: np.ndarray(
+                tuple(spec['shape']), dtype=np.dtype(spec['dtype']),
+                buffer=buffer, offset=data_start + spec['offset']
+            )
+            for name, spec in header.items()
+        }
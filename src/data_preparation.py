@@ -1,11 +1,12 @@
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from config.classifier_config import (
-    MAP_ROOM_TYPE, MAP_NEIGHB, FEATURE_NAMES, SPLIT_RATIO, RANDOM_STATE_SPLIT,
-    TARGET_COLUMN
+    MAP_ROOM_TYPE, MAP_NEIGHB, FEATURE_NAMES, SPLIT_RATIO,
+    RANDOM_STATE_SPLIT, TARGET_COLUMN
 )
 
-from src.setup_logger import get_logger
+from src.setup_logger import get_logger, LazyFormat
 
 class DataPreparation:
     """
@@ -19,6 +20,8 @@ class DataPreparation:
     Methods:
         mapping_columns(self) -> None:
             Map categorical columns to numerical values.
+        to_feature_array(self) -> np.ndarray:
+            Return the model features as a single float array.
         split_data(self) -> tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
             Split the data into training and testing sets.
     """
@@ -26,8 +29,8 @@ class DataPreparation:
     def __init__(self, df: pd.DataFrame) -> None:
         self.logger = get_logger(__name__)
         self.df = df
-        self.logger.info(f"Training columns: {self.df.columns}")
-        self.logger.info(f"Some training data: \n{self.df.head()}")
+        self.logger.debug("Training columns: %s", LazyFormat(list, self.df.columns))
+        self.logger.debug("Some training data: \n%s", LazyFormat(self.df.head))
 
     def mapping_columns(self) -> None:
         """
@@ -37,12 +40,28 @@ class DataPreparation:
         converting categorical values to numerical representations.
         """
         try:
-            self.df["neighbourhood"] = self.df["neighbourhood"].map(MAP_NEIGHB)
-            self.df["room_type"] = self.df["room_type"].map(MAP_ROOM_TYPE)
+            for column, mapping in (("neighbourhood", MAP_NEIGHB), ("room_type", MAP_ROOM_TYPE)):
+                mapped = self.df[column].map(mapping)
+                # Categorical columns are mapped per category, keep the result numeric
+                if isinstance(mapped.dtype, pd.CategoricalDtype):
+                    mapped = mapped.astype(np.float64)
+                self.df[column] = mapped
         except Exception as e:
             self.logger.error(f"Error mapping columns: {e}")
             raise ValueError(f"Error mapping columns: {e}")
 
+    def to_feature_array(self) -> np.ndarray:
+        """
+        Return the model features as a single float array.
+
+        The columns follow the order of FEATURE_NAMES, so the array can be passed
+        straight to the model. Categories missing from the mappings show up as NaN.
+
+        Returns:
+            np.ndarray: A (n_rows, n_features) float array.
+        """
+        return self.df[FEATURE_NAMES].to_numpy(dtype=np.float64)
+
     def split_data(self) -> tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
         """
         Split the data into training and testing sets.
@@ -58,10 +77,10 @@ class DataPreparation:
         y = self.df[TARGET_COLUMN]
 
         self.logger.info(f"Features for training: {FEATURE_NAMES}")
-        self.logger.info(f"Some training data: \n{X.head()}")
+        self.logger.debug("Some training data: \n%s", LazyFormat(X.head))
 
         self.logger.info(f"Target for training: {TARGET_COLUMN}")
-        self.logger.info(f"Some training target: \n{y.head()}")
+        self.logger.debug("Some training target: \n%s", LazyFormat(y.head))
 
         try:
             X_train, X_test, y_train, y_test = train_test_split(
@@ -1,12 +1,22 @@
 import os
+from pathlib import Path
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from pandas.api.types import union_categoricals
+from typing import Iterator
 
 from config.preprocessing_config import (
-    COLUMNS, RENAMED_COLUMNS, FEATURE_AMENITIES, TARGET_COLUMN
+    COLUMNS, RAW_COLUMNS, RAW_DTYPES, RENAMED_COLUMNS, FEATURE_AMENITIES,
+    TARGET_COLUMN, CHUNK_SIZE, PARQUET_COMPRESSION, MIN_PRICE, PRICE_BINS, PRICE_LABELS,
+    PROCESSED_FOLDER, DELETED_COLUMN, SNAPSHOT_PATTERN
 )
 
 from src.setup_logger import get_logger
+from src.stage_cache import StageCache
+from src.stage_timer import StageTimer
 
 class DataProcessor:
     """
@@ -14,48 +24,78 @@ class DataProcessor:
 
     This class provides methods to load, clean, preprocess, and save data from a CSV file.
     It handles various data cleaning tasks such as fixing the bathrooms column,
-    preparing the price column, and preprocessing the amenities column.
+    preparing the price column, and preprocessing the amenities column. Only the
+    needed raw columns are read, with compact dtypes, and the raw file can be
+    processed in chunks so large dumps fit in bounded memory.
 
     Attributes:
         df (pd.DataFrame): The DataFrame to be processed.
+        timer (StageTimer): The time and peak memory of every load, cleaning and save stage.
 
     Methods:
         load_data(path: str) -> None:
             Load data from a CSV file into the DataFrame.
+
+        iter_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+            Read a CSV file in chunks of chunksize rows.
         
         clean_bathrooms_column() -> None:
             Clean the bathrooms column by extracting the number of bathrooms from the text.
+
+        select_columns() -> None:
+            Keep the processed columns and rename them.
         
         prepare_price_column() -> None:
             Prepare the price column by converting it to int, removing outliers, and creating a categorical column.
         
         preprocess_amenities_column() -> None:
             Extract categorical columns from the amenities column and create binary features.
+
+        drop_missing() -> None:
+            Remove the rows with missing values.
         
         save_data(path: str) -> None:
-            Save the processed DataFrame to a CSV file.
+            Save the processed DataFrame to a Parquet or CSV file.
+
+        load_processed(path: str, columns: list[str]) -> None:
+            Load a processed dataset, reading only the given columns.
+        
+        clean_data() -> None:
+            Apply all cleaning and preprocessing steps to the loaded DataFrame.
         
-        process_data(input_path: str, output_path: str) -> None:
+        process_data(input_path: str, output_path: str, chunksize: int, cache: StageCache) -> None:
             Process the data from input to output, applying all preprocessing steps.
+
+        process_delta(delta_path: str, snapshot_path: str, output_path: str) -> None:
+            Merge a delta of new, changed and deleted listings into a processed snapshot.
+
+        latest_snapshot(folder: str) -> str:
+            Return the most recent processed snapshot in folder.
     """
 
-    def __init__(self):
+    def __init__(self, timer: StageTimer = None):
         self.logger = get_logger(__name__)
         self.df = None
+        self.timer = timer or StageTimer()
+
+    def _check_exists(self, path: str) -> None:
+        # Check if the file exists
+        if not os.path.exists(path):
+            self.logger.error(f"The file at {path} does not exist")
+            raise FileNotFoundError(f"The file at {path} does not exist")
 
     def load_data(self, path: str) -> None:
         """
         Load data from a CSV file into the DataFrame.
 
+        Only RAW_COLUMNS are read, with the dtypes from RAW_DTYPES.
+
         Args:
             path (str): The file path of the CSV to be loaded.
         """
-        # Check if the file exists
-        if not os.path.exists(path):
-            self.logger.error(f"The file at {path} does not exist")
-            raise FileNotFoundError(f"The file at {path} does not exist")
+        self._check_exists(path)
 
-        self.df = pd.read_csv(path)
+        self.df = pd.read_csv(path, usecols=RAW_COLUMNS, dtype=RAW_DTYPES)
 
         # Check if the file is empty
         if self.df.empty:
@@ -64,12 +104,33 @@ class DataProcessor:
         else:
             self.logger.info(f"File loaded. Shape of df: {self.df.shape}")
 
+    def iter_chunks(self, path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+        """
+        Read a CSV file in chunks of chunksize rows.
+
+        Only RAW_COLUMNS are read, with the dtypes from RAW_DTYPES.
+
+        Args:
+            path (str): The file path of the CSV to be loaded.
+            chunksize (int): The number of rows per chunk.
+
+        Yields:
+            pd.DataFrame: The next chunk of raw rows.
+        """
+        self._check_exists(path)
+
+        with pd.read_csv(path, usecols=RAW_COLUMNS, dtype=RAW_DTYPES,
+                         chunksize=chunksize) as reader:
+            yield from reader
+
     def clean_bathrooms_column(self) -> None:
         """
         Clean the bathrooms column by extracting the number of bathrooms from the text.
 
         This method drops the original 'bathrooms' column and creates a new 'bathrooms' column
-        with numeric values extracted from the 'bathrooms_text' column.
+        with numeric values extracted from the 'bathrooms_text' column. The column only holds
+        a few dozen distinct texts, so each of them is parsed once and the numbers are
+        broadcast back to every row in a single vectorized pass.
         """
         self.df.drop(columns=['bathrooms'], inplace=True)
 
@@ -83,7 +144,12 @@ class DataProcessor:
             except ValueError:
                 return np.nan
 
-        self.df['bathrooms'] = self.df['bathrooms_text'].apply(num_bathroom_from_text)
+        codes, texts = pd.factorize(self.df['bathrooms_text'])
+        # Missing texts get code -1, which picks the trailing NaN
+        numbers = np.array(
+            [num_bathroom_from_text(text) for text in texts] + [np.nan], dtype=np.float32
+        )
+        self.df['bathrooms'] = numbers[codes]
     
     def prepare_price_column(self) -> None:
         """
@@ -102,13 +168,13 @@ class DataProcessor:
             raise ValueError(f"Error converting price to int: {e}")
 
         # Remove outliers
-        self.df = self.df[self.df['price'] >= 10]        
+        self.df = self.df[self.df['price'] >= MIN_PRICE]
 
         # Create categorical column
         self.df[TARGET_COLUMN] = pd.cut(
             self.df['price'],
-            bins=[10, 90, 180, 400, np.inf],
-            labels=[0, 1, 2, 3]
+            bins=PRICE_BINS,
+            labels=PRICE_LABELS
         )
 
     def preprocess_amenities_column(self) -> None:
@@ -118,49 +184,293 @@ class DataProcessor:
         This method creates new binary columns for each amenity in the predefined list,
         indicating the presence (1) or absence (0) of the amenity. The original 'amenities'
         column is then dropped.
+
+        The amenities lists are split into their items in a single tokenization pass.
+        Each distinct item is then matched once against all of FEATURE_AMENITIES, and
+        the matches are scattered into a multi-hot matrix, so the cost does not grow
+        with one text scan per amenity. An amenity is present when it is a substring
+        of one of the items, which gives the same result as searching the whole text
+        (amenity names contain no quotes).
+
+        A listing without an amenities list (NaN) gets 0 for every amenity.
         """
-        for amenity in FEATURE_AMENITIES:
-            self.df[amenity.replace(' ', '_')] = self.df['amenities'].str.contains(amenity).astype(int)
+        amenities = pa.array(self.df['amenities'], type=pa.large_string(), from_pandas=True)
+        if amenities.null_count:
+            self.logger.warning(f"{amenities.null_count} listings without amenities, "
+                                "their amenity columns are set to 0")
+        # '["TV", "Wifi"]' -> ['"TV', 'Wifi"'], the leftover quotes cannot match an amenity
+        items = pc.split_pattern(pc.utf8_trim(amenities, characters='[]'), pattern='", "')
+        parents = pc.list_parent_indices(items).to_numpy()
+        encoded = pc.dictionary_encode(pc.list_flatten(items))
+        codes = encoded.indices.to_numpy()
+
+        # Match every distinct item against every amenity
+        vocabulary = encoded.dictionary.to_pylist()
+        matches = np.array(
+            [[amenity in item for amenity in FEATURE_AMENITIES] for item in vocabulary],
+            dtype=bool
+        ).reshape(len(vocabulary), len(FEATURE_AMENITIES))
+
+        # Scatter the matches of the relevant items into a multi-hot matrix
+        relevant = np.flatnonzero(matches.any(axis=1)[codes])
+        item_positions, amenity_indices = np.nonzero(matches[codes[relevant]])
+        multi_hot = np.zeros((len(self.df), len(FEATURE_AMENITIES)), dtype=bool)
+        multi_hot[parents[relevant[item_positions]], amenity_indices] = True
+
+        for i, amenity in enumerate(FEATURE_AMENITIES):
+            self.df[amenity.replace(' ', '_')] = multi_hot[:, i].astype(int)
 
         self.df.drop('amenities', axis=1, inplace=True)
     
     def save_data(self, path: str) -> None:
         """
-        Save the processed DataFrame to a CSV file.
+        Save the processed DataFrame to a Parquet or CSV file.
+
+        The format follows the file suffix. Parquet keeps the dtypes (including the
+        categorical columns) and is compressed with PARQUET_COMPRESSION, any other
+        suffix is written as CSV.
 
         Args:
             path (str): The file path where the processed data will be saved.
         """
-        self.df.to_csv(path, index=False)
+        if str(path).endswith('.parquet'):
+            self.df.to_parquet(path, index=False, compression=PARQUET_COMPRESSION)
+        else:
+            self.df.to_csv(path, index=False)
         self.logger.info(f"Data saved to {path}")
 
-    def process_data(self, input_path: str, output_path: str) -> None:
+    def load_processed(self, path: str, columns: list[str] = None) -> None:
+        """
+        Load a processed dataset, reading only the given columns.
+
+        Parquet files are read column by column, so the unused columns are never
+        decoded. The target is restored as the ordered categorical written by
+        prepare_price_column (Parquet only keeps text categoricals and CSV none).
+
+        Args:
+            path (str): The file path of the processed Parquet or CSV file.
+            columns (list[str]): The columns to read (None reads all of them).
+        """
+        self._check_exists(path)
+
+        if str(path).endswith('.parquet'):
+            self.df = pd.read_parquet(path, columns=columns)
+        else:
+            self.df = pd.read_csv(path, usecols=columns)
+        if TARGET_COLUMN in self.df.columns:
+            self.df[TARGET_COLUMN] = pd.Categorical(
+                self.df[TARGET_COLUMN], categories=PRICE_LABELS, ordered=True
+            )
+
+        # Check if the file is empty
+        if self.df.empty:
+            self.logger.error("The file is empty")
+            raise ValueError("The file is empty")
+        else:
+            self.logger.info(f"Processed data loaded. Shape of df: {self.df.shape}")
+
+    def select_columns(self) -> None:
+        """
+        Keep the processed columns and rename them.
+        """
+        self.df = self.df[COLUMNS]
+        self.df.rename(columns=RENAMED_COLUMNS, inplace=True)
+
+    def drop_missing(self) -> None:
+        """
+        Remove the rows with missing values.
+        """
+        self.df.dropna(axis=0, inplace=True)
+
+    def _cleaning_stages(self) -> list:
+        # (name, step, config values the step depends on), in pipeline order
+        return [
+            # Create bathrooms column based on bathrooms_text
+            ('bathrooms', self.clean_bathrooms_column, {}),
+            # Select and rename columns
+            ('columns', self.select_columns,
+             {'columns': COLUMNS, 'renamed': RENAMED_COLUMNS}),
+            # Prepare price: Convert it to int, remove outliers and as categorical
+            ('price', self.prepare_price_column,
+             {'min_price': MIN_PRICE, 'bins': PRICE_BINS, 'labels': PRICE_LABELS,
+              'target': TARGET_COLUMN}),
+            # Extract categorical columns from the amenities column
+            ('amenities', self.preprocess_amenities_column,
+             {'amenities': FEATURE_AMENITIES}),
+            # Remove NaN values
+            ('dropna', self.drop_missing, {})
+        ]
+
+    def clean_data(self) -> None:
+        """
+        Apply all cleaning and preprocessing steps to the loaded DataFrame.
+        """
+        for name, step, _ in self._cleaning_stages():
+            with self.timer.stage(name):
+                step()
+
+    def process_data(self, input_path: str, output_path: str,
+                     chunksize: int = CHUNK_SIZE, cache: StageCache = None) -> None:
         """
         Process the data from input to output, applying all preprocessing steps.
 
         This method orchestrates the entire data processing pipeline by calling
-        other methods in the appropriate order.
+        other methods in the appropriate order. When chunksize is set, the raw
+        file is read and cleaned chunk by chunk, so only one chunk of raw text is
+        in memory at a time and only the (much smaller) cleaned rows are kept.
+        When a cache is given, the pipeline resumes from the latest stage whose
+        output is cached for this input file, code and config, and the stages
+        it runs are cached for the next run.
 
         Args:
             input_path (str): The file path of the input CSV.
             output_path (str): The file path where the processed data will be saved.
+            chunksize (int): The number of raw rows per chunk (None loads the file at once).
+            cache (StageCache): The cache of stage outputs (None disables caching).
         """
-        self.load_data(input_path)
+        if cache is not None:
+            self._process_cached(input_path, chunksize, cache)
+        elif chunksize:
+            self._process_chunks(input_path, chunksize)
+        else:
+            with self.timer.stage('load'):
+                self.load_data(input_path)
+            self.clean_data()
 
-        # Create bathrooms column based on bathrooms_text
-        self.clean_bathrooms_column()
+        with self.timer.stage('save'):
+            self.save_data(output_path)
 
-        # Select and rename columns
-        self.df = self.df[COLUMNS]
-        self.df.rename(columns=RENAMED_COLUMNS, inplace=True)
+    def _process_chunks(self, input_path: str, chunksize: int) -> None:
+        cleaned_chunks = []
+        for chunk in self.iter_chunks(input_path, chunksize):
+            self.df = chunk
+            self.clean_data()
+            cleaned_chunks.append(self.df)
+        self.df = self._concat_chunks(cleaned_chunks)
+        self.logger.info(f"File processed in {len(cleaned_chunks)} chunks. "
+                         f"Shape of df: {self.df.shape}")
 
-        # Prepare price: Convert it to int, remove outliers and as categorical
-        self.prepare_price_column()
+    def _process_cached(self, input_path: str, chunksize: int, cache: StageCache) -> None:
+        # Chain the stage keys from the input file content
+        key = cache.key(
+            cache.fingerprint(input_path), self.load_data,
+            {'columns': RAW_COLUMNS, 'dtypes': RAW_DTYPES}
+        )
+        stages = [('load', self.load_data, key)]
+        for name, step, config in self._cleaning_stages():
+            key = cache.key(key, step, config)
+            stages.append((name, step, key))
 
-        # Extract categorical columns from the amenities column
-        self.preprocess_amenities_column()
+        # Resume from the latest cached stage
+        resume = None
+        for position in range(len(stages) - 1, -1, -1):
+            df = cache.get(stages[position][2])
+            if df is not None:
+                self.df, resume = df, position
+                self.logger.info(f"Stage '{stages[position][0]}' loaded from cache")
+                break
 
-        # Remove NaN values
-        self.df.dropna(axis=0, inplace=True)
+        if resume == len(stages) - 1:
+            return
+        if chunksize:
+            # Intermediate stages are per chunk, only the cleaned data is cached
+            self._process_chunks(input_path, chunksize)
+            cache.put(stages[-1][2], self.df)
+            return
+
+        if resume is None:
+            with self.timer.stage('load'):
+                self.load_data(input_path)
+            cache.put(stages[0][2], self.df)
+            resume = 0
+        for name, step, key in stages[resume + 1:]:
+            with self.timer.stage(name):
+                step()
+            cache.put(key, self.df)
 
-        self.save_data(output_path)
\ No newline at end of file
+    def process_delta(self, delta_path: str, snapshot_path: str, output_path: str) -> None:
+        """
+        Merge a delta of new, changed and deleted listings into a processed snapshot.
+
+        Only the delta rows go through the cleaning stages. Every listing in the
+        delta is removed from the snapshot, then the cleaned delta rows not
+        flagged in DELETED_COLUMN are appended, so a changed listing replaces its
+        previous version (or just disappears if it no longer passes the cleaning).
+        Delete-only rows need no more than the id and the flag.
+
+        Args:
+            delta_path (str): The file path of the delta CSV (raw columns plus DELETED_COLUMN).
+            snapshot_path (str): The file path of the processed snapshot to update.
+            output_path (str): The file path where the updated snapshot will be saved.
+        """
+        self._check_exists(delta_path)
+        delta = pd.read_csv(
+            delta_path, usecols=lambda column: column in RAW_COLUMNS or column == DELETED_COLUMN,
+            dtype=RAW_DTYPES
+        )
+        # The last version of a listing wins
+        delta = delta.drop_duplicates('id', keep='last')
+        if DELETED_COLUMN in delta.columns:
+            flags = delta.pop(DELETED_COLUMN).astype(str).str.strip().str.lower()
+            deleted = flags.isin(['true', 't', '1', 'yes']).to_numpy()
+        else:
+            deleted = np.zeros(len(delta), dtype=bool)
+
+        upserts = delta[~deleted]
+        if not upserts.empty:
+            missing = set(RAW_COLUMNS) - set(upserts.columns)
+            if missing:
+                self.logger.error(f"Delta file missing columns: {sorted(missing)}")
+                raise ValueError(f"Delta file missing columns: {sorted(missing)}")
+            self.df = upserts
+            self.clean_data()
+            upserts = self.df
+
+        with self.timer.stage('load'):
+            self.load_processed(snapshot_path)
+        kept = self.df[~self.df['id'].isin(delta['id'])]
+        self.df = self._concat_chunks([kept, upserts]) if not upserts.empty else kept
+        self.logger.info(f"Delta merged: {len(upserts)} rows upserted, "
+                         f"{int(deleted.sum())} listings deleted. Shape of df: {self.df.shape}")
+
+        with self.timer.stage('save'):
+            self.save_data(output_path)
+
+    @staticmethod
+    def latest_snapshot(folder: str = PROCESSED_FOLDER) -> str:
+        """
+        Return the most recent processed snapshot in folder.
+
+        Args:
+            folder (str): The folder of the processed snapshots.
+
+        Returns:
+            str: The file path of the snapshot with the latest timestamp.
+        """
+        # The timestamp in the name sorts chronologically
+        snapshots = sorted(
+            (path for path in Path(folder).glob(SNAPSHOT_PATTERN)
+             if path.suffix in ('.parquet', '.csv')),
+            key=lambda path: path.stem
+        )
+        if not snapshots:
+            get_logger(__name__).error(f"No processed snapshot in {folder}")
+            raise FileNotFoundError(f"No processed snapshot in {folder}")
+        return str(snapshots[-1])
+
+    def _concat_chunks(self, chunks: list[pd.DataFrame]) -> pd.DataFrame:
+        if not chunks:
+            self.logger.error("The file is empty")
+            raise ValueError("The file is empty")
+
+        df = pd.concat(chunks)
+        # Chunks see different categories, merge them instead of falling back to object
+        categorical = set.intersection(
+            *(set(chunk.select_dtypes('category').columns) for chunk in chunks)
+        )
+        for column in [c for c in chunks[0].columns if c in categorical]:
+            df[column] = union_categoricals(
+                [chunk[column] for chunk in chunks],
+                sort_categories=not chunks[0][column].cat.ordered
+            )
+        return df
@@ -0,0 +1,163 @@
+import threading
+from operator import attrgetter
+
+import numpy as np
+
+from config.classifier_config import FEATURE_NAMES, MAP_NEIGHB, MAP_ROOM_TYPE, MAP_CATEGORY
+
+from src.setup_logger import get_logger
+
+# Category names indexed by the predicted class
+CATEGORY_NAMES = np.array([
+    MAP_CATEGORY[str(i)].capitalize() for i in range(len(MAP_CATEGORY))
+])
+
+class UnknownCategory(ValueError):
+    """
+    Raised when listings have a category value missing from the feature mappings.
+
+    Attributes:
+        unknown (dict): {column: [unknown values]}.
+        rows (list): The positions of the listings with an unknown value, in input order.
+    """
+
+    def __init__(self, unknown: dict, rows: list):
+        self.unknown = unknown
+        self.rows = rows
+        super().__init__(f"Unknown categories: {unknown}")
+
+class FeatureEncoder:
+    """
+    A precompiled mapping from validated listing fields to model feature rows,
+    and from model outputs back to category names.
+
+    The feature order and the category mappings are resolved once, so encoding
+    a listing reads its fields with a single attrgetter call, maps the
+    categorical ones with dict lookups and writes them into a preallocated
+    float row, without building a DataFrame. Every thread has its own row, which
+    is reused by its next encode call. Categories missing from the mappings
+    raise UnknownCategory instead of becoming NaN.
+
+    Attributes:
+        feature_names (list): The model features, in the order of the encoded columns.
+        mappings (dict): {column: {category: value}} of the categorical features.
+
+    Methods:
+        encode(listing) -> np.ndarray:
+            Return the (1, n_features) feature row of a listing.
+        encode_many(listings: list) -> np.ndarray:
+            Return the (n_listings, n_features) feature array of several listings.
+        to_category_names(predictions) -> np.ndarray:
+            Map predicted classes to their capitalized category names.
+        top_k_categories(proba, classes, k: int) -> tuple[np.ndarray, np.ndarray]:
+            Return the k most probable category names of each row and their probabilities.
+    """
+
+    def __init__(self, feature_names: list = FEATURE_NAMES, mappings: dict = None):
+        self.logger = get_logger(__name__)
+        self.feature_names = list(feature_names)
+        self.mappings = mappings if mappings is not None else {
+            'neighbourhood': MAP_NEIGHB, 'room_type': MAP_ROOM_TYPE
+        }
+        getter = attrgetter(*self.feature_names)
+        # attrgetter of a single name returns the value itself, not a tuple
+        self._get = getter if len(self.feature_names) > 1 else lambda listing: (getter(listing),)
+        self._column_getters = [attrgetter(name) for name in self.feature_names]
+        self._categorical = [
+            (index, name, self.mappings[name])
+            for index, name in enumerate(self.feature_names) if name in self.mappings
+        ]
+        self._local = threading.local()
+
+    def encode(self, listing) -> np.ndarray:
+        """
+        Return the (1, n_features) feature row of a listing.
+
+        The row is reused by the next call on the same thread, so it has to be
+        copied to be kept past that.
+
+        Args:
+            listing: An object with the feature attributes (e.g. a validated ListingInput).
+
+        Returns:
+            np.ndarray: The (1, n_features) float row, in feature_names order.
+        """
+        values = list(self._get(listing))
+        for index, name, mapping in self._categorical:
+            mapped = mapping.get(values[index])
+            if mapped is None:
+                self.logger.error(f"Unknown {name}: {values[index]!r}")
+                raise UnknownCategory({name: [values[index]]}, [0])
+            values[index] = mapped
+
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = self._local.row = np.empty((1, len(self.feature_names)), dtype=np.float64)
+        row[0] = values
+        return row
+
+    def encode_many(self, listings: list) -> np.ndarray:
+        """
+        Return the (n_listings, n_features) feature array of several listings.
+
+        Args:
+            listings (list): Objects with the feature attributes.
+
+        Returns:
+            np.ndarray: A new (n_listings, n_features) float array, in feature_names order.
+        """
+        features = np.empty((len(listings), len(self.feature_names)), dtype=np.float64)
+        if not len(listings):
+            return features
+
+        # One list per feature, read and mapped by C-level map calls
+        columns = [list(map(getter, listings)) for getter in self._column_getters]
+        unknown = {}
+        unknown_rows = set()
+        for index, name, mapping in self._categorical:
+            mapped = list(map(mapping.get, columns[index]))
+            if None in mapped:
+                rows = [row for row, value in enumerate(mapped) if value is None]
+                unknown[name] = sorted({columns[index][row] for row in rows}, key=str)
+                unknown_rows.update(rows)
+            columns[index] = mapped
+
+        if unknown:
+            self.logger.error(f"Unknown categories in {len(unknown_rows)} listings: {unknown}")
+            raise UnknownCategory(unknown, sorted(unknown_rows))
+
+        for index, column in enumerate(columns):
+            features[:, index] = column
+        return features
+
+    @staticmethod
+    def to_category_names(predictions) -> np.ndarray:
+        """
+        Map predicted classes to their capitalized category names.
+
+        Args:
+            predictions: The classes predicted by the model.
+
+        Returns:
+            np.ndarray: The category name of each prediction (e.g. 'High').
+        """
+        return CATEGORY_NAMES[np.asarray(predictions).astype(int)]
+
+    @staticmethod
+    def top_k_categories(proba, classes, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the k most probable category names of each row and their probabilities.
+
+        Args:
+            proba: The (n_rows, n_classes) predicted probabilities.
+            classes: The classes of the probability columns (the model's classes_).
+            k (int): The number of categories per row.
+
+        Returns:
+            tuple: The (n_rows, k) category names and probabilities, most probable first.
+        """
+        proba = np.asarray(proba)
+        # Stable on the negated probabilities, so ties keep the class order
+        order = np.argsort(-proba, axis=1, kind='stable')[:, :k]
+        names = FeatureEncoder.to_category_names(np.asarray(classes)[order])
+        return names, np.take_along_axis(proba, order, axis=1)
@@ -0,0 +1,228 @@
+import json
+import os
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Value
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, train_test_split
+
+from config.classifier_config import (
+    SEARCH_SPACE, SEARCH_N_ITER, SEARCH_METRIC, SEARCH_VALIDATION_SPLIT, SEARCH_WORKERS,
+    EARLY_STOP_FRACTIONS, EARLY_STOP_TOLERANCE, N_ESTIMATORS, RANDOM_STATE_SPLIT
+)
+from src.model_evaluator import Evaluator
+from src.model_handler import ModelHandler
+
+from src.setup_logger import get_logger
+
+class HyperparameterSearch:
+    """
+    A parallel grid or random search over the RandomForestClassifier parameters.
+
+    The training data is split once into a fit and a validation set, which are
+    written to .npy files and memory-mapped by every worker, so the data is
+    neither copied nor pickled per trial. Each trial grows its forest in stages
+    (warm start) and is pruned as soon as its validation score falls more than
+    tolerance below the best finished trial. Finished trials are evaluated with
+    Evaluator.evaluate on the validation set.
+
+    Attributes:
+        space (dict): Parameter lists (grid) or distributions (random search).
+        n_iter (int): The number of sampled candidates (None runs the full grid).
+        metric (str): The validation metric to maximize ('roc_auc' or 'accuracy').
+        n_workers (int): The number of worker processes (1 runs in-process).
+        fractions (list[float]): The fractions of n_estimators after which trials are scored.
+        tolerance (float): The score gap to the best trial that prunes a trial.
+        leaderboard (list[dict]): The trials of the last run, best first.
+
+    Methods:
+        candidates() -> list[dict]:
+            Return the parameter sets to try.
+        run(X_train, y_train) -> list[dict]:
+            Run every trial and return the leaderboard.
+        save_leaderboard(path: str) -> None:
+            Save the leaderboard to a JSON file.
+    """
+
+    def __init__(self, space: dict = SEARCH_SPACE, n_iter: int = SEARCH_N_ITER,
+                 metric: str = SEARCH_METRIC, n_workers: int = SEARCH_WORKERS,
+                 fractions: list = EARLY_STOP_FRACTIONS,
+                 tolerance: float = EARLY_STOP_TOLERANCE, random_state: int = 0):
+        self.logger = get_logger(__name__)
+        if metric not in ('roc_auc', 'accuracy'):
+            self.logger.error(f"Unsupported search metric: {metric}")
+            raise ValueError(f"Unsupported search metric: {metric}")
+        self.space = space
+        self.n_iter = n_iter
+        self.metric = metric
+        self.n_workers = n_workers or os.cpu_count()
+        self.fractions = fractions
+        self.tolerance = tolerance
+        self.random_state = random_state
+        self.leaderboard = []
+
+    def candidates(self) -> list[dict]:
+        """
+        Return the parameter sets to try.
+
+        Returns:
+            list[dict]: Every grid point, or n_iter sampled parameter sets.
+        """
+        if self.n_iter:
+            candidates = ParameterSampler(self.space, self.n_iter, random_state=self.random_state)
+        else:
+            candidates = ParameterGrid(self.space)
+        # NumPy scalars from the distributions are not JSON serializable
+        return [
+            {name: value.item() if isinstance(value, np.generic) else value
+             for name, value in params.items()}
+            for params in candidates
+        ]
+
+    def run(self, X_train, y_train) -> list[dict]:
+        """
+        Run every trial and return the leaderboard.
+
+        Args:
+            X_train: The feature matrix for training (split again for validation).
+            y_train: The target vector for training.
+
+        Returns:
+            list[dict]: The finished trials sorted by validation score, then the pruned ones.
+        """
+        candidates = self.candidates()
+        # The workers memory-map plain float and int arrays, which hold no missing values
+        if np.any(pd.isna(X_train)) or np.any(pd.isna(y_train)):
+            self.logger.error("The search data has missing values, drop or impute them first")
+            raise ValueError("The search data has missing values, drop or impute them first")
+
+        X_fit, X_valid, y_fit, y_valid = train_test_split(
+            X_train, y_train, test_size=SEARCH_VALIDATION_SPLIT,
+            random_state=RANDOM_STATE_SPLIT, stratify=y_train
+        )
+        self.logger.info(f"Search: {len(candidates)} trials on {self.n_workers} workers, "
+                         f"metric: {self.metric}")
+
+        best_score = Value('d', -np.inf)
+        trials = []
+        with tempfile.TemporaryDirectory(prefix="search_") as folder:
+            # Nullable pandas dtypes (e.g. Int16 accommodates) would become object arrays,
+            # which cannot be memory-mapped
+            for name, array, dtype in (
+                ('X_fit', X_fit, np.float64), ('X_valid', X_valid, np.float64),
+                ('y_fit', y_fit, np.int64), ('y_valid', y_valid, np.int64)
+            ):
+                np.save(Path(folder) / f"{name}.npy", np.asarray(array, dtype=dtype))
+            initargs = (folder, list(X_train.columns), best_score, self.metric,
+                        self.fractions, self.tolerance)
+
+            if self.n_workers == 1:
+                _init_worker(*initargs)
+                trials = [_run_trial(i, params) for i, params in enumerate(candidates)]
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=self.n_workers, initializer=_init_worker, initargs=initargs
+                ) as executor:
+                    futures = [
+                        executor.submit(_run_trial, i, params)
+                        for i, params in enumerate(candidates)
+                    ]
+                    for future in as_completed(futures):
+                        trials.append(future.result())
+
+        self.leaderboard = sorted(
+            trials, key=lambda trial: (trial['status'] != 'completed', -trial['score'])
+        )
+        pruned = sum(trial['status'] == 'pruned' for trial in trials)
+        self.logger.info(f"Search completed: {len(trials) - pruned} trials finished, "
+                         f"{pruned} pruned. Best {self.metric}: "
+                         f"{self.leaderboard[0]['score']:.4f} with {self.leaderboard[0]['params']}")
+        return self.leaderboard
+
+    def save_leaderboard(self, path: str) -> None:
+        """
+        Save the leaderboard to a JSON file.
+
+        Args:
+            path (str): The file path to save the leaderboard to.
+        """
+        with open(path, 'w') as f:
+            json.dump({
+                'metric': self.metric,
+                'best_params': self.leaderboard[0]['params'] if self.leaderboard else None,
+                'leaderboard': self.leaderboard
+            }, f)
+        self.logger.info(f"Leaderboard saved to {path}")
+
+# Per-process state of the search workers
+_worker_state = None
+
+def _init_worker(folder: str, feature_names: list, best_score, metric: str,
+                 fractions: list, tolerance: float) -> None:
+    global _worker_state
+    arrays = {
+        name: np.load(Path(folder) / f"{name}.npy", mmap_mode='r')
+        for name in ('X_fit', 'X_valid', 'y_fit', 'y_valid')
+    }
+    _worker_state = {
+        # The DataFrames wrap the memory-mapped arrays without copying them
+        'X_fit': pd.DataFrame(arrays['X_fit'], columns=feature_names, copy=False),
+        'X_valid': pd.DataFrame(arrays['X_valid'], columns=feature_names, copy=False),
+        'y_fit': arrays['y_fit'],
+        'y_valid': arrays['y_valid'],
+        'best_score': best_score,
+        'metric': metric,
+        'fractions': fractions,
+        'tolerance': tolerance
+    }
+
+def _score(model, X, y, metric: str) -> float:
+    if metric == 'accuracy':
+        return float(accuracy_score(y, model.predict(X)))
+    return float(roc_auc_score(y, model.predict_proba(X), multi_class='ovr'))
+
+def _run_trial(trial_id: int, params: dict) -> dict:
+    state = _worker_state
+    n_estimators = params.get('n_estimators', N_ESTIMATORS)
+    stages = sorted({max(1, round(n_estimators * fraction)) for fraction in state['fractions']}
+                    - {n_estimators}) + [n_estimators]
+
+    start = time.perf_counter()
+    model_handler = ModelHandler()
+    with warnings.catch_warnings():
+        # Every stage refits on the same data, so the warm start warning does not apply
+        warnings.filterwarnings("ignore", message=".*not recommended for warm_start.*")
+        for stage in stages:
+            if model_handler.model is None:
+                # Trials run in parallel, so each one is single-threaded
+                model_handler.train_model(
+                    state['X_fit'], state['y_fit'],
+                    **{**params, 'n_estimators': stage, 'warm_start': True, 'n_jobs': 1}
+                )
+            else:
+                model_handler.model.set_params(n_estimators=stage)
+                model_handler.model.fit(state['X_fit'], state['y_fit'])
+
+            score = _score(model_handler.model, state['X_valid'], state['y_valid'], state['metric'])
+            if stage < n_estimators and score < state['best_score'].value - state['tolerance']:
+                return {
+                    'trial': trial_id, 'params': params, 'status': 'pruned', 'score': score,
+                    'n_estimators_trained': stage,
+                    'fit_time_s': time.perf_counter() - start
+                }
+
+    with state['best_score'].get_lock():
+        state['best_score'].value = max(state['best_score'].value, score)
+
+    return {
+        'trial': trial_id, 'params': params, 'status': 'completed', 'score': score,
+        'n_estimators_trained': n_estimators,
+        'fit_time_s': time.perf_counter() - start,
+        'results': Evaluator.evaluate(model_handler.model, state['X_valid'], state['y_valid'])
+    }
@@ -0,0 +1,161 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config.classifier_config import (
+    MICRO_BATCH_MAX_SIZE, MICRO_BATCH_MAX_WAIT_MS, MICRO_BATCH_WORKERS
+)
+
+from src.setup_logger import get_logger
+
+class MicroBatcher:
+    """
+    An asyncio queue that groups concurrent single-row predictions into batches.
+
+    Each request puts its feature row and a future in the queue and awaits the
+    future. A background task takes the first queued row, keeps collecting rows
+    until max_batch_size rows are queued or max_wait_ms has passed since the
+    first one, then runs one vectorized predict per model in a thread pool and
+    resolves every future with its own prediction. max_wait_ms is the latency
+    cap added to a request that arrives alone.
+
+    Attributes:
+        max_batch_size (int): The maximum number of rows per predict call.
+        max_wait_ms (float): The maximum time the first row of a batch waits for others.
+        n_workers (int): The number of threads running the predict calls.
+        n_batches (int): The number of predict calls made.
+        n_rows (int): The number of rows predicted.
+
+    Methods:
+        start() -> None:
+            Start the batching task on the running event loop.
+        predict(model, features: np.ndarray, method: str):
+            Queue a feature row and return its prediction (or probabilities).
+        stop() -> None:
+            Stop the batching task and fail the queued and in-progress requests.
+    """
+
+    def __init__(self, max_batch_size: int = MICRO_BATCH_MAX_SIZE,
+                 max_wait_ms: float = MICRO_BATCH_MAX_WAIT_MS,
+                 n_workers: int = MICRO_BATCH_WORKERS):
+        self.logger = get_logger(__name__)
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.n_batches = 0
+        self.n_rows = 0
+        self.n_workers = n_workers
+        self._queue = None
+        self._task = None
+        # Created by start() and shut down by stop(), so the batcher can be restarted
+        self._executor = None
+
+    def start(self) -> None:
+        """
+        Start the batching task on the running event loop.
+        """
+        if self._task is None or self._task.done():
+            if self._executor is None:
+                # The forest already uses several threads per predict, so batches run one at a time
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.n_workers, thread_name_prefix="micro-batch"
+                )
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            self.logger.info(f"Micro-batching started: up to {self.max_batch_size} rows "
+                             f"or {self.max_wait_ms} ms per batch")
+
+    async def predict(self, model, features: np.ndarray, method: str = 'predict'):
+        """
+        Queue a feature row and return its prediction (or probabilities).
+
+        Args:
+            model: The model to predict with (rows are only batched with rows of the same model).
+            features (np.ndarray): The (n_features,) feature row, in FEATURE_NAMES order.
+            method (str): The model method to call, 'predict' or 'predict_proba'.
+
+        Returns:
+            The predicted class of the row, or its (n_classes,) probabilities.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((model, method, features, future))
+        return await future
+
+    async def stop(self) -> None:
+        """
+        Stop the batching task and fail the queued and in-progress requests.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            *_, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("The micro-batcher was stopped"))
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                deadline = loop.time() + self.max_wait_ms / 1000
+                while len(batch) < self.max_batch_size:
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                await self._predict_batch(batch)
+            except asyncio.CancelledError:
+                # stop() cancelled the task while it collected or predicted this batch
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("The micro-batcher was stopped"))
+                raise
+            except Exception as e:
+                # The task must outlive a bad batch, or every later request would hang
+                self.logger.error(f"Error in a micro-batch of {len(batch)} rows: {e}")
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _predict_batch(self, batch: list) -> None:
+        loop = asyncio.get_running_loop()
+        # Requests for different models or methods cannot share a predict call
+        groups = {}
+        for model, method, features, future in batch:
+            groups.setdefault((id(model), method), (model, method, []))[2].append(
+                (features, future)
+            )
+
+        for model, method, items in groups.values():
+            try:
+                predict = getattr(model, method)
+                rows = np.vstack([features for features, _ in items])
+                predictions = await loop.run_in_executor(self._executor, predict, rows)
+            except Exception as e:
+                self.logger.error(f"Error predicting a batch of {len(items)} rows: {e}")
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.n_batches += 1
+            self.n_rows += len(items)
+            # Requests that were cancelled while waiting have their future done already
+            for (_, future), prediction in zip(items, predictions):
+                if not future.done():
+                    future.set_result(prediction)
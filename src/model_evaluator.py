@@ -1,10 +1,18 @@
-from sklearn.metrics import (
-    accuracy_score, roc_auc_score, classification_report, confusion_matrix
-)
-import pandas as pd
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, roc_auc_score, confusion_matrix
 import numpy as np
+import pandas as pd
+from config.classifier_config import (
+    PERMUTATION_REPEATS, PERMUTATION_WORKERS, PERMUTATION_TIME_BUDGET, PERMUTATION_BATCH_ROWS
+)
+from src.compiled_forest import CompiledForest
+from src.metric_accumulators import ConfusionMatrixAccumulator, RocAucAccumulator
 from src.setup_logger import get_logger
-from config.classifier_config import MAP_CATEGORY
 
 class Evaluator:
     """
@@ -16,10 +24,18 @@ class Evaluator:
     Methods:
         evaluate(model, X_test, y_test) -> dict:
             Evaluate the model's performance on test data.
+        evaluate_stream(model, batches) -> dict:
+            Evaluate the model batch by batch, without keeping the predictions.
+        results_from_accumulators(confusion, roc_auc) -> dict:
+            Build the evaluation metrics from (possibly merged) accumulators.
         get_feature_importances(model, training_data) -> dict:
             Get the feature importances from the model.
+        get_permutation_importances(model, X_test, y_test) -> dict:
+            Get the drop in accuracy when each feature is shuffled.
         get_classification_output(y_test, y_pred) -> dict:
             Get the classification report.
+        serving_report(model, X_test, y_test) -> dict:
+            Get the scores, size and prediction latency of a model.
     """
 
     logger = get_logger(__name__)
@@ -65,6 +81,74 @@ class Evaluator:
         Evaluator.logger.info('Classification report: %s' % results['classification_report'])
         return results
 
+    @staticmethod
+    def evaluate_stream(model, batches) -> dict:
+        """
+        Evaluate the model batch by batch, without keeping the predictions.
+
+        Every batch is scored once (predict_proba) and only updates metric
+        accumulators, so memory does not grow with the number of test rows. The
+        ROC AUC is the binned approximation of RocAucAccumulator.
+
+        Args:
+            model: The trained machine learning model.
+            batches: An iterable of (X_test, y_test) batches.
+
+        Returns:
+            dict: A dictionary containing various evaluation metrics.
+        """
+        classes = np.asarray(model.classes_)
+        confusion = ConfusionMatrixAccumulator(classes)
+        roc_auc = RocAucAccumulator(classes)
+        feature_names = None
+        for X_test, y_test in batches:
+            if len(y_test) == 0:
+                continue
+            feature_names = getattr(X_test, 'columns', feature_names)
+            try:
+                y_proba = model.predict_proba(X_test)
+            except Exception as e:
+                Evaluator.logger.error(f"Error evaluating the model: {e}")
+                raise ValueError(f"Error evaluating the model: {e}")
+            # Same decision as the forest's predict
+            confusion.update(y_test, classes.take(np.argmax(y_proba, axis=1)))
+            roc_auc.update(y_test, y_proba)
+
+        if confusion.n_rows == 0:
+            Evaluator.logger.error("No test rows to evaluate")
+            raise ValueError("No test rows to evaluate")
+
+        results = Evaluator.results_from_accumulators(confusion, roc_auc)
+        results['feature_importances'] = Evaluator.get_feature_importances(
+            model, feature_names
+        )
+        Evaluator.logger.info(f"Streaming evaluation completed on {confusion.n_rows} rows")
+        Evaluator.logger.info('Accuracy: %.2f' % results['accuracy'])
+        Evaluator.logger.info('ROC AUC: %.2f' % results['roc_auc'])
+        Evaluator.logger.info('Confusion matrix: %s' % results['confusion_matrix'])
+        return results
+
+    @staticmethod
+    def results_from_accumulators(confusion: ConfusionMatrixAccumulator,
+                                  roc_auc: RocAucAccumulator) -> dict:
+        """
+        Build the evaluation metrics from (possibly merged) accumulators.
+
+        Args:
+            confusion (ConfusionMatrixAccumulator): The accumulated confusion matrix.
+            roc_auc (RocAucAccumulator): The accumulated probability histograms.
+
+        Returns:
+            dict: The accuracy, ROC AUC, confusion matrix, classification report and row count.
+        """
+        return {
+            'n_rows': confusion.n_rows,
+            'accuracy': confusion.accuracy(),
+            'roc_auc': roc_auc.roc_auc(),
+            'confusion_matrix': confusion.matrix.tolist(),
+            'classification_report': confusion.report()
+        }
+
     @staticmethod
     def get_feature_importances(model, training_data) -> dict:
         """
@@ -72,7 +156,7 @@ class Evaluator:
 
         Args:
             model: The trained machine learning model.
-            training_data: The feature matrix used for training.
+            training_data: The feature matrix used for training (or its column names).
 
         Returns:
             dict: A dictionary of feature names and their importance scores.
@@ -80,13 +164,115 @@ class Evaluator:
         try:
             importances = model.feature_importances_
             indices = np.argsort(importances)[::-1]
-            features = training_data.columns[indices]
+            features = np.asarray(getattr(training_data, 'columns', training_data))[indices]
             importances = importances[indices].tolist()
             return dict(zip(features, importances))
         except Exception as e:
             Evaluator.logger.error(f"Error calculating feature importances: {e}")
             raise ValueError(f"Error calculating feature importances: {e}")
     
+    @staticmethod
+    def get_permutation_importances(model, X_test, y_test, n_repeats: int = PERMUTATION_REPEATS,
+                                    n_workers: int = PERMUTATION_WORKERS,
+                                    time_budget_s: float = PERMUTATION_TIME_BUDGET,
+                                    random_state: int = 0) -> dict:
+        """
+        Calculate permutation importances: the drop in accuracy when a feature is shuffled.
+
+        Unlike the impurity-based importances, they are not biased toward
+        features with many distinct values. The permuted copies of the test set
+        for several (repeat, feature) pairs are stacked into one array and scored
+        with a single predict call, and the stacks are spread over a process
+        pool. A forest is compiled first (same predictions, and repeated rows
+        are scored once). Stacks are ordered by repeat, so when the time budget
+        runs out every feature has the same number of finished repeats.
+
+        Args:
+            model: The trained machine learning model.
+            X_test: The feature matrix for testing.
+            y_test: The true labels for testing.
+            n_repeats (int): The number of permutations per feature.
+            n_workers (int): The number of worker processes (0 uses every core, 1 runs in-process).
+            time_budget_s (float): The time after which no more stacks are scored.
+            random_state (int): The seed of the permutations.
+
+        Returns:
+            dict: {feature: {'mean': drop, 'std': std, 'n_repeats': n}} sorted by mean drop.
+        """
+        start = time.perf_counter()
+        feature_names = list(X_test.columns)
+        X = np.asarray(X_test, dtype=np.float64)
+        y = np.asarray(y_test)
+        n_rows, n_features = X.shape
+        scorer = CompiledForest.from_sklearn(model) \
+            if isinstance(model, RandomForestClassifier) else model
+        baseline = float(np.mean(_predict(scorer, X, feature_names) == y))
+
+        rng = np.random.default_rng(random_state)
+        tasks = [(repeat, feature, rng.permutation(n_rows))
+                 for repeat in range(n_repeats) for feature in range(n_features)]
+        # Stacks are capped in rows, and small enough to keep every worker busy
+        n_workers = n_workers or os.cpu_count()
+        per_stack = max(1, min(PERMUTATION_BATCH_ROWS // max(n_rows, 1),
+                               -(-len(tasks) // n_workers)))
+        stacks = [tasks[i:i + per_stack] for i in range(0, len(tasks), per_stack)]
+
+        scores = np.full((n_features, n_repeats), np.nan)
+        deadline = start + time_budget_s
+        initargs = (scorer, X, y, feature_names)
+        if n_workers == 1 or len(stacks) == 1:
+            _init_permutation_worker(*initargs)
+            for stack in stacks:
+                if time.perf_counter() > deadline:
+                    break
+                for repeat, feature, score in _score_permutations(stack):
+                    scores[feature, repeat] = score
+        else:
+            # Forked workers inherit the model and data instead of unpickling them
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            executor = ProcessPoolExecutor(
+                max_workers=n_workers, mp_context=context,
+                initializer=_init_permutation_worker, initargs=initargs
+            )
+            try:
+                pending = {executor.submit(_score_permutations, stack) for stack in stacks}
+                while pending:
+                    done, pending = wait(
+                        pending, timeout=max(deadline - time.perf_counter(), 0),
+                        return_when=FIRST_COMPLETED
+                    )
+                    for future in done:
+                        for repeat, feature, score in future.result():
+                            scores[feature, repeat] = score
+                    if time.perf_counter() > deadline:
+                        break
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        drops = baseline - scores
+        done = ~np.isnan(drops)
+        if done.sum() < drops.size:
+            Evaluator.logger.warning(f"Permutation importance stopped by the time budget: "
+                                     f"{int(done.sum())} of {drops.size} permutations scored")
+
+        importances = {}
+        for feature in range(n_features):
+            values = drops[feature][done[feature]]
+            importances[feature_names[feature]] = {
+                'mean': float(values.mean()) if values.size else None,
+                'std': float(values.std()) if values.size else None,
+                'n_repeats': int(values.size)
+            }
+        importances = dict(sorted(
+            importances.items(),
+            key=lambda item: -np.inf if item[1]['mean'] is None else item[1]['mean'],
+            reverse=True
+        ))
+        Evaluator.logger.info(f"Permutation importances computed in "
+                              f"{time.perf_counter() - start:.1f}s: {importances}")
+        return importances
+
     @staticmethod
     def get_classification_output(y_test, y_pred) -> dict:
         """
@@ -100,10 +286,73 @@ class Evaluator:
             dict: A dictionary representation of the classification report.
         """
         try:
-            report = classification_report(y_test, y_pred, output_dict=True)
-            df_report = pd.DataFrame.from_dict(report).T[:-3]
-            df_report.index = [MAP_CATEGORY[i] for i in df_report.index]
-            return df_report.to_dict()
+            labels = np.union1d(np.asarray(y_test), np.asarray(y_pred))
+            confusion = ConfusionMatrixAccumulator(labels)
+            confusion.update(y_test, y_pred)
+            return confusion.report()
         except Exception as e:
             Evaluator.logger.error(f"Error generating classification report: {e}")
             raise ValueError(f"Error generating classification report: {e}")
+
+    @staticmethod
+    def serving_report(model, X_test, y_test, n_single: int = 100) -> dict:
+        """
+        Get the scores, size and prediction latency of a model.
+
+        Args:
+            model: The trained model (a forest or a CompiledForest).
+            X_test: The feature matrix for testing.
+            y_test: The true labels for testing.
+            n_single (int): The number of one-row predictions the single latency is averaged over.
+
+        Returns:
+            dict: The accuracy, ROC AUC, size in MB, trees, nodes and the single-row
+                and whole-test-set prediction latencies in milliseconds.
+        """
+        results = Evaluator.evaluate(model, X_test, y_test)
+        if isinstance(model, CompiledForest):
+            size, n_nodes = model.nbytes, len(model.feature)
+        else:
+            size = len(pickle.dumps(model))
+            n_nodes = sum(tree.tree_.node_count for tree in model.estimators_)
+
+        single = X_test.iloc[:1]
+        start = time.perf_counter()
+        for _ in range(n_single):
+            model.predict(single)
+        single_ms = (time.perf_counter() - start) / n_single * 1000
+        start = time.perf_counter()
+        model.predict(X_test)
+        batch_ms = (time.perf_counter() - start) * 1000
+
+        return {
+            'accuracy': results['accuracy'], 'roc_auc': results['roc_auc'],
+            'size_mb': size / 1e6, 'n_estimators': int(model.n_estimators),
+            'n_nodes': int(n_nodes), 'single_latency_ms': single_ms, 'batch_latency_ms': batch_ms
+        }
+
+# Per-process state of the permutation importance workers
+_permutation_state = None
+
+def _init_permutation_worker(model, X, y, feature_names) -> None:
+    global _permutation_state
+    _permutation_state = (model, X, y, feature_names)
+
+def _predict(model, X, feature_names):
+    # Forests fitted on DataFrames expect the feature names back
+    if hasattr(model, 'feature_names_in_') and not isinstance(model, CompiledForest):
+        X = pd.DataFrame(X, columns=feature_names)
+    return model.predict(X)
+
+def _score_permutations(stack: list) -> list:
+    model, X, y, feature_names = _permutation_state
+    n_rows = X.shape[0]
+    stacked = np.tile(X, (len(stack), 1))
+    for i, (_, feature, permutation) in enumerate(stack):
+        stacked[i * n_rows:(i + 1) * n_rows, feature] = X[permutation, feature]
+
+    correct = (_predict(model, stacked, feature_names) == np.tile(y, len(stack)))
+    return [
+        (repeat, feature, float(correct[i * n_rows:(i + 1) * n_rows].mean()))
+        for i, (repeat, feature, _) in enumerate(stack)
+    ]
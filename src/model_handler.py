@@ -1,9 +1,20 @@
+import copy
 import os
 import pickle
+import time
+import warnings
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, roc_auc_score
 from config.classifier_config import (
-    N_ESTIMATORS, RANDOM_STATE_CLASSIFIER, CLASS_WEIGHT, N_JOBS
+    N_ESTIMATORS, RANDOM_STATE_CLASSIFIER, CLASS_WEIGHT, N_JOBS,
+    MAX_PREDICTION_TABLE_SIZE, COMPRESS_TOLERANCE,
+    COMPRESS_MAX_DEPTHS, COMPRESS_THRESHOLD_DTYPE, COMPRESS_VALUE_DTYPE
 )
+from src.compiled_forest import CompiledForest
+from src.model_loader import load_model
+from src.prediction_table import PredictionTable
+from src.streaming_trainer import StreamingTrainer
 
 from src.setup_logger import get_logger
 
@@ -12,78 +23,344 @@ class ModelHandler:
     A class for handling machine learning model operations.
 
     This class provides methods for loading, saving, and training
-    a RandomForestClassifier model.
+    a RandomForestClassifier model. Models can also be compiled into a
+    CompiledForest, which is stored as a .npz or a memory-mappable .forest
+    file instead of a pickle.
 
     Attributes:
-        model: The machine learning model (RandomForestClassifier).
+        model: The machine learning model (RandomForestClassifier or CompiledForest).
+        lineage (dict): How the current model was trained (fresh, grown or with replaced trees).
+        compression (dict): The trees, depth, dtypes and validation scores of the last compression.
 
     Methods:
         load_model(path: str) -> None:
             Load a trained model from a file.
         save_model(path: str) -> None:
             Save the current model to a file.
-        train_model(X_train, y_train) -> None:
+        train_model(X_train, y_train, **params) -> None:
             Train a new RandomForestClassifier model with the given data.
+        train_model_stream(path: str, trainer: StreamingTrainer) -> None:
+            Train a forest out of core on a processed file.
+        grow_model(X_train, y_train, n_trees: int, replace: str) -> None:
+            Grow trees on new data on top of the current forest.
+        compile_model() -> CompiledForest:
+            Export the trained forest into flat NumPy arrays.
+        compress_model(X_valid, y_valid, tolerance: float) -> CompiledForest:
+            Compile the smallest forest scoring within tolerance of the trained one.
+        build_prediction_table(X) -> PredictionTable:
+            Precompute predictions over the feature grid observed in X.
     """
 
     def __init__(self):
         self.logger = get_logger(__name__)
         self.model = None
+        self.lineage = None
+        self.compression = None
 
     def load_model(self, path: str) -> None:
         """
         Load a trained model from a file.
 
+        See src.model_loader.load_model for the supported files (pickle, .npz or
+        .forest, with an optional prediction table next to the model).
+
         Args:
             path (str): The file path to load the model from.
         """
-        # Check if the file exists
-        if not os.path.exists(path):
-            self.logger.error(f"The file at {path} does not exist")
-            raise FileNotFoundError(f"The file at {path} does not exist")
-
-        self.model = pickle.load(open(path, 'rb'))
-        self.logger.info(f"Model loaded from {path}")
-
+        self.model = load_model(path)
         return self.model
     
     def save_model(self, path: str) -> None:
         """
         Save the current model to a file.
 
+        A CompiledForest is saved as a .npz or .forest file (depending on the
+        path suffix), any other model as a pickle. The pickle is written to a
+        temporary file and then moved into place, so a registry reloading the
+        model never reads a partly written file.
+
         Args:
             path (str): The file path to save the model to.
         """
-        pickle.dump(self.model, open(path, 'wb'))
+        if isinstance(self.model, CompiledForest):
+            self.model.save(path)
+        else:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self.model, f)
+            os.replace(tmp_path, path)
         self.logger.info(f"Model saved to {path}")
 
-    def train_model(self, X_train, y_train) -> None:
+    def train_model(self, X_train, y_train, **params) -> None:
         """
         Train a new RandomForestClassifier model with the given data.
 
         Args:
             X_train: The feature matrix for training.
             y_train: The target vector for training.
+            **params: RandomForestClassifier parameters overriding the config defaults.
         """
-        self.model = RandomForestClassifier(
-            n_estimators=N_ESTIMATORS,
-            random_state=RANDOM_STATE_CLASSIFIER,
-            class_weight=CLASS_WEIGHT,
-            n_jobs=N_JOBS
-        )
-        self.logger.info("Model: RandomForestClassifier, "
-                         f"n_estimators: {N_ESTIMATORS}, "
-                         f"random_state: {RANDOM_STATE_CLASSIFIER}, "
-                         f"class_weight: {CLASS_WEIGHT}, "
-                         f"n_jobs: {N_JOBS}")
+        params = {
+            'n_estimators': N_ESTIMATORS,
+            'random_state': RANDOM_STATE_CLASSIFIER,
+            'class_weight': CLASS_WEIGHT,
+            'n_jobs': N_JOBS,
+            **params
+        }
+        self.model = RandomForestClassifier(**params)
+        self.logger.info("Model: RandomForestClassifier, " +
+                         ", ".join(f"{name}: {value}" for name, value in params.items()))
 
+        start = time.perf_counter()
         try:
             self.model.fit(X_train, y_train)
         except Exception as e:
             self.logger.error(f"Error training the model: {e}")
             raise ValueError(f"Error training the model: {e}")
 
+        self.lineage = {
+            'mode': 'fresh', 'trees_added': params['n_estimators'], 'trees_removed': 0,
+            'n_estimators': params['n_estimators'], 'train_rows': len(y_train),
+            'train_time_s': time.perf_counter() - start
+        }
         self.logger.info("Model trained successfully")
+
+    def train_model_stream(self, path: str, trainer: StreamingTrainer = None) -> None:
+        """
+        Train a forest out of core on a processed file.
+
+        The file is streamed in batches and a sub-forest is fitted per shard of
+        rows, so memory stays bounded whatever the size of the dataset (see
+        StreamingTrainer).
+
+        Args:
+            path (str): The file path of a processed .parquet or .csv file.
+            trainer (StreamingTrainer): The trainer to use (default: one with the config settings).
+        """
+        trainer = trainer or StreamingTrainer()
+        start = time.perf_counter()
+        self.model = trainer.fit(path)
+        self.lineage = {
+            'mode': 'stream', 'trees_added': self.model.n_estimators, 'trees_removed': 0,
+            'n_estimators': self.model.n_estimators, 'train_rows': trainer.n_train_rows,
+            'train_time_s': time.perf_counter() - start
+        }
+
+    def grow_model(self, X_train, y_train, n_trees: int, replace: str = None) -> None:
+        """
+        Grow trees on new data on top of the current forest.
+
+        The current (loaded) forest keeps its trees and n_trees new ones are fitted
+        on the given data with warm start, so the training time is proportional to
+        n_trees. With replace='oldest' the first n_trees trees are dropped first,
+        with replace='worst' the n_trees trees with the lowest accuracy on the
+        given data, so the forest keeps its size while adapting to the new data.
+
+        Args:
+            X_train: The feature matrix of the new data.
+            y_train: The target vector of the new data.
+            n_trees (int): The number of trees to grow.
+            replace (str): None to keep every tree, 'oldest' or 'worst'.
+        """
+        # A model loaded with its prediction table is grown underneath it
+        model = getattr(self.model, 'fallback', self.model)
+        if not isinstance(model, RandomForestClassifier):
+            self.logger.error(f"Cannot grow a {type(model).__name__}, a pickled forest is needed")
+            raise ValueError(f"Cannot grow a {type(model).__name__}, a pickled forest is needed")
+        if replace not in (None, 'oldest', 'worst'):
+            self.logger.error(f"Unknown tree replacement: {replace}")
+            raise ValueError(f"Unknown tree replacement: {replace}")
+        # The new trees must predict the same classes as the existing ones
+        if not np.array_equal(np.unique(y_train), model.classes_):
+            self.logger.error(f"New data classes {np.unique(y_train).tolist()} "
+                              f"differ from the model classes {model.classes_.tolist()}")
+            raise ValueError(f"New data classes {np.unique(y_train).tolist()} "
+                             f"differ from the model classes {model.classes_.tolist()}")
+
+        n_removed = 0
+        if replace is not None:
+            n_removed = min(n_trees, len(model.estimators_))
+            if replace == 'oldest':
+                removed = np.arange(n_removed)
+            else:
+                # Trees predict class indices and were fitted on plain float32 arrays
+                X = np.asarray(X_train, dtype=np.float32)
+                y = np.searchsorted(model.classes_, np.asarray(y_train))
+                accuracies = [np.mean(tree.predict(X) == y) for tree in model.estimators_]
+                removed = np.argsort(accuracies, kind='stable')[:n_removed]
+            removed = set(removed.tolist())
+            model.estimators_ = [
+                tree for i, tree in enumerate(model.estimators_) if i not in removed
+            ]
+            # Warm start seeds the new trees from the random_state sequence after the
+            # current trees, which after a removal are the seeds of surviving trees.
+            # A seed drawn from the surviving trees' seeds gives every generation new ones
+            if model.random_state is not None:
+                seeds = [tree.random_state for tree in model.estimators_] + [model.random_state]
+                model.set_params(random_state=int(
+                    np.random.SeedSequence(seeds).generate_state(1)[0]
+                ))
+
+        n_estimators = len(model.estimators_) + n_trees
+        model.set_params(warm_start=True, n_estimators=n_estimators)
+        start = time.perf_counter()
+        try:
+            with warnings.catch_warnings():
+                # Growing on new data is the point here, the class weights are recomputed on it
+                warnings.filterwarnings("ignore", message=".*not recommended for warm_start.*")
+                model.fit(X_train, y_train)
+        except Exception as e:
+            self.logger.error(f"Error growing the model: {e}")
+            raise ValueError(f"Error growing the model: {e}")
+        finally:
+            model.set_params(warm_start=False)
+
+        self.model = model
+        self.lineage = {
+            'mode': 'grow' if replace is None else f'replace_{replace}',
+            'trees_added': n_trees, 'trees_removed': n_removed,
+            'n_estimators': n_estimators, 'train_rows': len(y_train),
+            'train_time_s': time.perf_counter() - start
+        }
+        self.logger.info(f"Model grown: {n_trees} trees added, {n_removed} removed, "
+                         f"{n_estimators} trees")
+
+    def compile_model(self) -> CompiledForest:
+        """
+        Export the trained forest into flat NumPy arrays.
+
+        The compiled forest gives the same predictions as the trained model with
+        much lower per-call overhead, and can be saved with save_model.
+
+        Returns:
+            CompiledForest: The compiled version of the current model.
+        """
+        try:
+            compiled = CompiledForest.from_sklearn(self.model)
+        except Exception as e:
+            self.logger.error(f"Error compiling the model: {e}")
+            raise ValueError(f"Error compiling the model: {e}")
+
+        self.logger.info(f"Model compiled: {compiled.n_estimators} trees, "
+                         f"{len(compiled.feature)} nodes, "
+                         f"{compiled.nbytes / 1e6:.1f} MB")
+        return compiled
+
+    def compress_model(self, X_valid, y_valid, tolerance: float = COMPRESS_TOLERANCE,
+                       max_depths: list = COMPRESS_MAX_DEPTHS,
+                       threshold_dtype: str = COMPRESS_THRESHOLD_DTYPE,
+                       value_dtype: str = COMPRESS_VALUE_DTYPE) -> CompiledForest:
+        """
+        Compile the smallest forest scoring within tolerance of the trained one.
+
+        Trees are added greedily, each time the one that most improves the
+        validation accuracy of the subset, until both the accuracy and the ROC
+        AUC are at most tolerance below those of the full forest. The selected
+        trees are then cut at the smallest of max_depths that still keeps both
+        scores within tolerance, and the thresholds and leaf probabilities are
+        stored in threshold_dtype and value_dtype (the full precision is kept if
+        the reduced one falls out of tolerance). The data must not have been
+        used for training, or every tree looks perfect on it. The scores recorded
+        in self.compression are measured on the same data, so they are in-sample:
+        the compressed model is to be evaluated on another held-out split.
+
+        Args:
+            X_valid: The feature matrix of the validation data.
+            y_valid: The target vector of the validation data.
+            tolerance (float): The largest accepted drop in accuracy and ROC AUC.
+            max_depths (list[int]): The candidate tree depths.
+            threshold_dtype (str): The dtype of the compressed split thresholds.
+            value_dtype (str): The dtype of the compressed leaf probabilities.
+
+        Returns:
+            CompiledForest: The compressed forest.
+        """
+        model = getattr(self.model, 'fallback', self.model)
+        if not isinstance(model, RandomForestClassifier):
+            self.logger.error(f"Cannot compress a {type(model).__name__}, a pickled forest is needed")
+            raise ValueError(f"Cannot compress a {type(model).__name__}, a pickled forest is needed")
+
+        # Trees predict class indices and were fitted on plain float32 arrays
+        X = np.asarray(X_valid, dtype=np.float32)
+        y = np.asarray(y_valid)
+        y_index = np.searchsorted(model.classes_, y)
+        tree_proba = np.stack([tree.predict_proba(X) for tree in model.estimators_]).astype(np.float32)
+
+        def scores(proba):
+            # Binary problems are scored on the probability of the positive class
+            auc_proba = proba[:, 1] if len(model.classes_) == 2 else proba
+            return (accuracy_score(y, model.classes_.take(np.argmax(proba, axis=1))),
+                    roc_auc_score(y, auc_proba, multi_class='ovr', labels=model.classes_))
+
+        def within(candidate):
+            return all(score >= reference - tolerance for score, reference in zip(candidate, full))
+
+        full = scores(tree_proba.mean(axis=0))
+
+        # Forward selection: the tree whose addition gives the best subset accuracy
+        selected = []
+        remaining = np.ones(len(model.estimators_), dtype=bool)
+        total = np.zeros(tree_proba.shape[1:], dtype=np.float32)
+        while remaining.any():
+            candidates = np.flatnonzero(remaining)
+            votes = np.argmax(total + tree_proba[candidates], axis=2)
+            best = candidates[np.argmax((votes == y_index).mean(axis=1))]
+            selected.append(int(best))
+            remaining[best] = False
+            total += tree_proba[best]
+            subset = scores(total / len(selected))
+            if within(subset):
+                break
+
+        forest = copy.copy(model)
+        forest.estimators_ = [model.estimators_[i] for i in selected]
+        forest.n_estimators = len(selected)
+        compressed = CompiledForest.from_sklearn(forest)
+
+        # Cut the trees as shallow as the tolerance allows
+        for depth in sorted(max_depths, reverse=True):
+            if depth >= compressed.max_depth:
+                continue
+            truncated = compressed.truncate(depth)
+            candidate = scores(truncated.predict_proba(X))
+            if not within(candidate):
+                break
+            compressed, subset = truncated, candidate
+
+        reduced = compressed.astype(threshold_dtype, value_dtype)
+        candidate = scores(reduced.predict_proba(X))
+        if within(candidate):
+            compressed, subset = reduced, candidate
+        else:
+            self.logger.warning(f"{value_dtype} leaf probabilities fall out of tolerance, "
+                                "keeping full precision")
+
+        self.compression = {
+            'trees': selected, 'n_estimators': len(selected), 'max_depth': compressed.max_depth,
+            'threshold_dtype': compressed.threshold.dtype.name,
+            'value_dtype': compressed.value.dtype.name, 'tolerance': tolerance,
+            # Scores on the rows the trees were selected on, so biased upwards; the
+            # compressed model has to be scored on held-out rows to compare it fairly
+            'selection_accuracy': {'before': full[0], 'after': subset[0]},
+            'selection_roc_auc': {'before': full[1], 'after': subset[1]}
+        }
+        self.logger.info(f"Model compressed: {len(model.estimators_)} -> {len(selected)} trees, "
+                         f"max depth {compressed.max_depth}, {compressed.nbytes / 1e6:.2f} MB. "
+                         f"Selection (in-sample) accuracy {full[0]:.4f} -> {subset[0]:.4f}, "
+                         f"ROC AUC {full[1]:.4f} -> {subset[1]:.4f}")
+        return compressed
+
+    def build_prediction_table(self, X) -> PredictionTable:
+        """
+        Precompute predictions over the feature grid observed in X.
+
+        Args:
+            X: The feature matrix (typically X_train) defining the grid.
+
+        Returns:
+            PredictionTable: The table, with the current model as fallback.
+        """
+        return PredictionTable.build(self.model, X, MAX_PREDICTION_TABLE_SIZE)
     
     def predict(self, data):
         return self.model.predict(data)
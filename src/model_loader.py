@@ -0,0 +1,48 @@
+import os
+import pickle
+
+from config.classifier_config import USE_PREDICTION_TABLE
+from src.compiled_forest import CompiledForest
+from src.prediction_table import PredictionTable
+
+from src.setup_logger import get_logger
+
+logger = get_logger(__name__)
+
+def load_model(path: str):
+    """
+    Load a trained model for inference.
+
+    Files ending in .npz or .forest are loaded as a CompiledForest, any other
+    file as a pickle. The arrays of a .forest file are memory-mapped, so
+    several processes serving the same model share one copy in memory.
+    If a prediction table was saved next to the model, the model is wrapped in it
+    and only serves the rows outside the table's grid.
+
+    This module only depends on NumPy, so serving code can import it without
+    the training stack; sklearn is imported by pickle when a pickled forest is loaded.
+
+    Args:
+        path (str): The file path to load the model from.
+
+    Returns:
+        The loaded model.
+    """
+    # Check if the file exists
+    if not os.path.exists(path):
+        logger.error(f"The file at {path} does not exist")
+        raise FileNotFoundError(f"The file at {path} does not exist")
+
+    if str(path).endswith(('.npz', '.forest')):
+        model = CompiledForest.load(path)
+    else:
+        with open(path, 'rb') as f:
+            model = pickle.load(f)
+    logger.info(f"Model loaded from {path}")
+
+    table_path = PredictionTable.path_for(path)
+    if USE_PREDICTION_TABLE and os.path.exists(table_path):
+        model = PredictionTable.load(table_path, fallback=model)
+        logger.info(f"Prediction table loaded from {table_path}")
+
+    return model
@@ -0,0 +1,196 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from config.classifier_config import MODEL_CACHE_SIZE
+from src.model_loader import load_model
+from src.prediction_table import PredictionTable
+
+from src.setup_logger import get_logger
+
+class ModelRegistry:
+    """
+    A process-wide registry of loaded models shared across requests.
+
+    Each model file is loaded once and kept in a bounded LRU cache keyed by
+    its path and the modification times of the file and of its prediction
+    table. When a cached file or its table changes on disk, the
+    previous version keeps being served while the new one is loaded in a
+    background thread, so requests never wait for a reload.
+
+    Attributes:
+        max_size (int): The maximum number of models kept in memory.
+        hits (int): The number of lookups served from the cache.
+        misses (int): The number of lookups that had to load from disk.
+
+    Methods:
+        get_model(path: str):
+            Return the model stored at path, loading it if needed.
+        warm(paths: list[str]) -> None:
+            Load the given models ahead of the first request.
+        wait() -> None:
+            Block until all pending background reloads have finished.
+        clear() -> None:
+            Drop every cached model.
+        shutdown() -> None:
+            Stop the background reload worker.
+    """
+
+    def __init__(self, max_size: int = MODEL_CACHE_SIZE, loader=None):
+        self.logger = get_logger(__name__)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._loader = loader or load_model
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        # {path: [lock, number of threads using it]}, only while a path is being loaded
+        self._path_locks = {}
+        self._reloading = {}
+        # Started on the first reload, and again after a shutdown
+        self._executor = None
+
+    def get_model(self, path: str):
+        """
+        Return the model stored at path, loading it if needed.
+
+        Args:
+            path (str): The file path of the model.
+
+        Returns:
+            The loaded model.
+        """
+        path = os.path.abspath(path)
+        if not os.path.exists(path):
+            self.logger.error(f"The file at {path} does not exist")
+            raise FileNotFoundError(f"The file at {path} does not exist")
+        key = (path, self._version(path))
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key]
+
+            stale_key = self._find_key(path)
+            if stale_key is not None:
+                # Serve the previous version while the new one loads
+                self._models.move_to_end(stale_key)
+                self.hits += 1
+                self._schedule_reload(path)
+                return self._models[stale_key]
+
+            self.misses += 1
+
+        return self._load(path)
+
+    def warm(self, paths: list[str]) -> None:
+        """
+        Load the given models ahead of the first request.
+
+        Args:
+            paths (list[str]): The file paths of the models to pre-load.
+        """
+        for path in paths:
+            self.get_model(path)
+            self.logger.info(f"Model pre-loaded from {path}")
+
+    def wait(self) -> None:
+        """
+        Block until all pending background reloads have finished.
+        """
+        with self._lock:
+            pending = list(self._reloading.values())
+        for future in pending:
+            future.result()
+
+    def clear(self) -> None:
+        """
+        Drop every cached model.
+        """
+        with self._lock:
+            self._models.clear()
+
+    def shutdown(self) -> None:
+        """
+        Stop the background reload worker.
+
+        A later reload starts a new worker, so the registry can be used again
+        (e.g. by a second lifespan of the app).
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        # Pending reloads take the lock when they finish, so it is released first
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    @staticmethod
+    def _version(path: str) -> tuple:
+        # A rebuilt prediction table changes the served model as much as the model file
+        table_path = PredictionTable.path_for(path)
+        table_mtime = os.stat(table_path).st_mtime_ns if os.path.exists(table_path) else None
+        return (os.stat(path).st_mtime_ns, table_mtime)
+
+    def _find_key(self, path: str):
+        for cached_path, version in self._models:
+            if cached_path == path:
+                return (cached_path, version)
+        return None
+
+    @contextmanager
+    def _path_lock(self, path: str):
+        with self._lock:
+            entry = self._path_locks.setdefault(path, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            # Dropped by the last user, so the dict does not grow with every path ever loaded
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._path_locks[path]
+
+    def _load(self, path: str):
+        # Only one thread loads a given file; the others wait for its result
+        with self._path_lock(path):
+            key = (path, self._version(path))
+            with self._lock:
+                if key in self._models:
+                    return self._models[key]
+
+            model = self._loader(path)
+
+            with self._lock:
+                stale_key = self._find_key(path)
+                if stale_key is not None:
+                    del self._models[stale_key]
+                self._models[key] = model
+                while len(self._models) > self.max_size:
+                    evicted_key, _ = self._models.popitem(last=False)
+                    self.logger.info(f"Model evicted from cache: {evicted_key[0]}")
+            return model
+
+    def _schedule_reload(self, path: str) -> None:
+        # Must be called with self._lock held
+        if path in self._reloading:
+            return
+
+        def reload():
+            try:
+                self._load(path)
+                self.logger.info(f"Model reloaded from {path}")
+            except Exception as e:
+                self.logger.error(f"Error reloading model from {path}: {e}")
+            finally:
+                with self._lock:
+                    self._reloading.pop(path, None)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="model-reload"
+            )
+        self._reloading[path] = self._executor.submit(reload)
@@ -0,0 +1,247 @@
+import bisect
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from config.classifier_config import (
+    MODEL_FOLDER, ROUTING_MODELS, SHADOW_MODELS, SHADOW_WORKERS,
+    SHADOW_MAX_PENDING
+)
+
+from src.setup_logger import get_logger
+
+class ModelRouter:
+    """
+    A routing layer on the model registry for A/B and shadow serving.
+
+    Requests are split between a champion and challenger models by weight. The
+    model of a request is picked from a hash of its key (the listing id), so a
+    listing always gets the same model while the weights are unchanged. After
+    a request is answered, its features and served predictions are handed to a
+    background thread pool where every shadow model scores them too, so shadow
+    models never add latency to the response. The agreement of each shadow
+    model with the served predictions is aggregated per model. When
+    max_pending shadow batches are already waiting, new ones are dropped and
+    counted instead of queueing without bound.
+
+    Attributes:
+        registry (ModelRegistry): The registry the models are loaded from and kept in.
+        routes (dict): {model file: weight} of the champion and challenger models.
+        shadows (list): The model files scored in the background.
+        model_folder (str): The folder the model files are relative to.
+        max_pending (int): The maximum number of shadow batches waiting or running.
+        n_workers (int): The number of threads scoring the shadow models.
+        dropped (int): The number of shadow batches dropped.
+
+    Methods:
+        enabled -> bool:
+            Whether any routing model is configured.
+        choose(key=None) -> str:
+            Return the routing model of a request.
+        get_model(name: str):
+            Return a routed or shadow model from the registry.
+        warm() -> None:
+            Load every routing and shadow model ahead of the first request.
+        observe(name: str, features: np.ndarray, predictions) -> None:
+            Count a routed request and queue its shadow predictions.
+        stats() -> dict:
+            Return the traffic and agreement statistics of every model.
+        wait() -> None:
+            Block until the queued shadow predictions have finished.
+        shutdown() -> None:
+            Stop the shadow workers.
+    """
+
+    def __init__(self, registry, routes: dict = ROUTING_MODELS, shadows: list = SHADOW_MODELS,
+                 model_folder: str = MODEL_FOLDER, n_workers: int = SHADOW_WORKERS,
+                 max_pending: int = SHADOW_MAX_PENDING, seed: int = None):
+        self.logger = get_logger(__name__)
+        self.registry = registry
+        self.routes = dict(routes)
+        self.shadows = list(shadows)
+        self.model_folder = model_folder
+        self.max_pending = max_pending
+        self.dropped = 0
+
+        weights = np.asarray(list(self.routes.values()), dtype=np.float64)
+        if (weights < 0).any() or (len(weights) and weights.sum() <= 0):
+            self.logger.error(f"Invalid routing weights: {self.routes}")
+            raise ValueError(f"Invalid routing weights: {self.routes}")
+        # Upper bound of each model's share of [0, 1)
+        self._names = list(self.routes)
+        self._bounds = (np.cumsum(weights) / weights.sum()).tolist() if len(weights) else []
+
+        n_models = len(set(self._names) | set(self.shadows))
+        if n_models > getattr(registry, 'max_size', n_models):
+            self.logger.warning(f"{n_models} routing and shadow models do not fit in the "
+                                f"registry cache of {registry.max_size} (MODEL_CACHE_SIZE)")
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._pending_done = threading.Condition(self._lock)
+        self._stats = {
+            name: {'requests': 0, 'rows': 0, 'shadow_rows': 0, 'agreements': 0,
+                   'shadow_seconds': 0.0, 'errors': 0}
+            for name in self._names + [name for name in self.shadows if name not in self.routes]
+        }
+        self.n_workers = n_workers
+        # Only started when there are shadow models, and again after a shutdown
+        self._executor = None
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether any routing model is configured.
+        """
+        return bool(self._names)
+
+    def choose(self, key=None) -> str:
+        """
+        Return the routing model of a request.
+
+        Args:
+            key: The routing key of the request (e.g. the listing id), None for a random pick.
+
+        Returns:
+            str: The model file the request is served by.
+        """
+        if not self._names:
+            self.logger.error("No routing models are configured")
+            raise ValueError("No routing models are configured")
+        if key is None:
+            point = self._random.random()
+        else:
+            point = zlib.crc32(str(key).encode()) / 2 ** 32
+        index = bisect.bisect_right(self._bounds, point)
+        return self._names[min(index, len(self._names) - 1)]
+
+    def get_model(self, name: str):
+        """
+        Return a routed or shadow model from the registry.
+
+        Args:
+            name (str): The model file, relative to model_folder.
+
+        Returns:
+            The loaded model.
+        """
+        return self.registry.get_model(Path(self.model_folder) / name)
+
+    def warm(self) -> None:
+        """
+        Load every routing and shadow model ahead of the first request.
+        """
+        for name in self._stats:
+            self.get_model(name)
+        if self._stats:
+            self.logger.info(f"Routing {self.routes}, shadowing {self.shadows}")
+
+    def observe(self, name: str, features: np.ndarray, predictions) -> None:
+        """
+        Count a routed request and queue its shadow predictions.
+
+        The features are copied, so the caller can reuse its buffer right away.
+
+        Args:
+            name (str): The model file that served the request.
+            features (np.ndarray): The (n_rows, n_features) features of the request.
+            predictions: The (n_rows,) predictions served to the client.
+        """
+        predictions = np.array(predictions, ndmin=1)
+        shadows = [shadow for shadow in self.shadows if shadow != name]
+        with self._lock:
+            self._stats[name]['requests'] += 1
+            self._stats[name]['rows'] += len(predictions)
+            if not shadows or not len(predictions):
+                return
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.n_workers, thread_name_prefix="shadow"
+                )
+            executor = self._executor
+        features = np.array(features, dtype=np.float64, ndmin=2)
+        executor.submit(self._score_shadows, shadows, features, predictions)
+
+    def _score_shadows(self, shadows: list, features: np.ndarray, predictions: np.ndarray):
+        try:
+            for shadow in shadows:
+                try:
+                    model = self.get_model(shadow)
+                    start = time.perf_counter()
+                    shadow_predictions = model.predict(features)
+                    elapsed = time.perf_counter() - start
+                except Exception as e:
+                    self.logger.error(f"Error in the shadow predictions of {shadow}: {e}")
+                    with self._lock:
+                        self._stats[shadow]['errors'] += 1
+                    continue
+
+                agreements = int(np.count_nonzero(shadow_predictions == predictions))
+                with self._lock:
+                    record = self._stats[shadow]
+                    record['shadow_rows'] += len(predictions)
+                    record['agreements'] += agreements
+                    record['shadow_seconds'] += elapsed
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._pending_done.notify_all()
+
+    def stats(self) -> dict:
+        """
+        Return the traffic and agreement statistics of every model.
+
+        Returns:
+            dict: {'models': {name: {'weight', 'shadow', 'requests', 'rows',
+                'shadow_rows', 'agreement', 'shadow_ms_per_row', 'errors'}},
+                'pending': n, 'dropped': n}. 'agreement' is the fraction of shadow
+                predictions equal to the served ones (None before any).
+        """
+        total = sum(self.routes.values())
+        with self._lock:
+            models = {
+                name: {
+                    'weight': self.routes.get(name, 0) / total if total else 0.0,
+                    'shadow': name in self.shadows,
+                    'requests': record['requests'],
+                    'rows': record['rows'],
+                    'shadow_rows': record['shadow_rows'],
+                    'agreement': record['agreements'] / record['shadow_rows']
+                        if record['shadow_rows'] else None,
+                    'shadow_ms_per_row': 1000 * record['shadow_seconds'] / record['shadow_rows']
+                        if record['shadow_rows'] else None,
+                    'errors': record['errors']
+                }
+                for name, record in self._stats.items()
+            }
+            return {'models': models, 'pending': self._pending, 'dropped': self.dropped}
+
+    def wait(self) -> None:
+        """
+        Block until the queued shadow predictions have finished.
+        """
+        with self._lock:
+            self._pending_done.wait_for(lambda: self._pending == 0)
+
+    def shutdown(self) -> None:
+        """
+        Stop the shadow workers.
+
+        The next shadow prediction starts new workers, so the router can be used
+        again (e.g. by a second lifespan of the app).
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        # The shadow tasks take the lock when they finish, so it is released first
+        if executor is not None:
+            executor.shutdown(wait=True)
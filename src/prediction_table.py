@@ -0,0 +1,235 @@
+import os
+import numpy as np
+
+from src.setup_logger import get_logger
+
+class PredictionTable:
+    """
+    Precomputed predictions over the observed feature grid.
+
+    All model features are small-cardinality numbers, so the cartesian product
+    of the values seen during training is small enough to score once ahead of
+    time. The predictions and probabilities are stored in dense arrays indexed
+    by the position of each feature value in the grid, so a prediction is an
+    O(1) lookup. Rows with a value outside the grid are sent to the fallback
+    model.
+
+    Attributes:
+        grid_values (list[np.ndarray]): The sorted observed values of each feature.
+        proba (np.ndarray): The class probabilities of every grid cell.
+        predictions (np.ndarray): The index in classes_ of every grid cell's prediction.
+        classes_ (np.ndarray): The class labels.
+        fallback: The model used for rows outside the grid.
+
+    Methods:
+        build(model, X, max_size: int) -> PredictionTable:
+            Score every combination of the feature values observed in X.
+        grid_size(X) -> int:
+            Return the number of cells of the grid built from X.
+        lookup(X) -> tuple[np.ndarray, np.ndarray]:
+            Return the grid cell of every row and whether it is inside the grid.
+        predict_proba(X) -> np.ndarray:
+            Predict class probabilities for X.
+        predict(X) -> np.ndarray:
+            Predict classes for X.
+        save(path: str) -> None:
+            Save the table to a .npz file.
+        load(path: str, fallback) -> PredictionTable:
+            Load a table from a .npz file.
+        path_for(model_path: str) -> str:
+            Return the table file stored next to a model file.
+    """
+
+    def __init__(self, grid_values, proba, predictions, classes_, fallback=None):
+        self.grid_values = [np.asarray(values, dtype=np.float64) for values in grid_values]
+        self.shape = tuple(len(values) for values in self.grid_values)
+        self.proba = proba
+        self.predictions = predictions
+        self.classes_ = classes_
+        self.fallback = fallback
+
+    @staticmethod
+    def _observed_values(X) -> list[np.ndarray]:
+        X = np.asarray(X, dtype=np.float64)
+        return [np.unique(column[~np.isnan(column)]) for column in X.T]
+
+    @staticmethod
+    def grid_size(X) -> int:
+        """
+        Return the number of cells of the grid built from X.
+
+        Args:
+            X: The feature matrix the grid is built from.
+
+        Returns:
+            int: The number of feature value combinations.
+        """
+        return int(np.prod([len(values) for values in PredictionTable._observed_values(X)]))
+
+    @classmethod
+    def build(cls, model, X, max_size: int) -> "PredictionTable":
+        """
+        Score every combination of the feature values observed in X.
+
+        Args:
+            model: The trained model, also used as the fallback.
+            X: The feature matrix (typically X_train) defining the grid.
+            max_size (int): The maximum number of grid cells.
+
+        Returns:
+            PredictionTable: The table covering the observed grid.
+        """
+        grid_values = cls._observed_values(X)
+        size = int(np.prod([len(values) for values in grid_values]))
+        if size > max_size:
+            get_logger(__name__).error(f"Prediction grid too large: {size} > {max_size}")
+            raise ValueError(f"Prediction grid too large: {size} > {max_size}")
+
+        # Cells are enumerated in the same (C) order as np.ravel_multi_index
+        grid = np.stack(
+            [axis.ravel() for axis in np.meshgrid(*grid_values, indexing='ij')], axis=1
+        )
+        if hasattr(X, 'columns'):
+            import pandas as pd
+            grid = pd.DataFrame(grid, columns=X.columns)
+
+        proba = np.asarray(model.predict_proba(grid), dtype=np.float64)
+        table = cls(
+            grid_values=grid_values,
+            proba=proba,
+            predictions=np.argmax(proba, axis=1).astype(np.int8),
+            classes_=np.asarray(model.classes_),
+            fallback=model
+        )
+        get_logger(__name__).info(f"Prediction table built: {size} cells")
+        return table
+
+    def lookup(self, X) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the grid cell of every row and whether it is inside the grid.
+
+        Args:
+            X: The feature matrix.
+
+        Returns:
+            tuple: The flat cell index of each row (0 when outside the grid),
+                and a boolean mask of the rows inside the grid.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.grid_values):
+            get_logger(__name__).error(f"Expected {len(self.grid_values)} features, "
+                                       f"got an array of shape {X.shape}")
+            raise ValueError(f"Expected {len(self.grid_values)} features, "
+                             f"got an array of shape {X.shape}")
+        found = np.ones(X.shape[0], dtype=bool)
+        positions = []
+        for column, values in zip(X.T, self.grid_values):
+            position = np.minimum(np.searchsorted(values, column), len(values) - 1)
+            found &= values[position] == column
+            positions.append(position)
+
+        index = np.ravel_multi_index(positions, self.shape)
+        index[~found] = 0
+        return index, found
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Predict class probabilities for X.
+
+        Args:
+            X: The feature matrix.
+
+        Returns:
+            np.ndarray: A (n_rows, n_classes) array of probabilities.
+        """
+        index, found = self.lookup(X)
+        proba = self.proba[index]
+        if not found.all():
+            proba[~found] = self._fallback_model().predict_proba(np.asarray(X)[~found])
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict classes for X.
+
+        Args:
+            X: The feature matrix.
+
+        Returns:
+            np.ndarray: The predicted class of each row.
+        """
+        index, found = self.lookup(X)
+        predictions = self.classes_[self.predictions[index]]
+        if not found.all():
+            predictions[~found] = self._fallback_model().predict(np.asarray(X)[~found])
+        return predictions
+
+    def _fallback_model(self):
+        if self.fallback is None:
+            get_logger(__name__).error("Input outside the prediction grid and no fallback model")
+            raise ValueError("Input outside the prediction grid and no fallback model")
+        return self.fallback
+
+    def save(self, path: str) -> None:
+        """
+        Save the table to a .npz file.
+
+        The table is written to a temporary file and then moved into place, so a
+        registry reloading the model never reads a partly written table.
+
+        Args:
+            path (str): The file path to save the table to.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                grid_values=np.concatenate(self.grid_values),
+                grid_shape=np.array(self.shape),
+                proba=self.proba,
+                predictions=self.predictions,
+                classes_=self.classes_
+            )
+        os.replace(tmp_path, path)
+        get_logger(__name__).info(f"Prediction table saved to {path}")
+
+    @classmethod
+    def load(cls, path: str, fallback=None) -> "PredictionTable":
+        """
+        Load a table from a .npz file.
+
+        Args:
+            path (str): The file path to load the table from.
+            fallback: The model used for rows outside the grid.
+
+        Returns:
+            PredictionTable: The loaded table.
+        """
+        # Check if the file exists
+        if not os.path.exists(path):
+            get_logger(__name__).error(f"The file at {path} does not exist")
+            raise FileNotFoundError(f"The file at {path} does not exist")
+
+        with np.load(path, allow_pickle=False) as arrays:
+            splits = np.cumsum(arrays['grid_shape'])[:-1]
+            return cls(
+                grid_values=np.split(arrays['grid_values'], splits),
+                proba=arrays['proba'],
+                predictions=arrays['predictions'],
+                classes_=arrays['classes_'],
+                fallback=fallback
+            )
+
+    @staticmethod
+    def path_for(model_path: str) -> str:
+        """
+        Return the table file stored next to a model file.
+
+        Args:
+            model_path (str): The file path of the model.
+
+        Returns:
+            str: The file path of its prediction table (e.g. model_<ts>.pkl.table.npz),
+                distinct for every model file.
+        """
+        return str(model_path) + '.table.npz'
@@ -1,27 +1,103 @@
+import atexit
+import copy
 import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 LOG_FOLDER = "logs/"
 LOG_LEVEL = logging.INFO
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Handlers run on a background thread fed by the queue, one listener per process
+_listener = None
+_queue_handler = None
+
+class _ListenerFormatQueueHandler(QueueHandler):
+    # QueueHandler.prepare formats the whole record on the calling thread. Only
+    # the message args are merged here, as they may change after the call (e.g.
+    # a LazyFormat of a DataFrame), the formatter (time, traceback) runs on the listener
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
 def setup_logger(current_time):
+    # Configure logging only once per process, later calls are no-ops
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
     # Set up logging and create a logger file
     log_file = Path(LOG_FOLDER) / f'log_file_{current_time}.log'
-    logging.basicConfig(
-        level=LOG_LEVEL,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        filename=log_file,
-        filemode='w'
-    )
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.FileHandler(log_file, mode='w')
+    file_handler.setFormatter(formatter)
 
     # Create a console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(LOG_LEVEL)
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     console_handler.setFormatter(formatter)
 
-    # Add console handler to the root logger
-    logging.getLogger('').addHandler(console_handler)
+    # The calling thread only merges the message args and enqueues the record,
+    # formatting and I/O happen on the listener
+    log_queue = queue.SimpleQueue()
+    _queue_handler = _ListenerFormatQueueHandler(log_queue)
+    root_logger = logging.getLogger('')
+    root_logger.setLevel(LOG_LEVEL)
+    root_logger.addHandler(_queue_handler)
+
+    _listener = QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(shutdown_logger)
+
+def shutdown_logger():
+    # Flush the queued records and detach the handlers
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger('').removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
+
+def _reset_after_fork():
+    # The listener thread does not survive a fork, so child processes
+    # (e.g. process pool workers) write through the handlers directly
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    root_logger = logging.getLogger('')
+    root_logger.removeHandler(_queue_handler)
+    for handler in _listener.handlers:
+        root_logger.addHandler(handler)
+    _listener = None
+    _queue_handler = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+class LazyFormat:
+    """
+    Defer an expensive log payload until the record is actually emitted.
+
+    Pass it as a %-style argument, e.g.
+    logger.debug("Data: \\n%s", LazyFormat(df.head)), so the payload is never
+    built when the level is disabled.
+    """
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
 
 def get_logger(name):
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
@@ -0,0 +1,178 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+from pathlib import Path
+import pandas as pd
+
+from config.preprocessing_config import CACHE_FOLDER, CACHE_MAX_BYTES, CACHE_MAX_AGE_DAYS
+
+from src.setup_logger import get_logger
+
+class StageCache:
+    """
+    A content-addressed on-disk cache of preprocessing stage outputs.
+
+    Every stage output is stored under a key hashed from the key of the stage
+    before it, the source code of the stage and the config values it depends
+    on. The first key starts from a hash of the input file content, so a key
+    only matches when the input, the code and the config of every stage up to
+    it are unchanged. Entries are pickled DataFrames, so the dtypes (ordered
+    categoricals included) come back exactly as they were stored. Entries
+    older than max_age_days are evicted, then the least recently used ones
+    until the cache fits in max_bytes.
+
+    Attributes:
+        folder (Path): The folder holding the entries.
+        max_bytes (int): The maximum total size of the entries.
+        max_age_days (float): The maximum age of an unused entry.
+        hits (int): The number of lookups served from the cache.
+        misses (int): The number of lookups not found in the cache.
+
+    Methods:
+        fingerprint(path: str) -> str:
+            Return a hash of the content of a file.
+        key(parent: str, step, config: dict) -> str:
+            Return the key of a stage output.
+        get(key: str) -> pd.DataFrame:
+            Return the cached output for key, or None.
+        put(key: str, df: pd.DataFrame) -> None:
+            Store a stage output and evict old entries.
+        evict() -> None:
+            Remove expired entries, then the least recently used ones over max_bytes.
+        clear() -> None:
+            Remove every entry.
+    """
+
+    SUFFIX = '.pkl'
+
+    def __init__(self, folder: str = CACHE_FOLDER, max_bytes: int = CACHE_MAX_BYTES,
+                 max_age_days: float = CACHE_MAX_AGE_DAYS):
+        self.logger = get_logger(__name__)
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(path: str, block_size: int = 1 << 20) -> str:
+        """
+        Return a hash of the content of a file.
+
+        Args:
+            path (str): The file path.
+            block_size (int): The number of bytes hashed at a time.
+
+        Returns:
+            str: The hex digest of the file content.
+        """
+        if not os.path.exists(path):
+            get_logger(__name__).error(f"The file at {path} does not exist")
+            raise FileNotFoundError(f"The file at {path} does not exist")
+
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            while block := f.read(block_size):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def key(parent: str, step, config: dict) -> str:
+        """
+        Return the key of a stage output.
+
+        Args:
+            parent (str): The key of the previous stage (or the input fingerprint).
+            step: The function (or method) computing the stage.
+            config (dict): The config values the stage depends on.
+
+        Returns:
+            str: The hex digest identifying the stage output.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(parent.encode())
+        digest.update(inspect.getsource(step).encode())
+        digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.folder / f"{key}{self.SUFFIX}"
+
+    def get(self, key: str) -> pd.DataFrame:
+        """
+        Return the cached output for key, or None.
+
+        Args:
+            key (str): The key of the stage output.
+
+        Returns:
+            pd.DataFrame: The cached output, None on a miss.
+        """
+        path = self._path(key)
+        try:
+            df = pd.read_pickle(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            # A truncated or unreadable entry is a miss, it is rewritten on put
+            self.logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            self.misses += 1
+            return None
+
+        # Refresh the entry so it is evicted last
+        os.utime(path)
+        self.hits += 1
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        """
+        Store a stage output and evict old entries.
+
+        The entry is written to a temporary file and then moved into place, so a
+        concurrent run never reads a partial entry.
+
+        Args:
+            key (str): The key of the stage output.
+            df (pd.DataFrame): The stage output.
+        """
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        df.to_pickle(tmp_path, protocol=5)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove expired entries, then the least recently used ones over max_bytes.
+        """
+        now = time.time()
+        entries = []
+        for path in self.folder.glob(f"*{self.SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age_days * 86400:
+                path.unlink(missing_ok=True)
+                self.logger.info(f"Evicted expired cache entry {path.name}")
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.logger.info(f"Evicted cache entry {path.name} ({size} bytes)")
+
+    def clear(self) -> None:
+        """
+        Remove every entry.
+        """
+        for path in self.folder.glob(f"*{self.SUFFIX}"):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,90 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from src.setup_logger import get_logger
+
+class StageTimer:
+    """
+    A recorder of the wall time and peak memory of named pipeline stages.
+
+    Stages are timed with the stage context manager and can be nested (e.g.
+    the cleaning steps inside 'process_data'). A stage run several times, such
+    as a cleaning step applied to every chunk, adds up its time and keeps its
+    largest peak. Peak memory is measured with tracemalloc, which sees the
+    Python and NumPy allocations (pandas data included) but not the native
+    buffers of sklearn's tree builder, and is the peak above the memory in use
+    when the stage started.
+
+    Attributes:
+        trace_memory (bool): Whether peak memory is measured (tracemalloc slows allocations down).
+        stages (dict): {name: {'time_s', 'peak_memory_mb', 'calls'}} in the order stages started.
+
+    Methods:
+        stage(name: str):
+            Time the enclosed block as the stage name.
+        as_dict() -> dict:
+            Return the recorded stages.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.logger = get_logger(__name__)
+        self.trace_memory = trace_memory
+        self.stages = {}
+        # Peak memory seen so far by each open stage, innermost last
+        self._open = []
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time the enclosed block as the stage name.
+
+        Args:
+            name (str): The name of the stage.
+        """
+        record = self.stages.setdefault(
+            name, {'time_s': 0.0, 'peak_memory_mb': None, 'calls': 0}
+        )
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            current, peak = tracemalloc.get_traced_memory()
+            if self._open:
+                # The parent stage keeps the peak reached before it is reset
+                self._open[-1][1] = max(self._open[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._open.append([current, current])
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak_mb = None
+            if self.trace_memory:
+                start_memory, peak = self._open.pop()
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                peak_mb = (peak - start_memory) / 1e6
+                if self._open:
+                    self._open[-1][1] = max(self._open[-1][1], peak)
+                if started_tracing:
+                    tracemalloc.stop()
+
+            record['time_s'] += elapsed
+            record['calls'] += 1
+            if peak_mb is not None:
+                record['peak_memory_mb'] = max(record['peak_memory_mb'] or 0.0, peak_mb)
+            self.logger.debug(f"Stage '{name}' took {elapsed:.3f}s" + (
+                f", peak memory {peak_mb:.1f} MB" if peak_mb is not None else ""
+            ))
+
+    def as_dict(self) -> dict:
+        """
+        Return the recorded stages.
+
+        Returns:
+            dict: {name: {'time_s': seconds, 'peak_memory_mb': MB or None, 'calls': n}}.
+        """
+        return {name: dict(record) for name, record in self.stages.items()}
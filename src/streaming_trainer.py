@@ -0,0 +1,214 @@
+import os
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree._tree import Tree
+
+from config.classifier_config import (
+    FEATURE_NAMES, MAP_CATEGORY, SPLIT_RATIO, STREAM_BATCH_SIZE, STREAM_SHARD_SIZE,
+    STREAM_TREES_PER_SHARD, RANDOM_STATE_CLASSIFIER, CLASS_WEIGHT, N_JOBS, TARGET_COLUMN
+)
+from src.data_preparation import DataPreparation
+from src.model_evaluator import Evaluator
+
+from src.setup_logger import get_logger
+
+class StreamingTrainer:
+    """
+    A class for training the forest on processed datasets larger than memory.
+
+    The processed Parquet (or CSV) file is streamed in batches of the training
+    columns. Rows are assigned to the test set by a hash of their id, so the
+    split needs no shuffling and is the same on every pass. Training rows are
+    buffered into shards of shard_size rows, a sub-forest is fitted on each
+    shard, and the trees of all sub-forests are merged into a single
+    RandomForestClassifier. Peak memory is bounded by two shards plus the trees.
+
+    Attributes:
+        batch_size (int): The number of rows read per batch.
+        shard_size (int): The number of training rows per sub-forest.
+        trees_per_shard (int): The number of trees fitted on each shard.
+        test_ratio (float): The fraction of listings held out for evaluation.
+        classes (np.ndarray): The classes of the merged forest.
+        n_train_rows (int): The number of rows the last fit trained on.
+
+    Methods:
+        iter_batches(path: str) -> Iterator[tuple[pd.DataFrame, pd.Series, np.ndarray]]:
+            Stream the mapped features, target and test mask of a processed file.
+        is_test(ids) -> np.ndarray:
+            Return whether each listing id belongs to the test set.
+        fit(path: str) -> RandomForestClassifier:
+            Train the merged forest on the training rows of a processed file.
+        evaluate(model, path: str) -> dict:
+            Evaluate a model on the test rows of a processed file.
+    """
+
+    # Resolution of the id hash used for the test split
+    SPLIT_BUCKETS = 1000000
+
+    def __init__(self, batch_size: int = STREAM_BATCH_SIZE, shard_size: int = STREAM_SHARD_SIZE,
+                 trees_per_shard: int = STREAM_TREES_PER_SHARD, test_ratio: float = SPLIT_RATIO):
+        self.logger = get_logger(__name__)
+        self.batch_size = batch_size
+        self.shard_size = shard_size
+        self.trees_per_shard = trees_per_shard
+        self.test_ratio = test_ratio
+        self.classes = np.array([int(label) for label in MAP_CATEGORY])
+        self.n_train_rows = 0
+
+    def iter_batches(self, path: str) -> Iterator[tuple[pd.DataFrame, pd.Series, np.ndarray]]:
+        """
+        Stream the mapped features, target and test mask of a processed file.
+
+        Args:
+            path (str): The file path of a processed .parquet or .csv file.
+
+        Yields:
+            tuple: The mapped features (FEATURE_NAMES columns), the target and
+                the test mask of the next batch.
+        """
+        # Check if the file exists
+        if not os.path.exists(path):
+            self.logger.error(f"The file at {path} does not exist")
+            raise FileNotFoundError(f"The file at {path} does not exist")
+
+        columns = ['id'] + FEATURE_NAMES + [TARGET_COLUMN]
+        if str(path).endswith('.parquet'):
+            batches = (
+                batch.to_pandas() for batch in
+                pq.ParquetFile(path).iter_batches(batch_size=self.batch_size, columns=columns)
+            )
+        else:
+            batches = pd.read_csv(path, usecols=columns, chunksize=self.batch_size)
+
+        for batch in batches:
+            data_prep = DataPreparation(batch)
+            data_prep.mapping_columns()
+            X = data_prep.df[FEATURE_NAMES].astype(np.float64)
+            y = data_prep.df[TARGET_COLUMN].astype(np.int64)
+            yield X, y, self.is_test(data_prep.df['id'])
+
+    def is_test(self, ids) -> np.ndarray:
+        """
+        Return whether each listing id belongs to the test set.
+
+        Args:
+            ids: The listing ids.
+
+        Returns:
+            np.ndarray: A boolean mask of the test rows.
+        """
+        hashes = pd.util.hash_array(np.asarray(ids, dtype=np.int64))
+        return hashes % self.SPLIT_BUCKETS < self.test_ratio * self.SPLIT_BUCKETS
+
+    def fit(self, path: str) -> RandomForestClassifier:
+        """
+        Train the merged forest on the training rows of a processed file.
+
+        A shard is fitted once it holds shard_size rows and every class, or
+        2 * shard_size rows whatever their classes, so a rare class cannot grow
+        the buffer without bound. The trees of a shard missing a class give it a
+        probability of 0. The trailing rows are fitted as a last, partial shard
+        with proportionally fewer trees. The forest has trees_per_shard trees
+        per full shard, so its size grows with the number of training rows.
+
+        Args:
+            path (str): The file path of a processed .parquet or .csv file.
+
+        Returns:
+            RandomForestClassifier: The forest holding the trees of every shard.
+        """
+        estimators = []
+        merged = None
+        buffer, buffered = [], 0
+        seen = set()
+        n_rows = 0
+        self.n_train_rows = 0
+
+        def fit_shard(n_trees):
+            nonlocal merged
+            X = pd.concat([X for X, _ in buffer])
+            y = pd.concat([y for _, y in buffer])
+            forest = RandomForestClassifier(
+                n_estimators=n_trees,
+                random_state=RANDOM_STATE_CLASSIFIER + len(estimators),
+                class_weight=CLASS_WEIGHT,
+                n_jobs=N_JOBS
+            ).fit(X, y)
+            self._align_classes(forest)
+            estimators.extend(forest.estimators_)
+            self.n_train_rows += len(y)
+            if merged is None:
+                merged = forest
+            self.logger.info(f"Shard fitted on {len(y)} rows, classes "
+                             f"{np.unique(y).tolist()}: {len(estimators)} trees")
+
+        for X, y, test in self.iter_batches(path):
+            buffer.append((X[~test], y[~test]))
+            buffered += int((~test).sum())
+            seen.update(np.unique(y[~test]).tolist())
+            n_rows += len(y)
+            if buffered >= 2 * self.shard_size or (
+                    buffered >= self.shard_size and self._has_all_classes(buffer)):
+                fit_shard(self.trees_per_shard)
+                buffer, buffered = [], 0
+
+        if not seen >= set(self.classes.tolist()):
+            self.logger.error(f"The training rows of {path} do not contain every class "
+                              f"{self.classes.tolist()}")
+            raise ValueError(f"The training rows of {path} do not contain every class "
+                             f"{self.classes.tolist()}")
+        if buffered:
+            # Scaled to its size, so a few trailing rows do not weigh as much as a full shard
+            n_trees = self.trees_per_shard
+            if merged is not None:
+                n_trees = max(1, min(n_trees, round(n_trees * buffered / self.shard_size)))
+            fit_shard(n_trees)
+
+        # Every sub-forest has the same classes and features, only the trees differ
+        merged.estimators_ = estimators
+        merged.n_estimators = len(estimators)
+        self.logger.info(f"Streaming training completed: {n_rows} rows read, "
+                         f"{len(estimators)} trees")
+        return merged
+
+    def _has_all_classes(self, buffer: list) -> bool:
+        present = set()
+        for _, y in buffer:
+            present.update(np.unique(y).tolist())
+        return set(self.classes.tolist()) <= present
+
+    def _align_classes(self, forest: RandomForestClassifier) -> None:
+        # Trees store class fractions, the classes missing from the shard get a 0 column
+        if np.array_equal(forest.classes_, self.classes):
+            return
+        columns = np.searchsorted(self.classes, forest.classes_)
+        n_classes = np.array([len(self.classes)], dtype=np.intp)
+        for tree in forest.estimators_:
+            state = tree.tree_.__getstate__()
+            values = np.zeros((state['node_count'], 1, len(self.classes)))
+            values[:, :, columns] = state['values']
+            aligned = Tree(tree.n_features_in_, n_classes, 1)
+            aligned.__setstate__({**state, 'values': values})
+            tree.tree_ = aligned
+            tree.classes_ = self.classes
+            tree.n_classes_ = len(self.classes)
+        forest.classes_ = self.classes
+        forest.n_classes_ = len(self.classes)
+
+    def evaluate(self, model, path: str) -> dict:
+        """
+        Evaluate a model on the test rows of a processed file.
+
+        Args:
+            model: The trained model.
+            path (str): The file path of a processed .parquet or .csv file.
+
+        Returns:
+            dict: The metrics computed by Evaluator.evaluate_stream.
+        """
+        test_batches = ((X[test], y[test]) for X, y, test in self.iter_batches(path))
+        return Evaluator.evaluate_stream(model, test_batches)
@@ -0,0 +1,103 @@
+import pytest
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from src import batch_scorer
+from src.batch_scorer import BatchScorer
+from src.model_handler import ModelHandler
+from src.prediction_table import PredictionTable
+from config.classifier_config import MAP_ROOM_TYPE, MAP_NEIGHB, FEATURE_NAMES
+
+@pytest.fixture
+def listings():
+    rng = np.random.default_rng(0)
+    n = 50
+    return pd.DataFrame({
+        'id': np.arange(n),
+        'accommodates': rng.integers(1, 8, n),
+        'room_type': rng.choice(list(MAP_ROOM_TYPE), n),
+        'beds': rng.integers(1, 4, n),
+        'bedrooms': rng.integers(1, 4, n),
+        'bathrooms': rng.integers(1, 3, n),
+        'neighbourhood': rng.choice(list(MAP_NEIGHB), n),
+        'tv': rng.integers(0, 2, n),
+        'elevator': rng.integers(0, 2, n),
+        'internet': rng.integers(0, 2, n),
+        'latitude': rng.uniform(40.5, 40.9, n),
+        'longitude': rng.uniform(-74.2, -73.7, n)
+    })
+
+@pytest.fixture
+def model_path(tmp_path):
+    rng = np.random.default_rng(1)
+    X_train = rng.integers(1, 6, (200, len(FEATURE_NAMES)))
+    y_train = rng.integers(0, 4, 200)
+    model_handler = ModelHandler()
+    model_handler.model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X_train, y_train)
+    path = tmp_path / "model.pkl"
+    model_handler.save_model(str(path))
+    return str(path)
+
+def test_score_file_jsonl(listings, model_path, tmp_path):
+    input_path = tmp_path / "listings.jsonl"
+    output_path = tmp_path / "scores.jsonl"
+    listings.to_json(input_path, orient='records', lines=True)
+
+    scorer = BatchScorer(model_path, chunk_size=7)
+    n_rows = scorer.score_file(str(input_path), str(output_path))
+
+    # Check if every listing is scored in input order
+    results = pd.read_json(output_path, lines=True)
+    assert n_rows == len(listings)
+    assert results['id'].tolist() == listings['id'].tolist()
+    assert set(results['price_category']) <= {'Low', 'Mid', 'High', 'Lux'}
+
+def test_score_file_csv_with_workers(listings, model_path, tmp_path):
+    input_path = tmp_path / "listings.csv"
+    listings.to_csv(input_path, index=False)
+
+    BatchScorer(model_path, chunk_size=7).score_file(str(input_path), str(tmp_path / "serial.csv"))
+    BatchScorer(model_path, chunk_size=7, n_workers=2).score_file(str(input_path), str(tmp_path / "parallel.csv"))
+
+    # Check if the process pool gives the same results as in-process scoring
+    serial = pd.read_csv(tmp_path / "serial.csv")
+    parallel = pd.read_csv(tmp_path / "parallel.csv")
+    pd.testing.assert_frame_equal(serial, parallel)
+
+def test_score_chunk_unknown_category(listings, model_path):
+    chunk = listings.head(3).copy()
+    chunk.loc[1, 'neighbourhood'] = 'Atlantis'
+
+    results = BatchScorer(model_path).score_chunk(chunk)
+
+    # Check if only the listing with an unknown category is left unscored
+    assert results['price_category'].isna().tolist() == [False, True, False]
+
+def test_score_chunk_missing_columns(listings, model_path):
+    with pytest.raises(ValueError):
+        BatchScorer(model_path).score_chunk(listings.drop(columns=['bedrooms']))
+
+def test_score_chunk_missing_values(listings, model_path, caplog):
+    chunk = listings.head(4).copy()
+    chunk['bedrooms'] = chunk['bedrooms'].astype(float)
+    chunk.loc[1, 'bedrooms'] = np.nan
+    chunk.loc[3, 'room_type'] = 'Igloo'
+
+    results = BatchScorer(model_path).score_chunk(chunk)
+
+    # Check if missing values and unknown categories are reported separately
+    assert results['price_category'].isna().tolist() == [False, True, False, True]
+    assert "1 listings with missing values" in caplog.text
+    assert "1 listings with unknown categories" in caplog.text
+
+def test_worker_forest_single_threaded(model_path, monkeypatch):
+    forest = ModelHandler().load_model(model_path)
+    forest.n_jobs = 4
+    X = np.ones((1, len(FEATURE_NAMES)))
+    monkeypatch.setattr(batch_scorer, 'load_model',
+                        lambda path: PredictionTable.build(forest, X, max_size=1))
+
+    batch_scorer._init_worker(model_path, 10)
+
+    # Check if the fallback forest of a prediction table runs on one core in the pool workers
+    assert batch_scorer._worker_scorer.model.fallback.n_jobs == 1
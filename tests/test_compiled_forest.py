@@ -0,0 +1,121 @@
+import pytest
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from src.compiled_forest import CompiledForest
+from src.model_handler import ModelHandler
+
+@pytest.fixture
+def training_data():
+    rng = np.random.default_rng(0)
+    X = np.column_stack([
+        rng.integers(1, 6, 500), rng.integers(1, 5, 500), rng.integers(1, 9, 500),
+        rng.integers(2, 7, 500) / 2, rng.integers(0, 4, 500)
+    ]).astype(float)
+    y = (X[:, 1] + X[:, 2] + rng.integers(0, 3, 500)) % 4
+    return X, y
+
+@pytest.fixture
+def model(training_data):
+    X, y = training_data
+    return RandomForestClassifier(
+        n_estimators=20, random_state=0, class_weight='balanced'
+    ).fit(X, y)
+
+def test_same_predictions(model, training_data):
+    X, _ = training_data
+    compiled = CompiledForest.from_sklearn(model)
+
+    # Check if the compiled forest matches the original model
+    assert np.array_equal(compiled.predict(X), model.predict(X))
+    assert np.allclose(compiled.predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(compiled.predict(X[:1]), model.predict(X[:1]))
+
+def test_same_predictions_with_missing_values(training_data):
+    X, y = training_data
+    X = X.copy()
+    X[::7, 3] = np.nan
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    compiled = CompiledForest.from_sklearn(model)
+
+    # Check if missing values follow the same branches as in sklearn
+    assert np.array_equal(compiled.predict(X), model.predict(X))
+
+def test_save_and_load(model, training_data, tmp_path):
+    X, _ = training_data
+    compiled = CompiledForest.from_sklearn(model)
+    path = tmp_path / "model.npz"
+    compiled.save(str(path))
+
+    loaded = CompiledForest.load(str(path))
+
+    # Check if the loaded forest gives the same predictions
+    assert np.array_equal(loaded.predict(X), compiled.predict(X))
+    assert np.array_equal(loaded.classes_, model.classes_)
+
+def test_model_handler_serves_compiled_model(model, training_data, tmp_path):
+    X, _ = training_data
+    model_handler = ModelHandler()
+    model_handler.model = model
+    compiled_handler = ModelHandler()
+    compiled_handler.model = model_handler.compile_model()
+    path = tmp_path / "model.npz"
+    compiled_handler.save_model(str(path))
+
+    loaded = ModelHandler().load_model(str(path))
+
+    # Check if the .npz file is loaded as a compiled forest
+    assert isinstance(loaded, CompiledForest)
+    assert np.array_equal(loaded.predict(X), model.predict(X))
+
+def test_save_and_load_mmap(model, training_data, tmp_path):
+    X, _ = training_data
+    compiled = CompiledForest.from_sklearn(model)
+    path = tmp_path / "model.forest"
+    compiled.save(str(path))
+
+    loaded = CompiledForest.load(str(path))
+
+    # Check if the node arrays are memory-mapped read-only
+    assert isinstance(loaded.value.base, np.memmap)
+    assert not loaded.value.flags.writeable
+    assert np.array_equal(loaded.predict(X), compiled.predict(X))
+
+def test_load_mmap_invalid_file(tmp_path):
+    path = tmp_path / "model.forest"
+    path.write_bytes(b"not a forest")
+
+    with pytest.raises(ValueError):
+        CompiledForest.load(str(path))
+
+def test_astype_keeps_splits(model, training_data):
+    X, _ = training_data
+    compiled = CompiledForest.from_sklearn(model)
+    reduced = compiled.astype(np.float32, np.float16)
+
+    # Check if float32 thresholds send every row down the same branches
+    assert reduced.threshold.dtype == np.float32 and reduced.value.dtype == np.float16
+    assert np.array_equal(reduced.apply(X), compiled.apply(X))
+    assert np.allclose(reduced.predict_proba(X), compiled.predict_proba(X), atol=1e-3)
+    assert reduced.nbytes < compiled.nbytes
+
+def test_truncate(model, training_data):
+    X, _ = training_data
+    compiled = CompiledForest.from_sklearn(model)
+
+    # Check if a depth beyond the deepest tree changes nothing
+    assert np.array_equal(compiled.truncate(compiled.max_depth).predict_proba(X),
+                          compiled.predict_proba(X))
+
+    # Check if the truncated trees end at the node reached after max_depth splits
+    truncated = compiled.truncate(2)
+    assert truncated.node_depths().max() == 2 and truncated.max_depth == 2
+    assert len(truncated.feature) <= len(model.estimators_) * 7
+    tree = model.estimators_[0].tree_
+    for row, leaf in zip(X[:50].astype(np.float32), truncated.apply(X[:50])[:, 0]):
+        node = 0
+        for _ in range(2):
+            if tree.children_left[node] == -1:
+                break
+            go_left = row[tree.feature[node]] <= tree.threshold[node]
+            node = tree.children_left[node] if go_left else tree.children_right[node]
+        assert np.allclose(truncated.value[leaf], tree.value[node, 0] / tree.value[node, 0].sum())
@@ -37,4 +37,13 @@ def test_split_data(data_preparation):
     
     # Check if the data is split correctly
     assert len(X_train) + len(X_test) == len(data_preparation.df)
-    assert len(y_train) + len(y_test) == len(data_preparation.df)
\ No newline at end of file
+    assert len(y_train) + len(y_test) == len(data_preparation.df)
+
+def test_to_feature_array(data_preparation):
+    data_preparation.mapping_columns()
+    features = data_preparation.to_feature_array()
+
+    # Check if the array follows the order of FEATURE_NAMES
+    assert features.shape == (3, len(FEATURE_NAMES))
+    assert features.dtype == np.float64
+    assert features[0].tolist() == [MAP_NEIGHB['Manhattan'], MAP_ROOM_TYPE['Entire home/apt'], 2, 1.0, 1]
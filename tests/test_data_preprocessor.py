@@ -83,4 +83,121 @@ def test_process_data(data_processor, sample_df, tmp_path):
     processed_df = pd.read_csv(output_path)
     # Check if the amenities column is dropped. Taking in count renaming from neighbourhood_group_cleansed to neighbourhood
     columns_to_check = set(COLUMNS) - {'amenities'} - {'bathrooms_text'} - {'neighbourhood_group_cleansed'} | set(FEATURE_AMENITIES) | {TARGET_COLUMN} | {'neighbourhood'}
-    assert set(processed_df.columns) == columns_to_check
\ No newline at end of file
+    assert set(processed_df.columns) == columns_to_check
+
+def test_load_data_dtypes(data_processor, sample_df, tmp_path):
+    csv_path = tmp_path / "test_data.csv"
+    sample_df.assign(description='Long unused text').to_csv(csv_path, index=False)
+
+    data_processor.load_data(str(csv_path))
+
+    # Check if only the needed columns are read, with compact dtypes
+    assert 'description' not in data_processor.df.columns
+    assert data_processor.df['room_type'].dtype == 'category'
+    assert data_processor.df['bedrooms'].dtype == np.float32
+
+def test_process_data_in_chunks(sample_df, tmp_path):
+    input_path = tmp_path / "input_data.csv"
+    pd.concat([sample_df] * 5, ignore_index=True).to_csv(input_path, index=False)
+
+    full_processor = DataProcessor()
+    full_processor.process_data(str(input_path), str(tmp_path / "full.csv"))
+    chunked_processor = DataProcessor()
+    chunked_processor.process_data(str(input_path), str(tmp_path / "chunked.csv"), chunksize=4)
+
+    # Check if processing in chunks gives the same data as processing at once
+    pd.testing.assert_frame_equal(chunked_processor.df, full_processor.df)
+
+def test_vectorized_parsers_match_reference(data_processor):
+    bathrooms_text = pd.Series(['1 bath', 'Half-bath', None, '2.5 shared baths', '1 bath', '0 baths'])
+    amenities = pd.Series([
+        '["TV", "Wifi"]', '[]', '["Cable tv", "wifi", "Elevator"]',
+        '["breakfast", "air_conditioning"]', '["kitchen heating", "internet"]', '["tv"]'
+    ])
+    data_processor.df = pd.DataFrame({
+        'bathrooms': np.nan, 'bathrooms_text': bathrooms_text.astype('category'), 'amenities': amenities
+    })
+    data_processor.clean_bathrooms_column()
+    data_processor.preprocess_amenities_column()
+
+    # Check if the bathrooms match parsing every text on its own
+    expected_bathrooms = [1.0, np.nan, np.nan, 2.5, 1.0, 0.0]
+    np.testing.assert_array_equal(data_processor.df['bathrooms'], expected_bathrooms)
+    assert data_processor.df['bathrooms'].dtype == np.float32
+    # Check if the amenities match a substring search over the whole text
+    for amenity in FEATURE_AMENITIES:
+        expected = amenities.str.contains(amenity, regex=False).astype(int)
+        assert data_processor.df[amenity].tolist() == expected.tolist()
+
+def test_missing_amenities(data_processor):
+    data_processor.df = pd.DataFrame({'amenities': ['["tv", "wifi"]', np.nan, None]})
+    data_processor.preprocess_amenities_column()
+
+    # Check if listings without amenities get no amenity instead of failing
+    assert data_processor.df['tv'].tolist() == [1, 0, 0]
+    assert data_processor.df['wifi'].tolist() == [1, 0, 0]
+    for amenity in FEATURE_AMENITIES:
+        assert data_processor.df[amenity].dtype == int
+
+def test_save_and_load_parquet(data_processor, sample_df, tmp_path):
+    input_path = tmp_path / "input_data.csv"
+    output_path = tmp_path / "output_data.parquet"
+    sample_df.to_csv(input_path, index=False)
+    data_processor.process_data(str(input_path), str(output_path))
+
+    loader = DataProcessor()
+    loader.load_processed(str(output_path), columns=['neighbourhood', 'bedrooms', TARGET_COLUMN])
+
+    # Check if only the requested columns are read
+    assert list(loader.df.columns) == ['neighbourhood', 'bedrooms', TARGET_COLUMN]
+    # Check if the dtypes (including text categoricals) survive the round trip
+    expected = data_processor.df[['neighbourhood', 'bedrooms', TARGET_COLUMN]]
+    assert loader.df['neighbourhood'].dtype == 'category'
+    pd.testing.assert_frame_equal(loader.df, expected.reset_index(drop=True))
+
+def test_load_processed_missing_file(data_processor, tmp_path):
+    # Check if a missing file raises FileNotFoundError
+    with pytest.raises(FileNotFoundError):
+        data_processor.load_processed(str(tmp_path / "missing.parquet"))
+
+def test_process_delta(data_processor, sample_df, tmp_path):
+    input_path = tmp_path / "input_data.csv"
+    snapshot_path = tmp_path / "processed_listings_1.parquet"
+    sample_df.to_csv(input_path, index=False)
+    data_processor.process_data(str(input_path), str(snapshot_path))
+
+    # Listing 1 changes price, 2 is deleted, 3 drops below the minimum price, 4 is new
+    delta = pd.concat([sample_df, sample_df.iloc[[0]].assign(id=4)], ignore_index=True)
+    delta['price'] = ['$250.00', '$200.00', '$5.00', '$120.00']
+    delta['is_deleted'] = ['f', 't', 'f', 'f']
+    delta_path = tmp_path / "delta.csv"
+    delta.to_csv(delta_path, index=False)
+
+    output_path = tmp_path / "processed_listings_2.parquet"
+    data_processor.process_delta(str(delta_path), str(snapshot_path), str(output_path))
+
+    # Check if the deleted and no longer valid listings are gone and the upserts are in
+    prices = dict(zip(data_processor.df['id'], data_processor.df['price']))
+    assert prices == {1: 250, 4: 120}
+    # Check if the merged snapshot is saved and equals a full reprocessing of the new data
+    reference = DataProcessor()
+    full_path = tmp_path / "full.csv"
+    delta[delta['is_deleted'] == 'f'].drop(columns='is_deleted').to_csv(full_path, index=False)
+    reference.process_data(str(full_path), str(tmp_path / "full.parquet"))
+    merged = pd.read_parquet(output_path)
+    pd.testing.assert_frame_equal(
+        merged.sort_values('id').reset_index(drop=True),
+        pd.read_parquet(tmp_path / "full.parquet").sort_values('id').reset_index(drop=True),
+        check_categorical=False
+    )
+
+def test_latest_snapshot(tmp_path):
+    for name in ("processed_listings_20240101_000000.csv",
+                 "processed_listings_20240301_000000.parquet",
+                 "preprocessed_listings.csv"):
+        (tmp_path / name).write_text("")
+
+    # Check if the snapshot with the latest timestamp is picked
+    assert DataProcessor.latest_snapshot(str(tmp_path)).endswith("20240301_000000.parquet")
+    with pytest.raises(FileNotFoundError):
+        DataProcessor.latest_snapshot(str(tmp_path / "empty"))
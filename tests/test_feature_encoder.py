@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pytest
+import numpy as np
+import pandas as pd
+from src.data_preparation import DataPreparation
+from src.feature_encoder import FeatureEncoder, UnknownCategory
+from config.classifier_config import FEATURE_NAMES
+
+@pytest.fixture
+def listings():
+    rows = [
+        {'neighbourhood': 'Manhattan', 'room_type': 'Entire home/apt', 'accommodates': 4,
+         'bathrooms': 1, 'bedrooms': 2, 'id': 1},
+        {'neighbourhood': 'Bronx', 'room_type': 'Private room', 'accommodates': 2,
+         'bathrooms': 2, 'bedrooms': 1, 'id': 2},
+        {'neighbourhood': 'Queens', 'room_type': 'Hotel room', 'accommodates': 1,
+         'bathrooms': 1, 'bedrooms': 0, 'id': 3}
+    ]
+    return [SimpleNamespace(**row) for row in rows]
+
+def test_encode_matches_mapping_columns(listings):
+    encoder = FeatureEncoder()
+    data_prep = DataPreparation(pd.DataFrame([vars(listing) for listing in listings])[FEATURE_NAMES])
+    data_prep.mapping_columns()
+    expected = data_prep.to_feature_array()
+
+    # Check if the single and batch encodings match the pandas mapping
+    for i, listing in enumerate(listings):
+        np.testing.assert_array_equal(encoder.encode(listing), expected[i:i + 1])
+    np.testing.assert_array_equal(encoder.encode_many(listings), expected)
+
+    # Check if the single-row buffer is reused and the batch array is not
+    assert encoder.encode(listings[0]) is encoder.encode(listings[1])
+    assert encoder.encode_many([]).shape == (0, len(FEATURE_NAMES))
+
+def test_unknown_categories(listings):
+    encoder = FeatureEncoder()
+    listings[0].neighbourhood = 'Mars'
+    listings[2].room_type = 'Igloo'
+
+    # Check if an unknown category is rejected instead of becoming NaN
+    with pytest.raises(UnknownCategory) as error:
+        encoder.encode(listings[0])
+    assert error.value.unknown == {'neighbourhood': ['Mars']}
+    assert isinstance(error.value, ValueError)
+
+    # Check if the batch error reports every unknown value and listing
+    with pytest.raises(UnknownCategory) as error:
+        encoder.encode_many(listings)
+    assert error.value.unknown == {'neighbourhood': ['Mars'], 'room_type': ['Igloo']}
+    assert error.value.rows == [0, 2]
+
+def test_top_k_categories():
+    proba = np.array([[0.1, 0.2, 0.6, 0.1],
+                      [0.5, 0.0, 0.25, 0.25]])
+    names, top_proba = FeatureEncoder.top_k_categories(proba, np.array([0, 1, 2, 3]), 2)
+
+    # Check if the categories are ordered by probability, ties kept in class order
+    assert names.tolist() == [['High', 'Mid'], ['Low', 'High']]
+    assert top_proba.tolist() == [[0.6, 0.2], [0.5, 0.25]]
@@ -0,0 +1,76 @@
+import json
+import pytest
+import pandas as pd
+from benchmarks.synthetic_data import make_features, make_raw_listings
+from src.data_preparation import DataPreparation
+from src.data_preprocessor import DataProcessor
+from src.hyperparameter_search import HyperparameterSearch
+
+@pytest.fixture
+def data():
+    return make_features(600)
+
+def test_candidates_grid_and_random():
+    space = {'n_estimators': [10, 20], 'max_depth': [2, 4, None]}
+
+    # Check if the grid covers every combination and sampling picks n_iter of them
+    assert len(HyperparameterSearch(space=space).candidates()) == 6
+    sampled = HyperparameterSearch(space=space, n_iter=3).candidates()
+    assert len(sampled) == 3
+    assert all(params in HyperparameterSearch(space=space).candidates() for params in sampled)
+
+def test_unsupported_metric():
+    with pytest.raises(ValueError):
+        HyperparameterSearch(metric='f1')
+
+def test_run_prunes_weak_trials(data, tmp_path):
+    X, y = data
+    # A single process keeps the order, so the strong trial finishes first
+    space = [{'n_estimators': [20], 'max_depth': [None]}, {'n_estimators': [20], 'max_depth': [1]}]
+    search = HyperparameterSearch(space=space, n_workers=1, fractions=[0.25], tolerance=0.0)
+    leaderboard = search.run(X, y)
+
+    # Check if the weak trial is stopped after its first stage
+    assert [trial['status'] for trial in leaderboard] == ['completed', 'pruned']
+    assert leaderboard[1]['n_estimators_trained'] == 5
+    # Check if finished trials carry the evaluation results
+    assert 'roc_auc' in leaderboard[0]['results']
+
+    path = tmp_path / "search.json"
+    search.save_leaderboard(str(path))
+    with open(path) as f:
+        saved = json.load(f)
+    # Check if the best parameters are saved with the leaderboard
+    assert saved['best_params'] == {'max_depth': None, 'n_estimators': 20}
+
+def test_run_in_process_pool(data):
+    X, y = data
+    search = HyperparameterSearch(
+        space={'n_estimators': [5, 10], 'min_samples_leaf': [1, 10]}, n_workers=2
+    )
+    leaderboard = search.run(X, y)
+
+    # Check if every trial is reported, sorted by score among the finished ones
+    assert sorted(trial['trial'] for trial in leaderboard) == [0, 1, 2, 3]
+    scores = [trial['score'] for trial in leaderboard if trial['status'] == 'completed']
+    assert scores == sorted(scores, reverse=True)
+
+def test_run_on_processed_data(tmp_path):
+    raw_path = tmp_path / "raw.csv"
+    make_raw_listings(3000).to_csv(raw_path, index=False)
+    processor = DataProcessor()
+    processor.process_data(raw_path, tmp_path / "processed.parquet")
+    data_prep = DataPreparation(processor.df)
+    data_prep.mapping_columns()
+    X_train, _, y_train, _ = data_prep.split_data()
+
+    # Check if the nullable dtypes of the processed data can be searched
+    search = HyperparameterSearch(space={'n_estimators': [5]}, n_workers=1)
+    leaderboard = search.run(X_train, y_train)
+    assert leaderboard[0]['status'] == 'completed'
+
+    # Check if missing values are rejected with a clear error
+    X_train = X_train.astype({'accommodates': 'Int16'})
+    X_train.iloc[0, X_train.columns.get_loc('accommodates')] = pd.NA
+    with pytest.raises(ValueError, match="missing values"):
+        search.run(X_train, y_train)
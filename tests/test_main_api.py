@@ -0,0 +1,240 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+from sklearn.ensemble import RandomForestClassifier
+
+import main_api
+from config.classifier_config import FEATURE_NAMES
+from src import setup_logger as setup_logger_module
+from src.model_handler import ModelHandler
+from src.model_router import ModelRouter
+from src.setup_logger import shutdown_logger
+
+LISTING = {
+    'id': 1, 'accommodates': 4, 'room_type': 'Entire home/apt', 'beds': 1, 'bedrooms': 2,
+    'bathrooms': 1, 'neighbourhood': 'Manhattan', 'tv': 1, 'elevator': 0, 'internet': 1,
+    'latitude': 40.7, 'longitude': -73.9
+}
+
+def make_listings(n_listings):
+    room_types = ['Entire home/apt', 'Private room', 'Shared room', 'Hotel room']
+    return [
+        dict(LISTING, id=i, accommodates=1 + i % 6, bedrooms=i % 4,
+             room_type=room_types[i % len(room_types)])
+        for i in range(n_listings)
+    ]
+
+@pytest.fixture
+def model_folder(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 6, size=(300, len(FEATURE_NAMES))).astype(float)
+    y = (X[:, 0] + X[:, 1]).astype(int) % 4
+    for name, seed in [('champion.pkl', 0), ('challenger.pkl', 1)]:
+        model_handler = ModelHandler()
+        model_handler.model = RandomForestClassifier(
+            n_estimators=5, max_depth=4, random_state=seed
+        ).fit(X, y)
+        model_handler.save_model(str(tmp_path / name))
+    monkeypatch.setattr(main_api, 'MODEL_FOLDER', str(tmp_path))
+    return tmp_path
+
+@pytest.fixture
+def client(model_folder, tmp_path, monkeypatch):
+    # The lifespan configures logging, the log file goes to the test folder
+    monkeypatch.setattr(setup_logger_module, 'LOG_FOLDER', str(tmp_path))
+    with TestClient(main_api.app) as client:
+        yield client
+    shutdown_logger()
+
+def test_predict_batch(client):
+    listings = make_listings(5)
+    response = client.post('/predict/batch', json={
+        'listings': listings, 'model_file': {'model_path': 'champion.pkl'}
+    })
+    single = [
+        client.post('/predict', json={
+            'input_data': listing, 'model_file': {'model_path': 'champion.pkl'}
+        }).json()['price_category']
+        for listing in listings
+    ]
+
+    # Check if every listing gets the category of a single /predict, in input order
+    assert response.status_code == 200
+    assert response.json() == {'ids': [0, 1, 2, 3, 4], 'price_categories': single}
+
+def test_predict_empty_batch(client):
+    response = client.post('/predict/batch', json={
+        'listings': [], 'model_file': {'model_path': 'champion.pkl'}
+    })
+
+    # Check if an empty batch gets an empty answer
+    assert response.status_code == 200
+    assert response.json() == {'ids': [], 'price_categories': []}
+
+def test_predict_batch_too_large(client, monkeypatch):
+    monkeypatch.setattr(main_api, 'MAX_BATCH_SIZE', 2)
+    response = client.post('/predict/batch', json={
+        'listings': make_listings(3), 'model_file': {'model_path': 'champion.pkl'}
+    })
+
+    # Check if batches above MAX_BATCH_SIZE are rejected
+    assert response.status_code == 413
+    assert "exceeds the limit of 2" in response.json()['detail']
+
+def expected_proba(model_folder, listings):
+    model = ModelHandler().load_model(str(model_folder / 'champion.pkl'))
+    features = main_api.feature_encoder.encode_many(
+        [main_api.ListingInput(**listing) for listing in listings]
+    )
+    return model.predict_proba(features).round(4)
+
+def test_predict_proba_and_top_k(client, model_folder):
+    response = client.post('/predict?return_proba=true&top_k=2', json={
+        'input_data': LISTING, 'model_file': {'model_path': 'champion.pkl'}
+    })
+    proba = expected_proba(model_folder, [LISTING])
+    body = response.json()
+    order = np.argsort(-proba[0], kind='stable')
+
+    # Check if the probabilities of every category are returned with their names
+    assert response.status_code == 200
+    assert body['categories'] == ['Low', 'Mid', 'High', 'Lux']
+    assert body['probabilities'] == proba[0].tolist()
+
+    # Check if the top categories are the most probable ones, the first being the prediction
+    assert body['top_k_probabilities'] == proba[0][order[:2]].tolist()
+    assert body['top_k_categories'] == [body['categories'][i] for i in order[:2]]
+    assert body['top_k_categories'][0] == body['price_category']
+
+def test_predict_batch_proba_and_top_k(client, model_folder):
+    listings = make_listings(4)
+    response = client.post('/predict/batch?return_proba=true&top_k=1', json={
+        'listings': listings, 'model_file': {'model_path': 'champion.pkl'}
+    })
+    proba = expected_proba(model_folder, listings)
+    body = response.json()
+
+    # Check if every listing gets its own probabilities and top category
+    assert response.status_code == 200
+    assert body['probabilities'] == proba.tolist()
+    assert body['top_k_probabilities'] == proba.max(axis=1, keepdims=True).tolist()
+    assert body['top_k_categories'] == [[name] for name in body['price_categories']]
+
+def test_top_k_above_the_categories(client):
+    response = client.post('/predict?top_k=5', json={
+        'input_data': LISTING, 'model_file': {'model_path': 'champion.pkl'}
+    })
+
+    # Check if top_k is capped at the number of categories
+    assert response.status_code == 422
+
+def test_unknown_category(client):
+    response = client.post('/predict', json={
+        'input_data': dict(LISTING, neighbourhood='Atlantis'),
+        'model_file': {'model_path': 'champion.pkl'}
+    })
+
+    # Check if an unknown neighbourhood is rejected instead of predicted from NaN
+    assert response.status_code == 400
+    assert "Atlantis" in response.json()['detail']
+
+def test_unknown_category_in_batch(client):
+    listings = make_listings(4)
+    listings[1]['room_type'] = 'Igloo'
+    listings[3]['neighbourhood'] = 'Atlantis'
+    response = client.post('/predict/batch', json={
+        'listings': listings, 'model_file': {'model_path': 'champion.pkl'}
+    })
+    detail = response.json()['detail']
+
+    # Check if the batch is rejected with the unknown values and their listings
+    assert response.status_code == 400
+    assert "Igloo" in detail and "Atlantis" in detail
+    assert detail.endswith("for listings: [1, 3]")
+
+@pytest.fixture
+def router(model_folder, monkeypatch):
+    # Set before the client starts, so the lifespan warms and shuts down this router
+    router = ModelRouter(main_api.model_registry, {'champion.pkl': 0.5, 'challenger.pkl': 0.5},
+                         ['challenger.pkl'], model_folder=str(model_folder))
+    monkeypatch.setattr(main_api, 'model_router', router)
+    return router
+
+def test_routed_predictions(router, client):
+    listings = make_listings(40)
+    models = [
+        client.post('/predict', json={'input_data': listing}).json()['model']
+        for listing in listings
+    ]
+    batch = client.post('/predict/batch', json={'listings': listings[:3]}).json()
+    named = client.post('/predict', json={
+        'input_data': LISTING, 'model_file': {'model_path': 'champion.pkl'}
+    }).json()
+
+    # Check if requests without a model_path carry the model picked from their id
+    assert models == [router.choose(listing['id']) for listing in listings]
+    assert set(models) == {'champion.pkl', 'challenger.pkl'}
+    assert batch['model'] == router.choose(0)
+    assert 'model' not in named
+
+def test_model_stats(router, client, model_folder):
+    listings = make_listings(40)
+    for listing in listings:
+        client.post('/predict', json={'input_data': listing})
+    router.wait()
+    stats = client.get('/models/stats').json()
+
+    # Rows served by the champion are also scored by the challenger shadow
+    champion_rows = [row for row, listing in enumerate(listings)
+                     if router.choose(listing['id']) == 'champion.pkl']
+    features = main_api.feature_encoder.encode_many(
+        [main_api.ListingInput(**listings[row]) for row in champion_rows]
+    )
+    served = ModelHandler().load_model(str(model_folder / 'champion.pkl')).predict(features)
+    shadow = ModelHandler().load_model(str(model_folder / 'challenger.pkl')).predict(features)
+    champion, challenger = stats['models']['champion.pkl'], stats['models']['challenger.pkl']
+
+    # Check if the traffic of every model is counted
+    assert champion['requests'] == len(champion_rows)
+    assert champion['requests'] + challenger['requests'] == len(listings)
+    assert champion['weight'] == challenger['weight'] == 0.5
+
+    # Check if the shadow agreement compares the shadow with the served predictions
+    assert challenger['shadow'] and challenger['shadow_rows'] == len(champion_rows)
+    assert challenger['agreement'] == pytest.approx(np.mean(served == shadow))
+    assert stats['dropped'] == 0 and stats['pending'] == 0
+
+def read_metrics(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+def test_metrics(client):
+    # The metrics are shared by the whole process, so the increments are checked
+    before = read_metrics(client)
+    for _ in range(2):
+        client.post('/predict', json={
+            'input_data': LISTING, 'model_file': {'model_path': 'champion.pkl'}
+        })
+    after = read_metrics(client)
+
+    def increment(name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        return after[key] - before.get(key, 0)
+
+    # Check if the request latency and every phase of /predict are observed
+    assert increment('predict_request_seconds_count', endpoint='/predict', status='200') == 2
+    for phase in ['model_load', 'mapping', 'predict', 'serialization']:
+        assert increment('predict_phase_seconds_count', endpoint='/predict', phase=phase) == 2
+    assert after[('predict_requests_in_flight', (('endpoint', '/predict'),))] == 0
+
+    # Check if the cache hit ratio of the model registry is exposed
+    registry = main_api.model_registry
+    assert after[('model_cache_hit_ratio', ())] == pytest.approx(
+        registry.hits / (registry.hits + registry.misses)
+    )
@@ -0,0 +1,81 @@
+import pytest
+import numpy as np
+import pandas as pd
+from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
+from config.classifier_config import MAP_CATEGORY
+from src.metric_accumulators import ConfusionMatrixAccumulator, RocAucAccumulator
+
+@pytest.fixture
+def predictions():
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 4, 5000)
+    logits = rng.normal(size=(5000, 4)) + 1.5 * np.eye(4)[y_true]
+    y_proba = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+    return y_true, y_proba, np.argmax(y_proba, axis=1)
+
+def test_confusion_matrix_matches_sklearn(predictions):
+    y_true, _, y_pred = predictions
+    accumulator = ConfusionMatrixAccumulator([0, 1, 2, 3])
+    for batch in np.array_split(np.arange(len(y_true)), 7):
+        accumulator.update(y_true[batch], y_pred[batch])
+
+    # Check if the batch updates give the full confusion matrix and accuracy
+    np.testing.assert_array_equal(accumulator.matrix, confusion_matrix(y_true, y_pred))
+    assert accumulator.accuracy() == pytest.approx(np.mean(y_true == y_pred))
+
+def test_report_matches_previous_format(predictions):
+    y_true, _, y_pred = predictions
+    # Never predict the last class, so its precision is undefined
+    y_pred = np.where(y_pred == 3, 2, y_pred)
+    accumulator = ConfusionMatrixAccumulator([0, 1, 2, 3])
+    accumulator.update(y_true, y_pred)
+
+    report = classification_report(y_true, y_pred, output_dict=True, zero_division=0)
+    expected = pd.DataFrame.from_dict(report).T[:-3]
+    expected.index = [MAP_CATEGORY[i] for i in expected.index]
+
+    # Check if the report has the same layout and values as the pandas version
+    result = accumulator.report()
+    assert list(result) == list(expected.to_dict())
+    for metric, values in expected.to_dict().items():
+        assert result[metric] == pytest.approx(values)
+
+def test_roc_auc_close_to_exact(predictions):
+    y_true, y_proba, _ = predictions
+    accumulator = RocAucAccumulator([0, 1, 2, 3])
+    accumulator.update(y_true, y_proba)
+
+    # Check if the binned AUC is close to the exact one
+    exact = roc_auc_score(y_true, y_proba, multi_class='ovr')
+    assert accumulator.roc_auc() == pytest.approx(exact, abs=1e-3)
+
+def test_merge_equals_single_pass(predictions):
+    y_true, y_proba, y_pred = predictions
+    single_confusion = ConfusionMatrixAccumulator([0, 1, 2, 3])
+    single_confusion.update(y_true, y_pred)
+    single_auc = RocAucAccumulator([0, 1, 2, 3])
+    single_auc.update(y_true, y_proba)
+
+    # One accumulator per worker, merged at the end
+    confusion, auc = ConfusionMatrixAccumulator([0, 1, 2, 3]), RocAucAccumulator([0, 1, 2, 3])
+    for batch in np.array_split(np.arange(len(y_true)), 3):
+        worker_confusion = ConfusionMatrixAccumulator([0, 1, 2, 3])
+        worker_confusion.update(y_true[batch], y_pred[batch])
+        worker_auc = RocAucAccumulator([0, 1, 2, 3])
+        worker_auc.update(y_true[batch], y_proba[batch])
+        confusion.merge(worker_confusion)
+        auc.merge(worker_auc)
+
+    # Check if merging gives the same metrics as a single pass
+    np.testing.assert_array_equal(confusion.matrix, single_confusion.matrix)
+    assert auc.roc_auc() == single_auc.roc_auc()
+
+def test_invalid_labels_and_merge():
+    accumulator = ConfusionMatrixAccumulator([0, 1])
+    # Check if unknown labels and mismatched accumulators are rejected
+    with pytest.raises(ValueError):
+        accumulator.update([0, 5], [0, 1])
+    with pytest.raises(ValueError):
+        accumulator.merge(ConfusionMatrixAccumulator([0, 1, 2]))
+    with pytest.raises(ValueError):
+        RocAucAccumulator([0, 1]).merge(RocAucAccumulator([0, 1], n_bins=10))
@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import pytest
+import numpy as np
+from src.micro_batcher import MicroBatcher
+
+class CountingModel:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, X):
+        self.batch_sizes.append(len(X))
+        return X[:, 0].astype(int)
+
+    def predict_proba(self, X):
+        self.batch_sizes.append(len(X))
+        return np.column_stack([X[:, 0], 1 - X[:, 0]])
+
+class FailingModel:
+    def predict(self, X):
+        raise RuntimeError("broken model")
+
+async def predict_all(batcher, model, n_rows):
+    try:
+        return await asyncio.gather(*(
+            batcher.predict(model, np.array([float(i), 0.0])) for i in range(n_rows)
+        ))
+    finally:
+        await batcher.stop()
+
+def test_concurrent_requests_share_a_predict():
+    model = CountingModel()
+    batcher = MicroBatcher(max_batch_size=64, max_wait_ms=50)
+    predictions = asyncio.run(predict_all(batcher, model, 10))
+
+    # Check if every request gets the prediction of its own row
+    assert predictions == list(range(10))
+
+    # Check if the concurrent requests were predicted in a single call
+    assert model.batch_sizes == [10]
+    assert batcher.n_batches == 1 and batcher.n_rows == 10
+
+def test_max_batch_size():
+    model = CountingModel()
+    batcher = MicroBatcher(max_batch_size=4, max_wait_ms=50)
+    predictions = asyncio.run(predict_all(batcher, model, 10))
+
+    # Check if the batches are capped at max_batch_size rows
+    assert predictions == list(range(10))
+    assert model.batch_sizes == [4, 4, 2]
+
+def test_models_are_batched_separately():
+    first, second = CountingModel(), CountingModel()
+    batcher = MicroBatcher(max_batch_size=64, max_wait_ms=50)
+
+    async def run():
+        try:
+            return await asyncio.gather(
+                batcher.predict(first, np.array([1.0])),
+                batcher.predict(second, np.array([2.0])),
+                batcher.predict(first, np.array([3.0]))
+            )
+        finally:
+            await batcher.stop()
+
+    # Check if each model only predicts its own rows
+    assert asyncio.run(run()) == [1, 2, 3]
+    assert first.batch_sizes == [2] and second.batch_sizes == [1]
+
+def test_predict_error_reaches_every_request():
+    batcher = MicroBatcher(max_batch_size=64, max_wait_ms=50)
+
+    # Check if a failed predict is raised to the requests of the batch
+    with pytest.raises(RuntimeError, match="broken model"):
+        asyncio.run(predict_all(batcher, FailingModel(), 3))
+
+def test_methods_are_batched_separately():
+    model = CountingModel()
+    batcher = MicroBatcher(max_batch_size=64, max_wait_ms=50)
+
+    async def run():
+        try:
+            return await asyncio.gather(
+                batcher.predict(model, np.array([1.0, 0.0])),
+                batcher.predict(model, np.array([0.25, 0.0]), method='predict_proba'),
+                batcher.predict(model, np.array([0.0, 0.0]))
+            )
+        finally:
+            await batcher.stop()
+    prediction, proba, other = asyncio.run(run())
+
+    # Check if each request gets the output of its own method
+    assert prediction == 1 and other == 0
+    assert proba.tolist() == [0.25, 0.75]
+
+    # Check if one predict and one predict_proba call were made
+    assert sorted(model.batch_sizes) == [1, 2]
+
+def test_bad_group_does_not_stop_the_batcher():
+    model = CountingModel()
+    batcher = MicroBatcher(max_batch_size=64, max_wait_ms=50)
+
+    async def run():
+        try:
+            results = await asyncio.gather(
+                batcher.predict(model, np.array([1.0, 0.0])),
+                # Rows of different lengths cannot be stacked
+                batcher.predict(model, np.array([2.0, 0.0, 0.0])),
+                batcher.predict(FailingModel(), np.array([1.0, 0.0]), method='missing'),
+                return_exceptions=True
+            )
+            # A request after the failed batch is still served
+            return results, await batcher.predict(model, np.array([3.0, 0.0]))
+        finally:
+            await batcher.stop()
+    (first, second, third), later = asyncio.run(run())
+
+    # Check if each failure reaches the requests of its own group
+    assert isinstance(first, ValueError) and isinstance(second, ValueError)
+    assert isinstance(third, AttributeError)
+
+    # Check if the batcher keeps serving after the failures
+    assert later == 3
+
+def test_restart_after_stop():
+    model = CountingModel()
+    batcher = MicroBatcher(max_batch_size=64, max_wait_ms=1)
+
+    # Check if a stopped batcher serves again, e.g. in a second lifespan of the app
+    assert asyncio.run(predict_all(batcher, model, 2)) == [0, 1]
+    assert asyncio.run(predict_all(batcher, model, 2)) == [0, 1]
+
+class SlowModel:
+    def predict(self, X):
+        time.sleep(0.2)
+        return X[:, 0].astype(int)
+
+@pytest.mark.parametrize("model, max_wait_ms", [(CountingModel(), 10000), (SlowModel(), 1)])
+def test_stop_fails_the_batch_in_progress(model, max_wait_ms):
+    batcher = MicroBatcher(max_batch_size=64, max_wait_ms=max_wait_ms)
+
+    async def run():
+        request = asyncio.ensure_future(batcher.predict(model, np.array([1.0, 0.0])))
+        # Let the batching task take the row, then stop it while collecting or predicting
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        return await asyncio.wait_for(request, 1)
+
+    # Check if the request taken from the queue fails instead of hanging
+    with pytest.raises(RuntimeError, match="stopped"):
+        asyncio.run(run())
@@ -30,4 +30,42 @@ def test_evaluate(mock_model):
     assert 'roc_auc' in results
     assert 'feature_importances' in results
     assert 'confusion_matrix' in results
-    assert 'classification_report' in results
\ No newline at end of file
+    assert 'classification_report' in results
+
+@pytest.fixture
+def forest_data():
+    from sklearn.ensemble import RandomForestClassifier
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({'signal': rng.normal(size=300), 'noise': rng.normal(size=300),
+                      'weak': rng.normal(size=300)})
+    y = (X['signal'] + 0.3 * X['weak'] > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    return model, X, y
+
+def test_get_permutation_importances(forest_data):
+    model, X, y = forest_data
+    importances = Evaluator.get_permutation_importances(model, X, y, n_repeats=3, n_workers=1)
+
+    # Check if the drops match a naive loop over the same permutations
+    baseline = np.mean(model.predict(X) == y)
+    rng = np.random.default_rng(0)
+    drops = {name: [] for name in X.columns}
+    for _ in range(3):
+        for name in X.columns:
+            X_permuted = X.copy()
+            X_permuted[name] = X[name].to_numpy()[rng.permutation(len(X))]
+            drops[name].append(baseline - np.mean(model.predict(X_permuted) == y))
+    for name in X.columns:
+        assert importances[name]['mean'] == pytest.approx(np.mean(drops[name]))
+        assert importances[name]['n_repeats'] == 3
+
+    # Check if the features are sorted by importance
+    assert list(importances)[0] == 'signal'
+
+def test_get_permutation_importances_time_budget(forest_data):
+    model, X, y = forest_data
+    importances = Evaluator.get_permutation_importances(model, X, y, n_workers=1,
+                                                        time_budget_s=0)
+
+    # Check if no permutation is scored once the budget is spent
+    assert all(value['n_repeats'] == 0 for value in importances.values())
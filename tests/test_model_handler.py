@@ -28,6 +28,22 @@ def test_save_model(model_handler, tmp_path):
     # Check if the file exists
     assert save_path.exists()
 
+def test_save_model_replaces_file_atomically(model_handler, tmp_path):
+    save_path = tmp_path / "saved_model.pkl"
+    model_handler.model = DummyClassifier(constant=1)
+    model_handler.save_model(str(save_path))
+
+    # A model that cannot be pickled fails partway through the dump
+    model_handler.model = DummyClassifier(constant=lambda: 2)
+    with pytest.raises(Exception):
+        model_handler.save_model(str(save_path))
+
+    # Check if the saved model is left whole and no other file is in the folder
+    assert ModelHandler().load_model(str(save_path)).constant == 1
+    model_handler.model = DummyClassifier(constant=3)
+    model_handler.save_model(str(save_path))
+    assert [path.name for path in tmp_path.iterdir()] == ["saved_model.pkl"]
+
 def test_train_model(model_handler):
     X_train = np.array([[1, 2], [3, 4]])
     y_train = np.array([0, 1])
@@ -53,4 +69,88 @@ def test_predict(model_handler):
     assert len(predictions) == len(X_test)
     
     # Check if the predictions are either 0 or 1
-    assert set(predictions).issubset({0, 1})
\ No newline at end of file
+    assert set(predictions).issubset({0, 1})
+def test_train_model_params(model_handler):
+    X_train = np.array([[1, 2], [3, 4], [5, 6]])
+    y_train = np.array([0, 1, 0])
+
+    model_handler.train_model(X_train, y_train, n_estimators=3, max_depth=1)
+
+    # Check if the given parameters override the config defaults
+    assert len(model_handler.model.estimators_) == 3
+    assert model_handler.model.max_depth == 1
+
+@pytest.fixture
+def forest_data():
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 5, size=(300, 3)).astype(float)
+    y = (X[:, 0] + X[:, 1] > 4).astype(int)
+    return X, y
+
+def test_grow_model(model_handler, forest_data):
+    X, y = forest_data
+    model_handler.train_model(X, y, n_estimators=10, n_jobs=1)
+    first_trees = list(model_handler.model.estimators_)
+
+    model_handler.grow_model(X, y, n_trees=5)
+
+    # Check if the existing trees are kept and the new ones appended
+    assert model_handler.model.estimators_[:10] == first_trees
+    assert len(model_handler.model.estimators_) == 15
+    assert model_handler.lineage['mode'] == 'grow'
+    assert model_handler.lineage['trees_added'] == 5
+
+@pytest.mark.parametrize("replace", ['oldest', 'worst'])
+def test_grow_model_replace(model_handler, forest_data, replace):
+    X, y = forest_data
+    model_handler.train_model(X, y, n_estimators=10, n_jobs=1)
+    first_trees = list(model_handler.model.estimators_)
+
+    model_handler.grow_model(X, y, n_trees=4, replace=replace)
+
+    # Check if the forest keeps its size and 4 original trees are replaced
+    trees = model_handler.model.estimators_
+    assert len(trees) == 10
+    assert sum(tree in first_trees for tree in trees) == 6
+    if replace == 'oldest':
+        assert trees[:6] == first_trees[4:]
+    assert model_handler.lineage['trees_removed'] == 4
+
+    # Check if the new trees are not regrown copies of the surviving ones
+    new_trees = [tree for tree in trees if tree not in first_trees]
+    surviving_seeds = {tree.random_state for tree in trees if tree in first_trees}
+    assert not surviving_seeds & {tree.random_state for tree in new_trees}
+    for new_tree in new_trees:
+        for tree in trees:
+            if tree is not new_tree:
+                assert not np.array_equal(new_tree.tree_.threshold, tree.tree_.threshold)
+
+def test_grow_model_errors(model_handler, forest_data):
+    X, y = forest_data
+    model_handler.model = DummyClassifier().fit(X, y)
+    # Check if only forests can be grown
+    with pytest.raises(ValueError):
+        model_handler.grow_model(X, y, n_trees=5)
+
+    model_handler.train_model(X, y, n_estimators=5, n_jobs=1)
+    # Check if the new data must have the same classes
+    with pytest.raises(ValueError):
+        model_handler.grow_model(X, np.zeros_like(y), n_trees=5)
+
+def test_compress_model(model_handler, forest_data):
+    X, y = forest_data
+    model_handler.train_model(X[:200], y[:200], n_estimators=30, n_jobs=1)
+    compressed = model_handler.compress_model(X[200:], y[200:], tolerance=0.01)
+    report = model_handler.compression
+
+    # Check if the compressed forest is smaller and scores within tolerance
+    assert compressed.n_estimators == report['n_estimators'] <= 30
+    assert compressed.value.dtype == np.float16
+    assert report['selection_accuracy']['after'] >= report['selection_accuracy']['before'] - 0.01
+    assert report['selection_roc_auc']['after'] >= report['selection_roc_auc']['before'] - 0.01
+    assert np.mean(compressed.predict(X[200:]) == y[200:]) == report['selection_accuracy']['after']
+
+    # Check if only forests can be compressed
+    model_handler.model = DummyClassifier().fit(X, y)
+    with pytest.raises(ValueError):
+        model_handler.compress_model(X, y)
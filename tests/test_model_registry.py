@@ -0,0 +1,148 @@
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+import pytest
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import RandomForestClassifier
+from src.model_handler import ModelHandler
+from src.model_registry import ModelRegistry
+from src.prediction_table import PredictionTable
+
+@pytest.fixture
+def model_paths(tmp_path):
+    paths = []
+    for i in range(3):
+        model_handler = ModelHandler()
+        model_handler.model = DummyClassifier(constant=i)
+        path = tmp_path / f"model_{i}.pkl"
+        model_handler.save_model(str(path))
+        paths.append(str(path))
+    return paths
+
+@pytest.fixture
+def registry():
+    registry = ModelRegistry(max_size=2)
+    yield registry
+    registry.shutdown()
+
+def test_get_model_loads_once(registry, model_paths):
+    first = registry.get_model(model_paths[0])
+    second = registry.get_model(model_paths[0])
+
+    # Check if the second lookup is served from the cache
+    assert first is second
+    assert registry.misses == 1
+    assert registry.hits == 1
+
+def test_get_model_missing_file(registry, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        registry.get_model(str(tmp_path / "missing.pkl"))
+
+def test_lru_eviction(registry, model_paths):
+    first = registry.get_model(model_paths[0])
+    registry.get_model(model_paths[1])
+    registry.get_model(model_paths[2])
+
+    # Check if the least recently used model has been evicted
+    assert registry.get_model(model_paths[0]) is not first
+    assert registry.misses == 4
+
+def test_reload_on_file_change(registry, model_paths):
+    path = model_paths[0]
+    first = registry.get_model(path)
+
+    model_handler = ModelHandler()
+    model_handler.model = DummyClassifier(constant=42)
+    model_handler.save_model(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    # Check if the stale model is served while the new one loads
+    assert registry.get_model(path) is first
+    registry.wait()
+    reloaded = registry.get_model(path)
+    assert reloaded is not first
+    assert reloaded.constant == 42
+
+def test_reload_on_table_change(registry, tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 3, (100, 2)).astype(float)
+    model_handler = ModelHandler()
+    model_handler.model = RandomForestClassifier(n_estimators=3, random_state=0).fit(X, X[:, 0])
+    path = str(tmp_path / "model.pkl")
+    model_handler.save_model(path)
+    first = registry.get_model(path)
+
+    # Rebuild the table on a smaller grid, without touching the model file
+    model_handler.build_prediction_table(X[X[:, 1] == 0]).save(PredictionTable.path_for(path))
+    registry.get_model(path)
+    registry.wait()
+    reloaded = registry.get_model(path)
+
+    # Check if the new table is picked up
+    assert reloaded is not first
+    assert isinstance(reloaded, PredictionTable)
+    assert reloaded.grid_values[1].tolist() == [0.0]
+
+def test_reload_after_shutdown(registry, model_paths):
+    path = model_paths[0]
+    registry.get_model(path)
+    registry.shutdown()
+
+    model_handler = ModelHandler()
+    model_handler.model = DummyClassifier(constant=42)
+    model_handler.save_model(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    # Check if a registry that was shut down (e.g. by a previous lifespan) still reloads
+    registry.get_model(path)
+    registry.wait()
+    assert registry.get_model(path).constant == 42
+
+def test_path_locks_are_released(registry, model_paths):
+    for path in model_paths * 2:
+        registry.get_model(path)
+
+    # Check if no lock is kept for the paths once they are loaded
+    assert registry._path_locks == {}
+
+def test_concurrent_loads_share_one_read(model_paths):
+    calls = []
+
+    def slow_loader(path):
+        calls.append(path)
+        time.sleep(0.1)
+        return object()
+
+    registry = ModelRegistry(max_size=2, loader=slow_loader)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        models = list(executor.map(lambda _: registry.get_model(model_paths[0]), range(4)))
+
+    # Check if the file is loaded once for all the threads that asked for it
+    assert len(calls) == 1
+    assert all(model is models[0] for model in models)
+    assert registry._path_locks == {}
+
+def test_warm(registry, model_paths):
+    registry.warm(model_paths[:2])
+
+    # Check if pre-loaded models are served from the cache
+    registry.get_model(model_paths[0])
+    registry.get_model(model_paths[1])
+    assert registry.misses == 2
+    assert registry.hits == 2
+
+def test_serving_modules_skip_the_training_stack():
+    modules = "src.model_registry, src.model_loader, src.feature_encoder, src.micro_batcher"
+    code = (f"import sys, {modules}; "
+            "print(sorted(m for m in ('pandas', 'sklearn', 'scipy') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            check=True, cwd=Path(__file__).resolve().parents[1])
+
+    # Check if the serving path imports neither pandas nor sklearn
+    assert result.stdout.strip() == '[]'
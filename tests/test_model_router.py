@@ -0,0 +1,84 @@
+import pytest
+import numpy as np
+from src.model_router import ModelRouter
+
+class ConstantModel:
+    def __init__(self, label):
+        self.label = label
+
+    def predict(self, X):
+        return np.full(len(X), self.label)
+
+class FakeRegistry:
+    max_size = 4
+
+    def __init__(self, models):
+        self.models = models
+
+    def get_model(self, path):
+        return self.models[path.name]
+
+@pytest.fixture
+def registry():
+    return FakeRegistry({'champion': ConstantModel(1), 'challenger': ConstantModel(2),
+                         'shadow': ConstantModel(1)})
+
+def test_weighted_routing(registry):
+    router = ModelRouter(registry, {'champion': 0.8, 'challenger': 0.2}, [])
+    picks = [router.choose(key) for key in range(5000)]
+
+    # Check if the traffic is split by weight
+    assert picks.count('challenger') / len(picks) == pytest.approx(0.2, abs=0.03)
+
+    # Check if a key is always routed to the same model
+    assert [router.choose(key) for key in range(5000)] == picks
+    router.shutdown()
+
+def test_shadow_agreement(registry):
+    router = ModelRouter(registry, {'champion': 1}, ['challenger', 'shadow'])
+    features = np.zeros((3, 5))
+    router.observe('champion', features, [1, 1, 2])
+    router.observe('champion', features[:1], [1])
+    router.wait()
+    stats = router.stats()
+    router.shutdown()
+
+    # Check if the served traffic is counted per model
+    assert stats['models']['champion']['requests'] == 2
+    assert stats['models']['champion']['rows'] == 4
+
+    # Check if every shadow model is compared with the served predictions
+    assert stats['models']['shadow']['shadow_rows'] == 4
+    assert stats['models']['shadow']['agreement'] == pytest.approx(3 / 4)
+    assert stats['models']['challenger']['agreement'] == pytest.approx(1 / 4)
+
+def test_full_shadow_queue_drops(registry):
+    router = ModelRouter(registry, {'champion': 1}, ['shadow'], max_pending=0)
+    router.observe('champion', np.zeros((1, 5)), [1])
+
+    # Check if a shadow batch is dropped instead of queued past max_pending
+    assert router.stats()['dropped'] == 1
+    assert router.stats()['models']['shadow']['shadow_rows'] == 0
+    router.shutdown()
+
+def test_invalid_weights(registry):
+    # Check if negative or all-zero weights are rejected
+    with pytest.raises(ValueError):
+        ModelRouter(registry, {'champion': -1, 'challenger': 2}, [])
+    with pytest.raises(ValueError):
+        ModelRouter(registry, {'champion': 0}, [])
+
+def test_shadow_workers_lifecycle(registry):
+    # Check if no shadow workers are started without shadow models
+    router = ModelRouter(registry, {'champion': 1}, [])
+    router.observe('champion', np.zeros((1, 5)), [1])
+    assert router._executor is None
+
+    # Check if shadow predictions still run after a shutdown (e.g. a second lifespan)
+    router = ModelRouter(registry, {'champion': 1}, ['shadow'])
+    router.observe('champion', np.zeros((1, 5)), [1])
+    router.shutdown()
+    router.observe('champion', np.zeros((1, 5)), [1])
+    router.wait()
+    router.shutdown()
+    assert router.stats()['models']['shadow']['shadow_rows'] == 2
@@ -0,0 +1,82 @@
+import pytest
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from src.model_handler import ModelHandler
+from src.prediction_table import PredictionTable
+from config.classifier_config import FEATURE_NAMES
+
+@pytest.fixture
+def training_data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        'neighbourhood': rng.integers(1, 6, 300),
+        'room_type': rng.integers(1, 5, 300),
+        'accommodates': rng.integers(1, 7, 300),
+        'bathrooms': rng.integers(2, 6, 300) / 2,
+        'bedrooms': rng.integers(0, 4, 300)
+    })[FEATURE_NAMES]
+    y = (X['room_type'] + X['accommodates']) % 4
+    return X, y
+
+@pytest.fixture
+def model(training_data):
+    X, y = training_data
+    return RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+
+def test_build_covers_observed_grid(model, training_data):
+    X, _ = training_data
+    table = PredictionTable.build(model, X, max_size=10**6)
+
+    # Check if the table has one cell per combination of observed values
+    assert len(table.proba) == PredictionTable.grid_size(X) == 5 * 4 * 6 * 4 * 4
+    # Check if lookups give the same predictions as the model
+    assert np.array_equal(table.predict(X), model.predict(X))
+    assert np.allclose(table.predict_proba(X), model.predict_proba(X))
+
+def test_fallback_outside_grid(model, training_data):
+    X, _ = training_data
+    table = PredictionTable.build(model, X, max_size=10**6)
+    outside = X.head(3).to_numpy(dtype=float)
+    outside[1, 2] = 42
+
+    index, found = table.lookup(outside)
+
+    # Check if only the unseen row is sent to the fallback model
+    assert found.tolist() == [True, False, True]
+    assert np.array_equal(table.predict(outside), model.predict(outside))
+
+def test_build_too_large(model, training_data):
+    X, _ = training_data
+    with pytest.raises(ValueError):
+        PredictionTable.build(model, X, max_size=10)
+
+def test_model_handler_loads_table(model, training_data, tmp_path):
+    X, _ = training_data
+    model_handler = ModelHandler()
+    model_handler.model = model
+    model_path = tmp_path / "model.pkl"
+    model_handler.build_prediction_table(X).save(PredictionTable.path_for(model_path))
+    model_handler.save_model(str(model_path))
+
+    loaded = ModelHandler().load_model(str(model_path))
+
+    # Check if the model is served through the table saved next to it
+    assert isinstance(loaded, PredictionTable)
+    assert np.array_equal(loaded.predict(X), model.predict(X))
+
+def test_path_for_is_distinct_per_model_file():
+    # Check if a pickled model and its compiled copy do not share a table file
+    assert PredictionTable.path_for("models/model_1.pkl") == "models/model_1.pkl.table.npz"
+    assert PredictionTable.path_for("models/model_1.pkl") != \
+        PredictionTable.path_for("models/model_1.forest")
+
+def test_lookup_wrong_number_of_features(model, training_data):
+    X, _ = training_data
+    table = PredictionTable.build(model, X, max_size=10**6)
+
+    # Check if rows with extra or missing features are rejected instead of truncated
+    with pytest.raises(ValueError, match="Expected 5 features"):
+        table.lookup(np.column_stack([X.to_numpy(), X.to_numpy()[:, :1]]))
+    with pytest.raises(ValueError, match="Expected 5 features"):
+        table.lookup(X.to_numpy()[:, :-1])
@@ -0,0 +1,72 @@
+import logging
+import threading
+import pytest
+from src import setup_logger as setup_logger_module
+from src.setup_logger import setup_logger, shutdown_logger, get_logger, LazyFormat
+
+@pytest.fixture
+def log_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(setup_logger_module, 'LOG_FOLDER', str(tmp_path))
+    yield tmp_path
+    shutdown_logger()
+
+def test_setup_logger_once(log_folder):
+    root_logger = logging.getLogger('')
+    n_handlers = len(root_logger.handlers)
+
+    setup_logger("first")
+    setup_logger("second")
+
+    # Check if repeated calls do not stack handlers or create new files
+    assert len(root_logger.handlers) == n_handlers + 1
+    assert (log_folder / "log_file_first.log").exists()
+    assert not (log_folder / "log_file_second.log").exists()
+
+def test_records_written_by_listener(log_folder):
+    setup_logger("listener")
+    get_logger(__name__).info("Hello from the queue")
+    shutdown_logger()
+
+    # Check if the queued record reaches the log file
+    assert "Hello from the queue" in (log_folder / "log_file_listener.log").read_text()
+
+def test_lazy_format_not_built_when_disabled(log_folder):
+    setup_logger("lazy")
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return "payload"
+
+    get_logger(__name__).debug("Data: %s", LazyFormat(expensive))
+    shutdown_logger()
+
+    # Check if the payload is never built below the configured level
+    assert calls == []
+
+def test_records_formatted_by_listener(log_folder):
+    setup_logger("format")
+    threads = []
+    caller_formats = []
+    # Both handlers share one formatter
+    formatter = setup_logger_module._listener.handlers[0].formatter
+    format_record = formatter.format
+    formatter.format = lambda record: threads.append(threading.current_thread()) or format_record(record)
+    queue_handler = setup_logger_module._queue_handler
+    format_on_caller = queue_handler.format
+    queue_handler.format = lambda record: caller_formats.append(record) or format_on_caller(record)
+
+    values = ["before"]
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        get_logger(__name__).exception("Values: %s", values)
+    values[0] = "after"
+    shutdown_logger()
+
+    # Check if the records are formatted on the listener, with the args of the call
+    assert caller_formats == []
+    assert threads and threading.current_thread() not in threads
+    text = (log_folder / "log_file_format.log").read_text()
+    assert "Values: ['before']" in text
+    assert "RuntimeError: boom" in text
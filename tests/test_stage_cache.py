@@ -0,0 +1,88 @@
+import os
+import time
+import pytest
+import pandas as pd
+from src.data_preprocessor import DataProcessor
+from src.stage_cache import StageCache
+from tests.test_data_preprocessor import sample_df
+
+def step(df):
+    return df
+
+def other_step(df):
+    return df.copy()
+
+@pytest.fixture
+def cache(tmp_path):
+    return StageCache(folder=str(tmp_path / "cache"), max_bytes=10 ** 9, max_age_days=1)
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'category': pd.Categorical([0, 1, 3], categories=[0, 1, 2, 3], ordered=True),
+        'room_type': pd.Categorical(['Private room', 'Shared room', 'Private room']),
+        'bedrooms': pd.Series([1.0, 2.0, 3.0], dtype='float32')
+    })
+
+def test_key_depends_on_parent_code_and_config():
+    key = StageCache.key('input', step, {'bins': [10, 90]})
+
+    # Check if the key is stable and changes with each of its parts
+    assert key == StageCache.key('input', step, {'bins': [10, 90]})
+    assert key != StageCache.key('other input', step, {'bins': [10, 90]})
+    assert key != StageCache.key('input', other_step, {'bins': [10, 90]})
+    assert key != StageCache.key('input', step, {'bins': [10, 100]})
+
+def test_fingerprint_follows_content(tmp_path):
+    path = tmp_path / "raw.csv"
+    path.write_text("id\n1\n")
+    first = StageCache.fingerprint(str(path))
+    path.write_text("id\n2\n")
+
+    # Check if a content change gives a new fingerprint
+    assert StageCache.fingerprint(str(path)) != first
+    with pytest.raises(FileNotFoundError):
+        StageCache.fingerprint(str(tmp_path / "missing.csv"))
+
+def test_put_and_get(cache, frame):
+    # Check if a missing key is a miss
+    assert cache.get('missing') is None
+    cache.put('key', frame)
+
+    # Check if the stored frame comes back with the same dtypes
+    pd.testing.assert_frame_equal(cache.get('key'), frame)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_evict_by_size_and_age(cache, frame):
+    for key in ('a', 'b', 'c'):
+        cache.put(key, frame)
+    old = time.time() - 2 * 86400
+    os.utime(cache._path('a'), (old, old))
+    os.utime(cache._path('b'), (time.time() - 60, time.time() - 60))
+
+    cache.max_bytes = cache._path('c').stat().st_size
+    cache.evict()
+
+    # Check if the expired entry and then the least recently used one are removed
+    assert not cache._path('a').exists()
+    assert not cache._path('b').exists()
+    assert cache._path('c').exists()
+
+def test_process_data_resumes_from_cache(cache, sample_df, tmp_path, monkeypatch):
+    input_path = tmp_path / "input_data.csv"
+    sample_df.to_csv(input_path, index=False)
+    uncached = DataProcessor()
+    uncached.process_data(str(input_path), str(tmp_path / "uncached.csv"))
+
+    first = DataProcessor()
+    first.process_data(str(input_path), str(tmp_path / "first.csv"), cache=cache)
+    # Check if every stage is stored (load plus the cleaning stages)
+    assert len(list(cache.folder.glob("*.pkl"))) == 6
+
+    second = DataProcessor()
+    monkeypatch.setattr(pd, 'read_csv', lambda *args, **kwargs: pytest.fail("raw file reloaded"))
+    second.process_data(str(input_path), str(tmp_path / "second.csv"), cache=cache)
+
+    # Check if the rerun is served from the cache with the same data
+    pd.testing.assert_frame_equal(first.df, uncached.df)
+    pd.testing.assert_frame_equal(second.df, uncached.df)
@@ -0,0 +1,34 @@
+import numpy as np
+from src.stage_timer import StageTimer
+
+def test_stage_records_time_and_calls():
+    timer = StageTimer()
+    for _ in range(3):
+        with timer.stage('step'):
+            pass
+    stages = timer.as_dict()
+
+    # Check if repeated stages add up their calls
+    assert stages['step']['calls'] == 3
+    assert stages['step']['time_s'] >= 0
+
+    # Check if memory is not measured unless requested
+    assert stages['step']['peak_memory_mb'] is None
+
+def test_nested_stages_peak_memory():
+    timer = StageTimer(trace_memory=True)
+    with timer.stage('outer'):
+        with timer.stage('inner'):
+            array = np.ones(2_000_000)  # 16 MB
+            del array
+        with timer.stage('small'):
+            array = np.ones(1000)
+    stages = timer.as_dict()
+
+    # Check if the stages are listed in the order they started
+    assert list(stages) == ['outer', 'inner', 'small']
+
+    # Check if the peak of a nested stage is also the peak of its parent
+    assert stages['inner']['peak_memory_mb'] >= 16
+    assert stages['outer']['peak_memory_mb'] >= 16
+    assert stages['small']['peak_memory_mb'] < 1
@@ -0,0 +1,92 @@
+import pytest
+import numpy as np
+import pandas as pd
+from sklearn.metrics import confusion_matrix
+from config.classifier_config import MAP_NEIGHB, MAP_ROOM_TYPE, FEATURE_NAMES, TARGET_COLUMN
+from src.streaming_trainer import StreamingTrainer
+
+@pytest.fixture
+def processed_path(tmp_path):
+    rng = np.random.default_rng(0)
+    n_rows = 2000
+    df = pd.DataFrame({
+        'id': np.arange(n_rows) + 1000,
+        'neighbourhood': rng.choice(list(MAP_NEIGHB), n_rows),
+        'room_type': rng.choice(list(MAP_ROOM_TYPE), n_rows),
+        'accommodates': rng.integers(1, 8, n_rows),
+        'bathrooms': rng.integers(1, 4, n_rows).astype(float),
+        'bedrooms': rng.integers(1, 5, n_rows).astype(float),
+        'price': rng.integers(10, 500, n_rows)
+    })
+    df[TARGET_COLUMN] = pd.cut(df['price'], bins=[10, 90, 180, 400, np.inf], labels=[0, 1, 2, 3],
+                               include_lowest=True)
+    path = tmp_path / "processed.parquet"
+    df.to_parquet(path, index=False)
+    return str(path)
+
+@pytest.fixture
+def trainer():
+    return StreamingTrainer(batch_size=300, shard_size=600, trees_per_shard=3, test_ratio=0.2)
+
+def test_is_test_is_stable(trainer):
+    ids = np.arange(10000)
+    mask = trainer.is_test(ids)
+
+    # Check if the split is deterministic and close to the test ratio
+    np.testing.assert_array_equal(mask, trainer.is_test(ids))
+    assert abs(mask.mean() - 0.2) < 0.02
+
+def test_fit_merges_shards(trainer, processed_path):
+    model = trainer.fit(processed_path)
+
+    # Check if every shard adds its trees to one forest
+    assert model.n_estimators == len(model.estimators_)
+    assert model.n_estimators > 3
+    assert list(model.feature_names_in_) == FEATURE_NAMES
+    assert list(model.classes_) == [0, 1, 2, 3]
+    # Check if the test rows are held out and every training row is used
+    batches = list(trainer.iter_batches(processed_path))
+    assert trainer.n_train_rows == sum(int((~test).sum()) for _, _, test in batches)
+
+def test_evaluate_matches_in_memory(trainer, processed_path):
+    model = trainer.fit(processed_path)
+    results = trainer.evaluate(model, processed_path)
+
+    batches = list(trainer.iter_batches(processed_path))
+    X = pd.concat([X[test] for X, _, test in batches])
+    y = pd.concat([y[test] for _, y, test in batches])
+
+    # Check if the streamed metrics match the ones computed on all test rows
+    assert results['n_rows'] == len(y)
+    assert results['confusion_matrix'] == confusion_matrix(y, model.predict(X)).tolist()
+    assert results['accuracy'] == pytest.approx(np.mean(model.predict(X) == y))
+
+def test_fit_without_every_class(trainer, tmp_path, processed_path):
+    df = pd.read_parquet(processed_path)
+    path = tmp_path / "one_class.parquet"
+    df[df[TARGET_COLUMN] == 0].to_parquet(path, index=False)
+
+    # Check if data missing a class cannot be trained on
+    with pytest.raises(ValueError):
+        trainer.fit(str(path))
+
+def test_fit_with_a_rare_class(trainer, tmp_path, processed_path):
+    df = pd.read_parquet(processed_path)
+    # The most expensive class only appears in the first listings
+    df[TARGET_COLUMN] = df[TARGET_COLUMN].astype(int).clip(upper=2)
+    df.loc[:9, TARGET_COLUMN] = 3
+    path = tmp_path / "rare_class.parquet"
+    df.to_parquet(path, index=False)
+
+    model = trainer.fit(str(path))
+    X = pd.concat([X for X, _, _ in trainer.iter_batches(str(path))])
+    proba = model.predict_proba(X)
+
+    # Check if shards without the rare class are fitted instead of buffered
+    assert model.n_estimators > 3
+    # Check if their trees are aligned on every class
+    assert list(model.classes_) == [0, 1, 2, 3]
+    assert proba.shape == (len(X), 4)
+    np.testing.assert_allclose(proba.sum(axis=1), 1)
+    np.testing.assert_allclose(proba, np.mean([tree.predict_proba(X.to_numpy())
+                                               for tree in model.estimators_], axis=0))